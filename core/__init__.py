@@ -5,9 +5,55 @@
 from .psf_params import ParamPSF
 from .psf_calculator import PSFCalculator
 from .fft_calculator import FFT
+from .pupil_geometry import PupilGeometry
+from .psf_cache import PSFCache
+from .psf_metrics import PSFMetrics
+from .zernike import Zernike
+from .psf_volume import PSFVolume
+from .field_grid import FieldGrid, FieldAberrations
+from .imaging import ImageSimulator, SpatiallyVariantSimulator, TestObjects
+from .coherence import PartialCoherenceImager, Illumination
+from .phase_retrieval import PhaseRetrieval, PhaseRetrievalResult
+from .aberration_fit import AberrationFit, AberrationFitResult
+from .optimizer import PSFOptimizer, OptimizationResult
+from .tolerance import ToleranceAnalysis, Tolerance, ToleranceResult, OnlineHistogram
+from .sensitivity import SensitivityAnalysis
+from .strehl_lut import StrehlLUT
+from .sweep import AdaptiveSweep, SweepResult, GridSweep, SweepAxis, SweepCube
+from .streaming import iter_compute
 
 __all__ = [
     'ParamPSF',
     'PSFCalculator',
-    'FFT'
+    'FFT',
+    'PupilGeometry',
+    'PSFCache',
+    'PSFMetrics',
+    'Zernike',
+    'PSFVolume',
+    'FieldGrid',
+    'FieldAberrations',
+    'ImageSimulator',
+    'SpatiallyVariantSimulator',
+    'PartialCoherenceImager',
+    'Illumination',
+    'PhaseRetrieval',
+    'PhaseRetrievalResult',
+    'AberrationFit',
+    'AberrationFitResult',
+    'PSFOptimizer',
+    'OptimizationResult',
+    'ToleranceAnalysis',
+    'Tolerance',
+    'ToleranceResult',
+    'OnlineHistogram',
+    'SensitivityAnalysis',
+    'StrehlLUT',
+    'AdaptiveSweep',
+    'SweepResult',
+    'GridSweep',
+    'SweepAxis',
+    'SweepCube',
+    'iter_compute',
+    'TestObjects'
 ]
\ No newline at end of file
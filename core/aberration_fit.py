@@ -0,0 +1,201 @@
+import numpy as np
+from dataclasses import dataclass, replace
+from typing import Callable, Optional, Sequence, Tuple
+from core.psf_params import ParamPSF
+from core.psf_calculator import PSFCalculator
+from core.fft_calculator import FFT
+from core.pupil_geometry import PupilGeometry
+
+
+@dataclass
+class AberrationFitResult:
+    """Результат подбора аберраций"""
+    params: ParamPSF          # параметры строки с подобранными аберрациями
+    residual: float           # относительная СКО невязки ФРТ
+    iterations: int
+    converged: bool
+    shift: Tuple[float, float] = (0.0, 0.0)  # подобранный сдвиг модели (y, x), пиксели
+
+
+class AberrationFit:
+    """
+    Подбор расфокусировки, астигматизма и заданных членов Цернике по измеренной ФРТ
+
+    Метод Левенберга-Марквардта по невязке нормированных ФРТ. Модель - та же
+    геометрия зрачка из кэша PupilGeometry и пакетные БПФ PSFCalculator:
+    якобиан по конечным разностям - одна пачка из p ФРТ со сдвинутыми
+    параметрами; она пересчитывается только после принятого шага, а пробная
+    точка стоит одной ФРТ. Измерение центрируется по самому яркому пикселю,
+    а кома, наклон и трилистник смещают максимум модели, поэтому вместе с
+    аберрациями подбирается субпиксельный сдвиг модели (y, x). Его столбцы
+    якобиана, как и столбцы масштаба и фона, получаются без расчета зрачка:
+    сдвиг - фазовый множитель в спектре ФРТ, производная по сдвигу - минус
+    градиент модели. Одиночная ФРТ не различает знак четных аберраций,
+    поэтому знак определяется начальным приближением.
+    """
+
+    DIFF_STEP = 0.01   # шаг конечных разностей, λ (не 0: у четных аберраций производная в 0 равна 0)
+    MAX_RESIDUAL = 0.1  # при большей относительной невязке подбор не считается сошедшимся
+
+    def __init__(self, zernike_terms: Sequence[int] = (), max_iterations: int = 50,
+                 tolerance: float = 1e-8):
+        self.zernike_terms = tuple(int(j) for j in zernike_terms)
+        self.max_iterations = max_iterations
+        self.tolerance = tolerance
+
+    @staticmethod
+    def prepare(image: np.ndarray, size: int) -> np.ndarray:
+        """
+        Измеренная ФРТ на сетке size x size с максимумом в центре
+
+        Фон (медиана края кадра) вычитается без обрезки шума, изображение
+        обрезается или дополняется нулями вокруг самого яркого пикселя и
+        нормируется на сумму 1.
+        """
+        image = np.asarray(image, dtype=float)
+        border = np.concatenate((image[0], image[-1], image[:, 0], image[:, -1]))
+        image = image - np.median(border)
+
+        peak_y, peak_x = np.unravel_index(np.argmax(image), image.shape)
+        result = np.zeros((size, size))
+        center = size // 2
+        y0, x0 = max(peak_y - center, 0), max(peak_x - center, 0)
+        y1, x1 = min(peak_y - center + size, image.shape[0]), min(peak_x - center + size, image.shape[1])
+        result[y0 - peak_y + center:y1 - peak_y + center, x0 - peak_x + center:x1 - peak_x + center] = \
+            image[y0:y1, x0:x1]
+
+        total = result.sum()
+        if total <= 0:
+            raise ValueError("Изображение ФРТ пустое после вычитания фона")
+        return result / total
+
+    def _vector(self, params: ParamPSF) -> np.ndarray:
+        """Начальный вектор подбираемых параметров"""
+        zernike = np.zeros(max(self.zernike_terms, default=0))
+        zernike[:min(len(params.zernike), zernike.size)] = params.zernike[:zernike.size]
+        return np.array([params.defocus, params.astigmatism]
+                        + [zernike[j - 1] for j in self.zernike_terms])
+
+    def _zernike(self, params: ParamPSF, theta: np.ndarray) -> np.ndarray:
+        """Коэффициенты Цернике для пачки векторов параметров theta (n, p)"""
+        n_terms = max(max(self.zernike_terms, default=0), len(params.zernike))
+        zernike = np.zeros((theta.shape[0], n_terms))
+        zernike[:, :len(params.zernike)] = params.zernike
+        for k, j in enumerate(self.zernike_terms):
+            zernike[:, j - 1] = theta[:, 2 + k]
+        return zernike
+
+    def model(self, params: ParamPSF, theta: np.ndarray, shift: Sequence[float] = (0.0, 0.0)) -> np.ndarray:
+        """ФРТ для пачки векторов параметров theta (n, p), сдвинутые на shift (y, x) пикселей"""
+        geometry = PupilGeometry.for_params(params)
+        W = geometry.wavefront(theta[:, 0], theta[:, 1], self._zernike(params, theta))
+        psfs = PSFCalculator._psf_stack(geometry, W, params.step_pupil, params.step_object)
+        if not np.any(shift):
+            return psfs
+        spectrum, frequencies = self._spectrum(psfs)
+        phase = np.exp(-2j * np.pi * (shift[0] * frequencies[:, None] + shift[1] * frequencies[None, :]))
+        return FFT.ifft2(spectrum * phase, overwrite_x=True).real
+
+    @staticmethod
+    def _spectrum(images: np.ndarray):
+        """Спектр пачки изображений и частоты сетки (циклы на пиксель)"""
+        return FFT.fft2(images), np.fft.fftfreq(images.shape[-1])
+
+    @classmethod
+    def _shift_gradient(cls, image: np.ndarray) -> np.ndarray:
+        """Производные изображения по сдвигу (y, x) - минус градиент, форма (2, size, size)"""
+        spectrum, frequencies = cls._spectrum(image)
+        d_y = FFT.ifft2(spectrum * (-2j * np.pi * frequencies[:, None])).real
+        d_x = FFT.ifft2(spectrum * (-2j * np.pi * frequencies[None, :])).real
+        return np.stack((d_y, d_x))
+
+    def fit(self, measured: np.ndarray, params: ParamPSF,
+            progress: Optional[Callable[[int, int], None]] = None,
+            is_canceled: Optional[Callable[[], bool]] = None) -> Optional[AberrationFitResult]:
+        """
+        Подобрать аберрации params по измеренной ФРТ measured (размер params.size)
+
+        Начальное приближение - аберрации params. converged - шаги перестали
+        уменьшать невязку, а относительная невязка не больше MAX_RESIDUAL.
+        Возвращает None при отмене.
+        """
+        size = params.size
+        data = self.prepare(measured, size).ravel()
+        theta = self._vector(params)
+        n_params = theta.size
+        steps = np.eye(n_params) * self.DIFF_STEP
+        shift = np.zeros(2)
+        scale, background = 1.0, 0.0
+
+        def jacobian_stack(theta, shift):
+            """ФРТ со сдвинутыми параметрами - пересчитываются после принятого шага"""
+            return self.model(params, theta[None] + steps, shift).reshape(n_params, -1)
+
+        damping = 1e-3
+        current = self.model(params, theta[None], shift)[0]
+        shifted = jacobian_stack(theta, shift)
+        residual = scale * current.ravel() + background - data
+        cost = float(residual @ residual)
+        converged = False
+
+        iteration = 0
+        for iteration in range(1, self.max_iterations + 1):
+            if is_canceled is not None and is_canceled():
+                return None
+
+            # Столбцы: аберрации, сдвиг (y, x), масштаб, фон
+            J = np.empty((data.size, n_params + 4))
+            J[:, :n_params] = scale * (shifted - current.ravel()).T / self.DIFF_STEP
+            J[:, n_params:n_params + 2] = scale * self._shift_gradient(current).reshape(2, -1).T
+            J[:, n_params + 2] = current.ravel()
+            J[:, n_params + 3] = 1.0
+            JTJ = J.T @ J
+            gradient = J.T @ residual
+
+            # Шаг Левенберга-Марквардта; при росте невязки увеличиваем затухание,
+            # отвергнутый шаг стоит одной ФРТ
+            improved = False
+            for _ in range(10):
+                A = JTJ + damping * np.diag(np.diag(JTJ) + 1e-12)
+                delta = -np.linalg.solve(A, gradient)
+                trial_theta = theta + delta[:n_params]
+                trial_shift = shift + delta[n_params:n_params + 2]
+                trial_scale = scale + delta[n_params + 2]
+                trial_background = background + delta[n_params + 3]
+                trial = self.model(params, trial_theta[None], trial_shift)[0]
+                trial_residual = trial_scale * trial.ravel() + trial_background - data
+                trial_cost = float(trial_residual @ trial_residual)
+                if trial_cost < cost:
+                    improved = True
+                    break
+                damping *= 10.0
+
+            if progress is not None:
+                progress(iteration, self.max_iterations)
+            if not improved:
+                converged = True
+                break
+
+            relative_change = (cost - trial_cost) / max(cost, 1e-300)
+            theta, shift, current, residual, cost = trial_theta, trial_shift, trial, trial_residual, trial_cost
+            scale, background = trial_scale, trial_background
+            damping = max(damping / 10.0, 1e-9)
+            if relative_change < self.tolerance or np.max(np.abs(delta[:n_params + 2])) < 1e-7:
+                converged = True
+                break
+            shifted = jacobian_stack(theta, shift)
+
+        fitted = replace(
+            params,
+            defocus=float(theta[0]),
+            astigmatism=float(theta[1]),
+            zernike=tuple(round(float(c), 6) for c in self._zernike(params, theta[None])[0]),
+        )
+        relative_residual = float(np.sqrt(cost / (data @ data)))
+        return AberrationFitResult(
+            params=fitted,
+            residual=relative_residual,
+            iterations=iteration,
+            converged=converged and relative_residual <= self.MAX_RESIDUAL,
+            shift=(float(shift[0]), float(shift[1])),
+        )
@@ -0,0 +1,206 @@
+import threading
+import numpy as np
+from collections import OrderedDict
+from dataclasses import astuple, dataclass
+from typing import Callable, Optional
+from core.fft_calculator import FFT
+from core.imaging import ImageSimulator
+from core.psf_metrics import PSFMetrics
+from core.psf_params import ParamPSF
+from core.pupil_geometry import PupilGeometry
+
+
+@dataclass(frozen=True)
+class Illumination:
+    """
+    Частично когерентный осветитель (источник Кёлера)
+
+    Источник - равномерно светящийся круг или кольцо в плоскости зрачка
+    конденсора; радиусы заданы в долях апертуры объектива (σ). σ → 0 дает
+    когерентное освещение.
+    """
+    sigma: float = 0.5          # внешний радиус источника
+    sigma_inner: float = 0.0    # внутренний радиус (кольцевой источник)
+
+    def points(self, aperture_radius: float, max_points: int):
+        """
+        Смещения точек источника в пикселях сетки зрачка
+
+        Источник дискретизуется на той же сетке, что и зрачок; если точек
+        больше max_points, сетка источника прореживается с постоянным шагом.
+        """
+        radius = self.sigma * aperture_radius
+        inner = self.sigma_inner * aperture_radius
+        r_max = int(np.floor(radius))
+        offsets = np.arange(-r_max, r_max + 1)
+        dx, dy = np.meshgrid(offsets, offsets)
+        r = np.hypot(dx, dy)
+        inside = (r <= radius) & (r >= inner)
+        if not inside.any():
+            # Источник меньше пикселя - одна точка на оси
+            return np.zeros(1, dtype=int), np.zeros(1, dtype=int)
+
+        stride = max(1, int(np.ceil(np.sqrt(np.count_nonzero(inside) / max_points))))
+        if stride > 1:
+            inside &= (dx % stride == 0) & (dy % stride == 0)
+        return dx[inside], dy[inside]
+
+
+@dataclass
+class SOCSKernels:
+    """Ядра разложения на сумму когерентных систем"""
+    values: np.ndarray      # собственные значения (K,)
+    kernels: np.ndarray     # комплексные ядра (K, m, m), центр в (m // 2, m // 2)
+    captured: float         # доля следа TCC, описанная K ядрами
+    clear_field: float      # интенсивность изображения открытого поля (для нормировки)
+
+
+class PartialCoherenceImager:
+    """
+    Частично когерентное изображение по Хопкинсу через SOCS-разложение
+
+    Коэффициент взаимной передачи TCC(f1, f2) = Σ_s S(s) P(f1 + s) P*(f2 + s)
+    равен A^H A, где строки A - зрачки, сдвинутые на точки источника. Его
+    первые K собственных векторов (ядра Φ_k) дают изображение
+    I = Σ_k λ_k |t ⊛ Φ_k|², то есть 2K-4K сверток вместо свертки на каждую точку
+    источника. Ядра зависят только от зрачка и источника и кэшируются для всех
+    экземпляров, поэтому смена объекта их не пересчитывает.
+    """
+
+    _cache: "OrderedDict[tuple, SOCSKernels]" = OrderedDict()
+    _cache_lock = threading.Lock()
+    CACHE_SIZE = 8
+    MAX_SOURCE_POINTS = 400
+    KERNEL_ENERGY = 0.9999
+
+    def __init__(self, n_kernels: int = 8, simulator: Optional[ImageSimulator] = None):
+        self.n_kernels = n_kernels
+        self.simulator = simulator if simulator else ImageSimulator()
+
+    def kernels(self, params: ParamPSF, illumination: Illumination) -> SOCSKernels:
+        """Получить ядра SOCS из кэша или рассчитать их"""
+        key = (astuple(params), astuple(illumination), self.n_kernels)
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        socs = self._compute_kernels(params, illumination)
+        with self._cache_lock:
+            self._cache[key] = socs
+            while len(self._cache) > self.CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return socs
+
+    @classmethod
+    def is_cached(cls, params: ParamPSF, illumination: Illumination, n_kernels: int) -> bool:
+        """Есть ли ядра для этих параметров в кэше"""
+        with cls._cache_lock:
+            return (astuple(params), astuple(illumination), n_kernels) in cls._cache
+
+    def _compute_kernels(self, params: ParamPSF, illumination: Illumination) -> SOCSKernels:
+        """Построить TCC по модели зрачка и разложить его"""
+        size = params.size
+        geometry = PupilGeometry.for_params(params)
+        W = geometry.wavefront(params.defocus, params.astigmatism, params.zernike)
+        pupil = geometry.pupil(W)
+
+        # Радиус апертуры в пикселях сетки зрачка
+        aperture_radius = params.back_aperture / params.step_pupil
+        dx, dy = illumination.points(aperture_radius, self.MAX_SOURCE_POINTS)
+        reach = aperture_radius * (1.0 + max(illumination.sigma, 0.0))
+        if reach >= size // 2:
+            raise ValueError(
+                f"Сдвинутый зрачок (радиус {reach:.1f} пикс.) не помещается в сетку {size}: "
+                f"увеличьте размер или уменьшите σ"
+            )
+
+        # Носитель TCC - объединение сдвинутых апертур
+        x = np.arange(size) - size // 2
+        X, Y = np.meshgrid(x, x)
+        support = np.flatnonzero(np.hypot(X, Y) <= reach + 1.0)
+        sy, sx = np.unravel_index(support, (size, size))
+
+        # Строки A: sqrt(S) P(f + s) на носителе, источник равномерный
+        A = pupil[(sy[None, :] + dy[:, None]) % size, (sx[None, :] + dx[:, None]) % size]
+        A /= np.sqrt(dx.size)
+
+        # TCC(f1, f2) = Σ_s A[s, f1] A*[s, f2], то есть TCC = A^T A* = (A^H A)*.
+        # Собственные векторы A^H A - это A^H u / sqrt(λ) для собственных
+        # векторов u малой матрицы Грама A A^H; для TCC берутся сопряженные
+        gram = A @ A.conj().T
+        eigenvalues, eigenvectors = np.linalg.eigh(gram)
+        order = np.argsort(eigenvalues)[::-1]
+        eigenvalues = np.clip(eigenvalues[order], 0.0, None)
+        rank = min(self.n_kernels, int(np.count_nonzero(eigenvalues > eigenvalues[0] * 1e-12)))
+        values = eigenvalues[:rank]
+        spectra = (A.T @ eigenvectors[:, order[:rank]].conj()) / np.sqrt(values)
+
+        # Ядра в пространстве объекта - как амплитудная ФРТ в PSFCalculator
+        pupils = np.zeros((rank, size * size), dtype=complex)
+        pupils[:, support] = spectra.T
+        pupils = FFT.ifftshift(pupils.reshape(rank, size, size), axes=(-2, -1))
+        fields = FFT.fftshift(FFT.ifft2(pupils, axes=(-2, -1)), axes=(-2, -1))
+        fields *= params.step_pupil / params.step_object
+
+        # Общее окно по энергии суммарной интенсивности ядер
+        intensity = np.tensordot(values, np.abs(fields) ** 2, axes=1)
+        half = int(np.ceil(float(PSFMetrics.es_half_width(intensity / intensity.sum(), self.KERNEL_ENERGY))))
+        half = min(half, size // 2 - 1)
+        center = size // 2
+        window = slice(center - half, center + half + 1)
+        fields = fields[:, window, window]
+
+        clear_field = float(np.sum(values * np.abs(fields.sum(axis=(-2, -1))) ** 2))
+        return SOCSKernels(
+            values=values,
+            kernels=fields,
+            captured=float(values.sum() / max(eigenvalues.sum(), 1e-300)),
+            clear_field=clear_field,
+        )
+
+    def image(self, transmission: np.ndarray, params: ParamPSF, illumination: Illumination,
+              progress: Optional[Callable[[int, int], None]] = None,
+              is_canceled: Optional[Callable[[], bool]] = None) -> Optional[np.ndarray]:
+        """
+        Изображение объекта с амплитудным пропусканием transmission
+
+        Шаг объекта равен params.step_object. Интенсивность нормирована так,
+        что открытое поле (transmission = 1) дает 1.
+        """
+        socs = self.kernels(params, illumination)
+        transmission = np.asarray(transmission)
+        object_parts = [transmission.real]
+        if np.iscomplexobj(transmission):
+            object_parts.append(transmission.imag)
+
+        tiles = self.simulator.tile_count(transmission.shape)
+        total = socs.values.size * len(object_parts) * 2 * tiles
+        done = 0
+        result = np.zeros(transmission.shape)
+        for value, kernel in zip(socs.values, socs.kernels):
+            # t ⊛ Φ по частям: (t_re + i t_im) ⊛ (Φ_re + i Φ_im)
+            real = np.zeros(transmission.shape)
+            imag = np.zeros(transmission.shape)
+            for part_index, part in enumerate(object_parts):
+                for kernel_part, sign_real, sign_imag in ((kernel.real, 1.0, 0.0), (kernel.imag, 0.0, 1.0)):
+                    def step_progress(count, _, offset=done):
+                        if progress is not None:
+                            progress(offset + count, total)
+
+                    convolved = self.simulator.convolve_kernel(
+                        part, kernel_part, progress=step_progress, is_canceled=is_canceled
+                    )
+                    if convolved is None:
+                        return None
+                    if part_index == 0:
+                        real += sign_real * convolved
+                        imag += sign_imag * convolved
+                    else:
+                        # i t_im ⊛ Φ_re идет в мнимую часть, i t_im ⊛ i Φ_im - в действительную
+                        real -= sign_imag * convolved
+                        imag += sign_real * convolved
+                    done += tiles
+            result += value * (real ** 2 + imag ** 2)
+        return result / socs.clear_field
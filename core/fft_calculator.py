@@ -1,25 +1,71 @@
+import os
 import numpy as np
-from typing import Tuple
+import scipy.fft
+from typing import Optional, Tuple
 
 class FFT:
     """Класс для выполнения преобразования Фурье"""
-    
-    @staticmethod
-    def fft2(data: np.ndarray) -> np.ndarray:
-        """2D прямое преобразование Фурье"""
-        return np.fft.fft2(data)
-    
+
+    # Число потоков для scipy.fft (-1 - все ядра процессора)
+    workers: int = -1
+
+    @classmethod
+    def set_workers(cls, workers: int):
+        """Установить число потоков для вычисления БПФ"""
+        cls.workers = workers if workers != 0 else 1
+
+    @classmethod
+    def cpu_count(cls) -> int:
+        """Фактическое число потоков, используемых для БПФ"""
+        if cls.workers > 0:
+            return cls.workers
+        return os.cpu_count() or 1
+
+    @classmethod
+    def fft2(cls, data: np.ndarray, axes: Tuple[int, int] = (-2, -1),
+             overwrite_x: bool = False) -> np.ndarray:
+        """2D прямое преобразование Фурье (по двум последним осям для пачки)"""
+        return scipy.fft.fft2(data, axes=axes, overwrite_x=overwrite_x, workers=cls.workers)
+
+    @classmethod
+    def ifft2(cls, data: np.ndarray, axes: Tuple[int, int] = (-2, -1),
+              overwrite_x: bool = False) -> np.ndarray:
+        """2D обратное преобразование Фурье (по двум последним осям для пачки)"""
+        return scipy.fft.ifft2(data, axes=axes, overwrite_x=overwrite_x, workers=cls.workers)
+
+    @classmethod
+    def rfft2(cls, data: np.ndarray, shape: Tuple[int, int] = None,
+              workers: Optional[int] = None) -> np.ndarray:
+        """
+        2D преобразование Фурье вещественных данных с дополнением нулями до shape
+
+        workers переопределяет число потоков класса для этого вызова
+        (например, 1 внутри собственного пула потоков).
+        """
+        return scipy.fft.rfft2(data, s=shape, workers=workers or cls.workers)
+
+    @classmethod
+    def irfft2(cls, data: np.ndarray, shape: Tuple[int, int],
+               workers: Optional[int] = None) -> np.ndarray:
+        """Обратное 2D преобразование Фурье к вещественным данным размера shape"""
+        return scipy.fft.irfft2(data, s=shape, workers=workers or cls.workers)
+
     @staticmethod
-    def ifft2(data: np.ndarray) -> np.ndarray:
-        """2D обратное преобразование Фурье"""
-        return np.fft.ifft2(data)
-    
+    def next_fast_len(n: int) -> int:
+        """Ближайший сверху размер, для которого БПФ вычисляется быстро"""
+        return scipy.fft.next_fast_len(n, real=True)
+
+    @classmethod
+    def rfft(cls, data: np.ndarray, axis: int = -1) -> np.ndarray:
+        """1D преобразование Фурье вещественных данных (по оси axis)"""
+        return scipy.fft.rfft(data, axis=axis, workers=cls.workers)
+
     @staticmethod
-    def fftshift(data: np.ndarray) -> np.ndarray:
+    def fftshift(data: np.ndarray, axes: Tuple[int, int] = (-2, -1)) -> np.ndarray:
         """Сдвиг нулевой частоты в центр"""
-        return np.fft.fftshift(data)
-    
+        return np.fft.fftshift(data, axes=axes)
+
     @staticmethod
-    def ifftshift(data: np.ndarray) -> np.ndarray:
+    def ifftshift(data: np.ndarray, axes: Tuple[int, int] = (-2, -1)) -> np.ndarray:
         """Обратный сдвиг нулевой частоты"""
-        return np.fft.ifftshift(data)
\ No newline at end of file
+        return np.fft.ifftshift(data, axes=axes)
@@ -0,0 +1,131 @@
+import os
+import numpy as np
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Sequence
+from core.psf_params import ParamPSF
+from core.psf_calculator import PSFCalculator
+from core.psf_metrics import PSFMetrics
+from core.pupil_geometry import PupilGeometry
+
+
+@dataclass
+class FieldAberrations:
+    """
+    Зависимость аберраций от положения в поле зрения
+
+    Коэффициенты заданы на краю поля (h = 1) как СКО в длинах волн по Ноллу.
+    Кривизна поля и астигматизм растут как h², кома - как h; астигматизм и кома
+    ориентированы по азимуту точки поля. Постоянные аберрации берутся из ParamPSF.
+    """
+    field_curvature: float = 0.0   # Z4
+    astigmatism: float = 0.0       # Z5/Z6
+    coma: float = 0.0              # Z7/Z8
+
+    def __call__(self, hx: np.ndarray, hy: np.ndarray) -> np.ndarray:
+        """Коэффициенты Цернике Z1..Z8 для точек поля, форма (n_points, 8)"""
+        hx = np.asarray(hx, dtype=float).ravel()
+        hy = np.asarray(hy, dtype=float).ravel()
+        zernike = np.zeros((hx.size, 8))
+        zernike[:, 3] = self.field_curvature * (hx**2 + hy**2)
+        zernike[:, 4] = self.astigmatism * 2.0 * hx * hy
+        zernike[:, 5] = self.astigmatism * (hx**2 - hy**2)
+        zernike[:, 6] = self.coma * hy
+        zernike[:, 7] = self.coma * hx
+        return zernike
+
+
+class FieldGrid:
+    """
+    ФРТ на сетке точек поля зрения
+
+    Все точки поля имеют общую геометрию зрачка и отличаются только
+    коэффициентами Цернике, поэтому их волновые аберрации - одно матричное
+    произведение, а ФРТ считаются пакетными БПФ. Результат пишется в 4-мерный
+    .npy файл (ny, nx, size, size) через np.memmap, по ходу расчета собираются
+    карты числа Штреля и FWHM.
+    """
+
+    MAP_TITLES = {
+        'strehl': "Штрель",
+        'fwhm_x': "FWHM X, мкм",
+        'fwhm_y': "FWHM Y, мкм",
+        'ellipticity': "Эллиптичность",
+    }
+
+    def __init__(self):
+        self.calculator = PSFCalculator()
+
+    def compute(self, params: ParamPSF, field_x: Sequence[float], field_y: Sequence[float],
+                model: Callable[[np.ndarray, np.ndarray], np.ndarray], filename: str,
+                dtype=np.float32,
+                progress: Optional[Callable[[int, int], None]] = None,
+                is_canceled: Optional[Callable[[], bool]] = None) -> Optional[Dict[str, object]]:
+        """
+        Рассчитать сетку ФРТ и записать ее в filename (.npy)
+
+        field_x, field_y - нормированные координаты точек поля (от -1 до 1),
+        model(hx, hy) - коэффициенты Цернике для точек поля, форма (n_points, k);
+        они добавляются к аберрациям params. Возвращает сводку с картами
+        MAP_TITLES формы (ny, nx) или None при отмене. При отмене или ошибке
+        недописанный файл удаляется.
+        """
+        field_x = np.asarray(field_x, dtype=float)
+        field_y = np.asarray(field_y, dtype=float)
+        size = params.size
+        ny, nx = field_y.size, field_x.size
+        n_points = nx * ny
+
+        hx, hy = np.meshgrid(field_x, field_y)
+        field_zernike = np.atleast_2d(model(hx.ravel(), hy.ravel()))
+
+        # Общий вектор Цернике: коэффициенты строки плюс полевые
+        n_terms = max(field_zernike.shape[1], len(params.zernike))
+        zernike = np.zeros((n_points, n_terms))
+        zernike[:, :field_zernike.shape[1]] = field_zernike
+        zernike[:, :len(params.zernike)] += params.zernike
+
+        geometry = PupilGeometry.for_params(params)
+        step_microns = params.step_object * params.magnification
+
+        grid = np.lib.format.open_memmap(filename, mode='w+', dtype=dtype, shape=(ny, nx, size, size))
+        flat = grid.reshape(n_points, size, size)
+        maps = {key: np.empty(n_points) for key in self.MAP_TITLES}
+
+        chunk = max(1, PSFCalculator.BATCH_BYTES // (size * size * np.dtype(complex).itemsize))
+        completed = False
+        try:
+            for start in range(0, n_points, chunk):
+                if is_canceled is not None and is_canceled():
+                    return None
+
+                stop = min(start + chunk, n_points)
+                W = geometry.wavefront(params.defocus, params.astigmatism, zernike[start:stop])
+                psfs = PSFCalculator._psf_stack(geometry, W, params.step_pupil, params.step_object)
+                flat[start:stop] = psfs
+
+                shape = PSFMetrics.shape_metrics(psfs, step_microns)
+                for key in ('fwhm_x', 'fwhm_y', 'ellipticity'):
+                    maps[key][start:stop] = shape[key]
+                for k in range(stop - start):
+                    maps['strehl'][start + k] = self.calculator._calculate_strehl_ratio(psfs[k], params)
+
+                if progress is not None:
+                    progress(stop, n_points)
+            completed = True
+        finally:
+            grid.flush()
+            del flat, grid
+            if not completed and os.path.exists(filename):
+                os.remove(filename)
+
+        return {
+            'filename': filename,
+            'field_x': field_x,
+            'field_y': field_y,
+            'maps': {key: values.reshape(ny, nx) for key, values in maps.items()},
+        }
+
+    @staticmethod
+    def load(filename: str) -> np.ndarray:
+        """Открыть сохраненную сетку ФРТ (ny, nx, size, size) без чтения в память"""
+        return np.load(filename, mmap_mode='r')
@@ -0,0 +1,313 @@
+import threading
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+from core.fft_calculator import FFT
+from core.psf_metrics import PSFMetrics
+
+
+class TestObjects:
+    """Тестовые объекты для моделирования изображения"""
+
+    @staticmethod
+    def usaf_target(size: int = 1024) -> np.ndarray:
+        """
+        Упрощенная мира USAF-1951: группы из трех горизонтальных и трех
+        вертикальных штрихов, ширина штриха уменьшается в 2^(1/6) раз от элемента
+        к элементу. Светлые штрихи (1) на темном фоне (0).
+        """
+        image = np.zeros((size, size))
+        margin = size // 32
+        width = max(size / 40.0, 1.0)  # ширина штриха самого крупного элемента
+        x, y = margin, margin
+        row_height = 0
+
+        while width >= 1.0:
+            bar = int(round(width))
+            length = 5 * bar
+            element = 2 * length + 2 * bar  # горизонтальные + промежуток + вертикальные
+            if x + element > size - margin:
+                x = margin
+                y += row_height + 2 * bar
+                row_height = 0
+            if y + length > size - margin:
+                break
+
+            for k in range(3):
+                # Горизонтальные штрихи
+                top = y + 2 * k * bar
+                image[top:top + bar, x:x + length] = 1.0
+                # Вертикальные штрихи
+                left = x + length + 2 * bar + 2 * k * bar
+                image[y:y + length, left:left + bar] = 1.0
+
+            x += element + 2 * bar
+            row_height = max(row_height, length)
+            width /= 2.0 ** (1.0 / 6.0)
+
+        return image
+
+    @staticmethod
+    def star_field(size: int = 1024, n_stars: int = 500, seed: Optional[int] = None) -> np.ndarray:
+        """Точечные источники случайной яркости (распределение звездных величин)"""
+        rng = np.random.default_rng(seed)
+        image = np.zeros((size, size))
+        rows = rng.integers(0, size, n_stars)
+        cols = rng.integers(0, size, n_stars)
+        # Яркость по степенному закону: слабых звезд больше, чем ярких
+        np.add.at(image, (rows, cols), rng.pareto(1.5, n_stars) + 1.0)
+        return image / image.max()
+
+    @staticmethod
+    def load_image(filename: str) -> np.ndarray:
+        """Загрузить изображение (PNG и др.) в оттенках серого, значения от 0 до 1"""
+        from PIL import Image
+
+        with Image.open(filename) as image:
+            data = np.asarray(image.convert('F'), dtype=float)
+        peak = data.max()
+        return data / peak if peak > 0 else data
+
+
+class ImageSimulator:
+    """
+    Моделирование изображения: свертка объекта с ФРТ методом overlap-add
+
+    Объект разбивается на квадратные блоки, каждый блок сворачивается с ФРТ
+    через rfft2 размера next_fast_len(блок + ядро - 1), результаты складываются
+    с перекрытием. Спектр ФРТ считается один раз на размер блока и кэшируется,
+    блоки обрабатываются пулом потоков (scipy.fft отпускает GIL).
+    Объект и ФРТ считаются заданными с одинаковым шагом.
+    """
+
+    DEFAULT_TILE = 512
+    KERNEL_ENERGY = 0.9999  # доля энергии ФРТ, сохраняемая при обрезке ядра
+    CACHE_SIZE = 4
+
+    def __init__(self, tile_size: int = DEFAULT_TILE, workers: Optional[int] = None):
+        self.tile_size = tile_size
+        self.workers = workers if workers else FFT.cpu_count()
+        self._spectrum_cache: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    @classmethod
+    def crop_kernel(cls, psf: np.ndarray, energy: float = KERNEL_ENERGY) -> np.ndarray:
+        """Центральная часть ФРТ, содержащая заданную долю энергии"""
+        size = psf.shape[-1]
+        half_width = float(PSFMetrics.es_half_width(psf, energy))
+        half = min(int(np.ceil(half_width)), size // 2)
+        center = size // 2
+        return psf[center - half:center + half + 1, center - half:center + half + 1]
+
+    def _kernel_spectrum(self, kernel: np.ndarray, fft_shape: Tuple[int, int]) -> np.ndarray:
+        """Спектр ядра для данного размера БПФ (из кэша)"""
+        key = (fft_shape, kernel.shape, hash(kernel.tobytes()))
+        with self._cache_lock:
+            spectrum = self._spectrum_cache.get(key)
+            if spectrum is not None:
+                self._spectrum_cache.move_to_end(key)
+                return spectrum
+
+        spectrum = FFT.rfft2(kernel, fft_shape)
+        with self._cache_lock:
+            self._spectrum_cache[key] = spectrum
+            while len(self._spectrum_cache) > self.CACHE_SIZE:
+                self._spectrum_cache.popitem(last=False)
+        return spectrum
+
+    def tile_count(self, shape: Tuple[int, int]) -> int:
+        """Число блоков для изображения заданного размера"""
+        return int(np.ceil(shape[0] / self.tile_size) * np.ceil(shape[1] / self.tile_size))
+
+    def convolve(self, image: np.ndarray, psf: np.ndarray,
+                 progress: Optional[Callable[[int, int], None]] = None,
+                 is_canceled: Optional[Callable[[], bool]] = None) -> Optional[np.ndarray]:
+        """
+        Изображение объекта image через ФРТ psf (размер как у image)
+
+        ФРТ нормируется на сумму 1 и обрезается до KERNEL_ENERGY энергии.
+        progress(done, total) вызывается по мере готовности блоков,
+        is_canceled() прерывает расчет (возвращается None).
+        """
+        kernel = self.crop_kernel(psf / psf.sum())
+        return self.convolve_kernel(image, kernel, progress=progress, is_canceled=is_canceled)
+
+    def convolve_kernel(self, image: np.ndarray, kernel: np.ndarray,
+                        weight: Optional[Callable[[int, int, int, int], np.ndarray]] = None,
+                        out: Optional[np.ndarray] = None,
+                        progress: Optional[Callable[[int, int], None]] = None,
+                        is_canceled: Optional[Callable[[], bool]] = None) -> Optional[np.ndarray]:
+        """
+        Свертка image с ядром kernel (центр ядра - пиксель (rows // 2, cols // 2))
+
+        weight(r0, r1, c0, c1) - необязательный множитель объекта для блока
+        image[r0:r1, c0:c1]; он вычисляется по блокам, поэтому полноразмерное
+        взвешенное изображение не создается. При заданном out результат
+        прибавляется к нему.
+        """
+        k_rows, k_cols = kernel.shape
+        tile = self.tile_size
+        fft_shape = (FFT.next_fast_len(tile + k_rows - 1), FFT.next_fast_len(tile + k_cols - 1))
+        spectrum = self._kernel_spectrum(kernel, fft_shape)
+
+        rows, cols = image.shape
+        # Полная свертка, затем вырезаем область размера изображения
+        full = np.zeros((rows + k_rows - 1, cols + k_cols - 1))
+        tiles = [(r, c) for r in range(0, rows, tile) for c in range(0, cols, tile)]
+        # Параллельность - по блокам: многопоточное БПФ внутри каждого потока
+        # пула дало бы workers * число ядер потоков
+        fft_workers = 1 if self.workers > 1 else None
+
+        def convolve_tile(origin):
+            if is_canceled is not None and is_canceled():
+                return origin, None
+            r, c = origin
+            block = image[r:r + tile, c:c + tile]
+            if weight is not None:
+                block = block * weight(r, r + block.shape[0], c, c + block.shape[1])
+            spectrum_block = FFT.rfft2(block, fft_shape, workers=fft_workers)
+            result = FFT.irfft2(spectrum_block * spectrum, fft_shape, workers=fft_workers)
+            return origin, result[:block.shape[0] + k_rows - 1, :block.shape[1] + k_cols - 1]
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for done, ((r, c), result) in enumerate(executor.map(convolve_tile, tiles), 1):
+                if result is None:
+                    return None
+                # Сложение с перекрытием - только в этом потоке
+                full[r:r + result.shape[0], c:c + result.shape[1]] += result
+                if progress is not None:
+                    progress(done, len(tiles))
+
+        top, left = k_rows // 2, k_cols // 2
+        if out is None:
+            return full[top:top + rows, left:left + cols]
+        out += full[top:top + rows, left:left + cols]
+        return out
+
+
+class SpatiallyVariantSimulator:
+    """
+    Моделирование изображения с ФРТ, меняющейся по полю зрения
+
+    Сетка ФРТ (ny, nx, size, size) раскладывается по сингулярным векторам:
+    h(x; ξ) ≈ Σ_k w_k(ξ) b_k(x), где b_k - K базисных ядер, w_k - их веса
+    в точках сетки. Изображение считается как Σ_k (o · w_k) ⊛ b_k, то есть
+    K сверток overlap-add вместо свертки на каждый участок поля. Веса между
+    точками сетки интерполируются билинейно и вычисляются по блокам.
+    """
+
+    KERNEL_ENERGY = 0.999  # доля энергии, по которой обрезаются ядра сетки
+    OVERSAMPLING = 8       # запас столбцов рандомизированного SVD
+    POWER_ITERATIONS = 2
+
+    def __init__(self, rank: int = 4, simulator: Optional[ImageSimulator] = None):
+        self.rank = rank
+        self.simulator = simulator if simulator else ImageSimulator()
+        self.basis: Optional[np.ndarray] = None         # (K, m, m)
+        self.coefficients: Optional[np.ndarray] = None  # (ny, nx, K)
+        self.singular_values: Optional[np.ndarray] = None
+        self.field_x: Optional[np.ndarray] = None
+        self.field_y: Optional[np.ndarray] = None
+
+    def decompose(self, psf_grid: np.ndarray, field_x: np.ndarray, field_y: np.ndarray) -> float:
+        """
+        Разложить сетку ФРТ на rank базисных ядер
+
+        Все ФРТ нормируются на сумму 1 и обрезаются до общего окна, содержащего
+        KERNEL_ENERGY энергии самой широкой из них. Разложение - рандомизированный
+        SVD (нужны только первые K векторов), сетка читается по одной строке,
+        поэтому memmap-файл FieldGrid целиком в память не загружается.
+        Возвращает долю энергии сетки, описанную базисом.
+        """
+        ny, nx, size, _ = psf_grid.shape
+        n_points = ny * nx
+
+        half = 0
+        for iy in range(ny):
+            row = np.asarray(psf_grid[iy], dtype=float)
+            row = row / row.sum(axis=(-2, -1), keepdims=True)  # не менять сетку вызывающего
+            half = max(half, int(np.ceil(np.max(PSFMetrics.es_half_width(row, self.KERNEL_ENERGY)))))
+        half = min(half, size // 2)
+        center = size // 2
+        window = slice(center - half, min(center + half + 1, size))
+
+        A = np.empty((n_points, (window.stop - window.start) ** 2), dtype=np.float32)
+        for iy in range(ny):
+            row = np.asarray(psf_grid[iy, :, window, window], dtype=np.float32)
+            A[iy * nx:(iy + 1) * nx] = row.reshape(nx, -1) / row.sum(axis=(-2, -1))[:, None]
+
+        rank = min(self.rank, n_points)
+        rng = np.random.default_rng(0)
+        Y = A @ rng.standard_normal((A.shape[1], min(rank + self.OVERSAMPLING, n_points))).astype(np.float32)
+        for _ in range(self.POWER_ITERATIONS):
+            Y = A @ (A.T @ np.linalg.qr(Y)[0])
+        Q = np.linalg.qr(Y)[0]
+        U_small, singular_values, Vt = np.linalg.svd(Q.T @ A, full_matrices=False)
+        U = Q @ U_small
+
+        m = window.stop - window.start
+        self.basis = Vt[:rank].astype(float).reshape(rank, m, m)
+        self.coefficients = (U[:, :rank] * singular_values[:rank]).reshape(ny, nx, rank).astype(float)
+        self.singular_values = singular_values[:rank]
+        self.field_x = np.asarray(field_x, dtype=float)
+        self.field_y = np.asarray(field_y, dtype=float)
+
+        total_energy = float(np.sum(A.astype(float) ** 2))
+        return float(np.sum(self.singular_values ** 2)) / total_energy if total_energy > 0 else 0.0
+
+    @staticmethod
+    def _grid_position(field: np.ndarray, coordinate: np.ndarray):
+        """Индекс узла и доля расстояния до следующего узла для координат поля"""
+        position = np.interp(coordinate, field, np.arange(field.size))
+        index = np.clip(np.floor(position).astype(int), 0, max(field.size - 2, 0))
+        return index, position - index
+
+    def _weight(self, k: int, shape: Tuple[int, int]) -> Callable[[int, int, int, int], np.ndarray]:
+        """Билинейная карта веса ядра k по блокам изображения размера shape"""
+        rows, cols = shape
+        hy = np.linspace(-1.0, 1.0, rows) if rows > 1 else np.zeros(1)
+        hx = np.linspace(-1.0, 1.0, cols) if cols > 1 else np.zeros(1)
+        iy, ty = self._grid_position(self.field_y, hy)
+        ix, tx = self._grid_position(self.field_x, hx)
+        grid = self.coefficients[..., k]
+        if grid.shape[0] == 1:
+            grid = np.vstack((grid, grid))
+        if grid.shape[1] == 1:
+            grid = np.hstack((grid, grid))
+
+        def weight(r0, r1, c0, c1):
+            y0, fy = iy[r0:r1, None], ty[r0:r1, None]
+            x0, fx = ix[None, c0:c1], tx[None, c0:c1]
+            return ((1 - fy) * ((1 - fx) * grid[y0, x0] + fx * grid[y0, x0 + 1])
+                    + fy * ((1 - fx) * grid[y0 + 1, x0] + fx * grid[y0 + 1, x0 + 1]))
+
+        return weight
+
+    def tile_count(self, shape: Tuple[int, int]) -> int:
+        """Число блочных сверток для изображения заданного размера"""
+        # После decompose ядер может быть меньше rank (мало точек сетки)
+        n_kernels = self.basis.shape[0] if self.basis is not None else self.rank
+        return n_kernels * self.simulator.tile_count(shape)
+
+    def convolve(self, image: np.ndarray,
+                 progress: Optional[Callable[[int, int], None]] = None,
+                 is_canceled: Optional[Callable[[], bool]] = None) -> Optional[np.ndarray]:
+        """Изображение объекта image (поле зрения - все изображение) после decompose"""
+        if self.basis is None:
+            raise ValueError("Сначала выполните decompose для сетки ФРТ")
+
+        out = np.zeros(image.shape)
+        tiles = self.simulator.tile_count(image.shape)
+        total = self.tile_count(image.shape)
+        for k in range(self.basis.shape[0]):
+            step_progress = None
+            if progress is not None:
+                step_progress = lambda done, _, k=k: progress(k * tiles + done, total)
+            result = self.simulator.convolve_kernel(
+                image, self.basis[k], weight=self._weight(k, image.shape), out=out,
+                progress=step_progress, is_canceled=is_canceled
+            )
+            if result is None:
+                return None
+        return out
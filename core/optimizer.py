@@ -0,0 +1,184 @@
+import numpy as np
+from dataclasses import dataclass, field, replace
+from typing import Callable, List, Optional, Sequence, Tuple
+from scipy import optimize
+from core.psf_params import ParamPSF
+from core.psf_calculator import PSFCalculator
+from core.psf_metrics import PSFMetrics
+from core.pupil_geometry import PupilGeometry
+from core.zernike import Zernike
+
+
+class _Canceled(Exception):
+    """Прерывание оптимизатора scipy по запросу отмены"""
+
+
+@dataclass
+class OptimizationResult:
+    """Результат поиска оптимальных параметров"""
+    params: ParamPSF                       # параметры в найденной точке
+    value: float                           # значение критерия в найденной точке
+    strehl: float                          # число Штреля по полной ФРТ (как в таблице)
+    evaluations: int
+    converged: bool
+    history: List[Tuple[np.ndarray, float]] = field(default_factory=list)
+
+
+class PSFOptimizer:
+    """
+    Поиск параметров аберраций, оптимизирующих метрику ФРТ
+
+    Волновой фронт линеен по расфокусировке, астигматизму и коэффициентам
+    Цернике, поэтому каждая оценка - W0 + B·Δx на пикселях апертуры. Для числа
+    Штреля ФРТ не строится: интенсивность в центре по отношению к безаберрационной
+    равна |<exp(2πiW)>|² по апертуре. Для EE80 и FWHM считается одна ФРТ тем же
+    путем, что в PSFCalculator. Одномерные задачи решаются методом Брента на
+    отрезке, многомерные - методом Нелдера-Мида с границами.
+    """
+
+    # ключ: (название, максимизировать)
+    OBJECTIVES = {
+        'strehl': ("Число Штреля", True),
+        'ee80': ("Радиус EE80, мкм", False),
+        'fwhm': ("FWHM, мкм", False),
+    }
+
+    BASE_FIELDS = {
+        'defocus': "Расфокусировка, λ",
+        'astigmatism': "Астигматизм, λ",
+    }
+
+    def __init__(self, objective: str = 'strehl', x_tolerance: float = 1e-4, max_evaluations: int = 500):
+        if objective not in self.OBJECTIVES:
+            raise ValueError(f"Неизвестный критерий: {objective}")
+        self.objective = objective
+        self.x_tolerance = x_tolerance
+        self.max_evaluations = max_evaluations
+
+    @classmethod
+    def field_title(cls, name: str) -> str:
+        """Подпись оптимизируемого параметра ('defocus', 'astigmatism' или 'Z<j>')"""
+        if name in cls.BASE_FIELDS:
+            return cls.BASE_FIELDS[name]
+        return f"{Zernike.title(Zernike.noll_index(name))}, λ"
+
+    @classmethod
+    def get_value(cls, params: ParamPSF, name: str) -> float:
+        """Текущее значение оптимизируемого параметра"""
+        if name in cls.BASE_FIELDS:
+            return float(getattr(params, name))
+        j = Zernike.noll_index(name)
+        return float(params.zernike[j - 1]) if j <= len(params.zernike) else 0.0
+
+    @classmethod
+    def with_values(cls, params: ParamPSF, names: Sequence[str], values: Sequence[float]) -> ParamPSF:
+        """Копия params с заданными значениями оптимизируемых параметров"""
+        changes, terms = {}, {}
+        for name, value in zip(names, values):
+            if name in cls.BASE_FIELDS:
+                changes[name] = float(value)
+            else:
+                terms[Zernike.noll_index(name)] = value
+        return replace(params, zernike=Zernike.with_terms(params.zernike, terms), **changes)
+
+    @classmethod
+    def directions(cls, geometry: PupilGeometry, names: Sequence[str]) -> np.ndarray:
+        """Вклад единичного изменения каждого параметра в W, форма (p, n_pixels)"""
+        n_terms = max([Zernike.noll_index(n) for n in names if n not in cls.BASE_FIELDS], default=0)
+        basis = geometry.zernike_basis(n_terms) if n_terms else None
+        rows = []
+        for name in names:
+            if name == 'defocus':
+                rows.append(2.0 * geometry.rho2 - 1.0)
+            elif name == 'astigmatism':
+                rows.append(geometry.rho2 * geometry.cos2phi)
+            else:
+                rows.append(basis[Zernike.noll_index(name) - 1])
+        return np.array(rows)
+
+    def evaluator(self, params: ParamPSF, names: Sequence[str]) -> Callable[[np.ndarray], float]:
+        """Функция значения критерия от вектора параметров names"""
+        geometry = PupilGeometry.for_params(params)
+        x0 = np.array([self.get_value(params, name) for name in names])
+        W0 = geometry.wavefront(params.defocus, params.astigmatism, params.zernike)
+        directions = self.directions(geometry, names)
+        step_microns = params.step_object * params.magnification
+
+        if self.objective == 'strehl':
+            def evaluate(x):
+                W = W0 + (np.asarray(x) - x0) @ directions
+                return float(np.abs(np.mean(np.exp(2j * np.pi * W))) ** 2)
+            return evaluate
+
+        keys = ['ee80'] if self.objective == 'ee80' else ['fwhm_x', 'fwhm_y']
+
+        def evaluate(x):
+            W = W0 + (np.asarray(x) - x0) @ directions
+            psf = PSFCalculator._psf_stack(geometry, W[None], params.step_pupil, params.step_object)[0]
+            metrics = PSFMetrics.compute(psf, step_microns, keys)
+            return float(np.mean([metrics[key] for key in keys]))
+        return evaluate
+
+    def optimize(self, params: ParamPSF, names: Sequence[str], bounds: Sequence[Tuple[float, float]],
+                 callback: Optional[Callable[[int, np.ndarray, float], None]] = None,
+                 is_canceled: Optional[Callable[[], bool]] = None) -> Optional[OptimizationResult]:
+        """
+        Найти оптимум критерия по параметрам names в границах bounds
+
+        names - 'defocus', 'astigmatism' или 'Z<j>'. Начальная точка - значения
+        params (ограниченные границами). callback(n, x, value) вызывается после
+        каждой оценки. Возвращает None при отмене.
+        """
+        names = list(names)
+        if not names:
+            raise ValueError("Не выбраны параметры для оптимизации")
+        bounds = np.asarray(bounds, dtype=float).reshape(len(names), 2)
+        evaluate = self.evaluator(params, names)
+        sign = -1.0 if self.OBJECTIVES[self.objective][1] else 1.0
+        history = []
+
+        def target(x):
+            if is_canceled is not None and is_canceled():
+                raise _Canceled()
+            x = np.atleast_1d(np.asarray(x, dtype=float)).copy()
+            value = evaluate(x)
+            if not np.isfinite(value):
+                value = np.inf if sign > 0 else -np.inf
+            history.append((x, value))
+            if callback is not None:
+                callback(len(history), x, value)
+            return sign * value
+
+        try:
+            if len(names) == 1:
+                solution = optimize.minimize_scalar(
+                    target, bounds=tuple(bounds[0]), method='bounded',
+                    options={'xatol': self.x_tolerance, 'maxiter': self.max_evaluations}
+                )
+                x_best = np.atleast_1d(solution.x)
+            else:
+                x0 = np.clip([self.get_value(params, name) for name in names], bounds[:, 0], bounds[:, 1])
+                # Начальный симплекс - 10% диапазона по каждой оси (по умолчанию 5% от x0, а x0 часто 0),
+                # шаг направлен от ближней границы, чтобы симплекс не вырождался
+                steps = 0.1 * (bounds[:, 1] - bounds[:, 0])
+                steps = np.where(x0 + steps > bounds[:, 1], -steps, steps)
+                simplex = np.vstack([x0] + [x0 + steps[i] * np.eye(len(names))[i] for i in range(len(names))])
+                solution = optimize.minimize(
+                    target, x0, method='Nelder-Mead', bounds=bounds,
+                    options={'xatol': self.x_tolerance, 'fatol': 1e-10, 'maxfev': self.max_evaluations,
+                             'initial_simplex': simplex}
+                )
+                x_best = np.asarray(solution.x)
+        except _Canceled:
+            return None
+
+        best_params = self.with_values(params, names, x_best)
+        _, strehl = PSFCalculator().compute(best_params)
+        return OptimizationResult(
+            params=best_params,
+            value=float(evaluate(x_best)),
+            strehl=float(strehl),
+            evaluations=len(history),
+            converged=bool(solution.success),
+            history=history,
+        )
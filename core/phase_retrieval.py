@@ -0,0 +1,187 @@
+import time
+import numpy as np
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence, Tuple
+from core.fft_calculator import FFT
+from core.psf_params import ParamPSF
+from core.pupil_geometry import PupilGeometry
+
+
+@dataclass
+class PhaseRetrievalResult:
+    """Результат восстановления фазы зрачка"""
+    wavefront: np.ndarray          # волновой фронт (size, size) в λ, NaN вне апертуры
+    zernike: Tuple[float, ...]     # аппроксимация по Ноллу (Z1, Z2, ...), СКО в λ
+    amplitude: np.ndarray          # амплитуда на пикселях апертуры
+    errors: np.ndarray             # ошибка согласования с измерениями по итерациям
+    iteration_times: np.ndarray    # время каждой итерации, с
+    converged: bool
+
+    @property
+    def iterations(self) -> int:
+        return self.errors.size
+
+    @property
+    def rms(self) -> float:
+        """СКО волнового фронта (λ) без поршня"""
+        values = self.wavefront[np.isfinite(self.wavefront)]
+        return float(np.sqrt(np.mean((values - values.mean()) ** 2))) if values.size else 0.0
+
+
+class PhaseRetrieval:
+    """
+    Восстановление фазы зрачка по измеренным ФРТ (Гершберг-Сакстон / error reduction)
+
+    Модель прямого распространения та же, что в PSFCalculator: зрачок на сетке
+    PupilGeometry и ifft2. Изображения с разной расфокусировкой (фазовое
+    разнообразие) обрабатываются одним пакетным БПФ. Буферы выделяются один раз,
+    измерения переводятся в порядок БПФ заранее, поэтому fftshift в цикле нет;
+    БПФ вызываются с overwrite_x, и scipy переиспользует входной массив.
+    """
+
+    ZERNIKE_TERMS = 15
+    EPSILON = 1e-12
+
+    def __init__(self, max_iterations: int = 200, tolerance: float = 1e-5,
+                 estimate_amplitude: bool = False, dtype=np.complex64):
+        self.max_iterations = max_iterations
+        self.tolerance = tolerance
+        self.estimate_amplitude = estimate_amplitude
+        self.dtype = dtype
+
+    def retrieve(self, measured: np.ndarray, params: ParamPSF, diversity: Sequence[float],
+                 progress: Optional[Callable[[int, int], None]] = None,
+                 is_canceled: Optional[Callable[[], bool]] = None) -> Optional[PhaseRetrievalResult]:
+        """
+        Восстановить волновой фронт по изображениям measured (n, size, size)
+
+        diversity - известная расфокусировка каждого изображения (в λ, как
+        params.defocus), добавляемая к искомому фронту. Начальное приближение -
+        волновой фронт params. Итерации останавливаются, когда относительное
+        уменьшение ошибки меньше tolerance. Возвращает None при отмене.
+        """
+        measured = np.asarray(measured, dtype=float)
+        if measured.ndim == 2:
+            measured = measured[None]
+        diversity = np.asarray(diversity, dtype=float).ravel()
+        n_images, size = measured.shape[0], measured.shape[-1]
+        if measured.shape[1:] != (params.size, params.size):
+            raise ValueError(f"Размер изображений {measured.shape[1:]} не совпадает с размером ФРТ {params.size}")
+        if diversity.size != n_images:
+            raise ValueError(f"Задано {diversity.size} значений расфокусировки для {n_images} изображений")
+
+        geometry = PupilGeometry.for_params(params)
+        index = geometry.shifted_index
+        real_dtype = np.finfo(self.dtype).dtype
+
+        # Целевые амплитуды в порядке БПФ, энергия как у поля единичного зрачка
+        energy = geometry.n_pixels / float(size * size)
+        target = np.sqrt(np.clip(measured, 0.0, None) / measured.sum(axis=(-2, -1), keepdims=True) * energy)
+        target = FFT.ifftshift(target, axes=(-2, -1)).astype(real_dtype)
+        target_norm = np.sum(target ** 2, axis=(-2, -1))
+
+        # Фазовые множители разнообразия на пикселях апертуры
+        diversity_phasor = np.exp(
+            1j * 2.0 * np.pi * diversity[:, None] * (2.0 * geometry.rho2[None, :] - 1.0)
+        ).astype(self.dtype)
+
+        phase = 2.0 * np.pi * geometry.wavefront(params.defocus, params.astigmatism, params.zernike)
+        amplitude = np.ones(geometry.n_pixels)
+
+        buffer = np.zeros((n_images, size, size), dtype=self.dtype)
+        magnitude = np.empty((n_images, size, size), dtype=real_dtype)
+        errors, times = [], []
+        converged = False
+
+        for iteration in range(self.max_iterations):
+            if is_canceled is not None and is_canceled():
+                return None
+            start = time.perf_counter()
+
+            # Ограничение в зрачке: известная апертура и текущая фаза
+            pupil = (amplitude * np.exp(1j * phase)).astype(self.dtype)
+            flat = buffer.reshape(n_images, -1)
+            flat.fill(0)
+            flat[:, index] = pupil[None, :] * diversity_phasor
+
+            # Ограничение в изображении: модуль поля равен измеренному
+            field = FFT.ifft2(buffer, axes=(-2, -1), overwrite_x=True)
+            np.abs(field, out=magnitude)
+            residual = np.sum((magnitude - target) ** 2, axis=(-2, -1))
+            errors.append(float(np.mean(np.sqrt(residual / target_norm))))
+            np.maximum(magnitude, self.EPSILON, out=magnitude)
+            np.divide(target, magnitude, out=magnitude)
+            field *= magnitude
+
+            # Обратно в зрачок, снять разнообразие и усреднить оценки
+            buffer = FFT.fft2(field, axes=(-2, -1), overwrite_x=True)
+            estimate = np.sum(buffer.reshape(n_images, -1)[:, index] * diversity_phasor.conj(), axis=0)
+            phase = np.angle(estimate).astype(float)
+            if self.estimate_amplitude:
+                amplitude = np.abs(estimate) / n_images
+                amplitude /= np.sqrt(np.mean(amplitude ** 2)) if amplitude.any() else 1.0
+
+            times.append(time.perf_counter() - start)
+            if progress is not None:
+                progress(iteration + 1, self.max_iterations)
+
+            if len(errors) > 1 and errors[-2] - errors[-1] < self.tolerance * errors[-2]:
+                converged = True
+                break
+
+        return self._result(geometry, phase, amplitude, errors, times, converged)
+
+    def _result(self, geometry: PupilGeometry, phase: np.ndarray, amplitude: np.ndarray,
+                errors, times, converged: bool) -> PhaseRetrievalResult:
+        """Волновой фронт без поршня и его разложение по Цернике"""
+        basis = geometry.zernike_basis(self.ZERNIKE_TERMS)
+        W = self._unwrap(geometry, phase, basis)
+        W -= W.mean()
+        coefficients = np.linalg.lstsq(basis.T, W, rcond=None)[0]
+
+        wavefront = np.full(geometry.size * geometry.size, np.nan)
+        wavefront[geometry.index] = W
+        return PhaseRetrievalResult(
+            wavefront=wavefront.reshape(geometry.size, geometry.size),
+            zernike=tuple(float(c) for c in coefficients),
+            amplitude=amplitude,
+            errors=np.asarray(errors),
+            iteration_times=np.asarray(times),
+            converged=converged,
+        )
+
+    @staticmethod
+    def _unwrap(geometry: PupilGeometry, phase: np.ndarray, basis: np.ndarray) -> np.ndarray:
+        """
+        Развернутый волновой фронт (λ) на пикселях апертуры по свернутой фазе
+
+        Разности фазы соседних пикселей апертуры сворачиваются в (-π, π] -
+        это верно, пока фронт дискретизован без наложения. По ним методом
+        наименьших квадратов находятся коэффициенты Цернике (без поршня), а
+        остаток фазы относительно этой модели сворачивается и добавляется к
+        ней. Так коэффициенты не искажаются при размахе фронта больше λ.
+        """
+        size, index = geometry.size, geometry.index
+        position = np.full(size * size, -1)
+        position[index] = np.arange(index.size)
+
+        # Пары соседей по строке и по столбцу, оба пикселя в апертуре
+        right = index[(index % size < size - 1)]
+        right = right[position[right + 1] >= 0]
+        down = index[index < size * (size - 1)]
+        down = down[position[down + size] >= 0]
+        first = np.concatenate((position[right], position[down]))
+        second = np.concatenate((position[right + 1], position[down + size]))
+
+        wrapped = phase / (2.0 * np.pi)
+        if first.size == 0:
+            return np.angle(np.exp(1j * phase)) / (2.0 * np.pi)
+        differences = wrapped[second] - wrapped[first]
+        differences -= np.round(differences)
+        gradient_basis = (basis[1:, second] - basis[1:, first]).T
+        coefficients = np.linalg.lstsq(gradient_basis, differences, rcond=None)[0]
+
+        model = coefficients @ basis[1:]
+        residual = wrapped - model
+        residual -= np.round(residual - np.median(residual))
+        return model + residual
@@ -0,0 +1,54 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, Iterable, Iterator, Optional
+from core.fft_calculator import FFT
+
+
+def process_map(function: Callable, tasks: Iterable[tuple], workers: int, ordered: bool = True,
+                is_canceled: Optional[Callable[[], bool]] = None) -> Iterator:
+    """
+    Результаты function(*task) для задач из tasks, посчитанные в пуле процессов
+
+    Задачи забираются из tasks лениво: в работе и в ожидании выдачи не больше
+    двух задач на процесс, поэтому следующие задачи создаются только после
+    того, как потребитель забрал готовые результаты. ordered=False выдает
+    результаты в порядке готовности. После is_canceled() или закрытия
+    генератора еще не начатые задачи отменяются.
+
+    Процессы запускаются через spawn с однопоточным БПФ - параллельность дают
+    сами процессы. function должна быть функцией уровня модуля, а в скриптах
+    вызов должен находиться под if __name__ == '__main__'.
+    """
+    context = multiprocessing.get_context('spawn')
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                   initializer=FFT.set_workers, initargs=(1,))
+    try:
+        tasks = iter(tasks)
+        pending = {}  # future задачи в работе: номер задачи
+        finished: Dict[int, object] = {}  # готовые результаты, ожидающие выдачи
+        submitted, next_index, exhausted = 0, 0, False
+        while pending or finished or not exhausted:
+            while not exhausted and len(pending) + len(finished) < 2 * workers:
+                task = next(tasks, None)
+                if task is None:
+                    exhausted = True
+                    break
+                pending[executor.submit(function, *task)] = submitted
+                submitted += 1
+
+            if pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finished[pending.pop(future)] = future.result()
+            if is_canceled is not None and is_canceled():
+                return
+
+            if ordered:
+                while next_index in finished:
+                    yield finished.pop(next_index)
+                    next_index += 1
+            else:
+                for index in list(finished):
+                    yield finished.pop(index)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
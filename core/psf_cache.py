@@ -0,0 +1,91 @@
+import threading
+import numpy as np
+from collections import OrderedDict
+from dataclasses import astuple
+from typing import Optional, Tuple
+from core.psf_params import ParamPSF
+
+
+class PSFCache:
+    """
+    Кэш рассчитанных ФРТ с ограничением по памяти
+
+    Ключ - полный набор параметров ParamPSF, поэтому измененная строка
+    таблицы просто не находится в кэше. Вытесняются давно не использованные
+    записи. Доступ потокобезопасен.
+    """
+
+    def __init__(self, budget_bytes: int = 256 * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self._entries: "OrderedDict[tuple, Tuple[np.ndarray, float]]" = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(params: ParamPSF) -> tuple:
+        """Ключ кэша для набора параметров"""
+        return astuple(params)
+
+    @staticmethod
+    def estimate_nbytes(params: ParamPSF) -> int:
+        """Оценка объема памяти ФРТ для заданных параметров"""
+        return params.size * params.size * np.dtype(float).itemsize
+
+    @property
+    def nbytes(self) -> int:
+        """Текущий объем кэша в байтах"""
+        return self._nbytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, params: ParamPSF) -> bool:
+        with self._lock:
+            return self.key(params) in self._entries
+
+    def get(self, params: ParamPSF) -> Optional[Tuple[np.ndarray, float]]:
+        """Получить (psf, strehl_ratio) из кэша или None"""
+        key = self.key(params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, params: ParamPSF, psf: np.ndarray, strehl_ratio: float, evict: bool = True) -> bool:
+        """
+        Сохранить ФРТ в кэше
+
+        При evict=False запись добавляется только если она помещается в бюджет
+        без вытеснения других (так работает фоновая предзагрузка).
+        Возвращает True, если запись сохранена.
+        """
+        key = self.key(params)
+        nbytes = psf.nbytes
+        if nbytes > self.budget_bytes:
+            return False
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._nbytes -= old[0].nbytes
+
+            if not evict and self._nbytes + nbytes > self.budget_bytes:
+                if old is not None:
+                    self._entries[key] = old
+                    self._nbytes += old[0].nbytes
+                return False
+
+            while self._entries and self._nbytes + nbytes > self.budget_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._nbytes -= evicted.nbytes
+
+            self._entries[key] = (psf, strehl_ratio)
+            self._nbytes += nbytes
+            return True
+
+    def clear(self):
+        """Очистить кэш"""
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
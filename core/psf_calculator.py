@@ -1,8 +1,15 @@
 import numpy as np
-from typing import Optional, Tuple
+from dataclasses import replace
+from typing import List, Optional, Sequence, Tuple
 from core.psf_params import ParamPSF
+from core.pupil_geometry import PupilGeometry
+from core.fft_calculator import FFT
 
 class PSFCalculator:
+    # Предельный объем комплексной пачки зрачков в одном пакетном БПФ:
+    # пачка больше кэша процессора упирается в память и не ускоряет расчет
+    BATCH_BYTES = 16 * 1024 * 1024
+
     def __init__(self):
         self.last_pupil: Optional[np.ndarray] = None
         self.last_params: Optional[ParamPSF] = None
@@ -30,14 +37,13 @@ class PSFCalculator:
             wavelength=params.wavelength,
             back_aperture=params.back_aperture,
             defocus=params.defocus,
-            astigmatism=params.astigmatism
+            astigmatism=params.astigmatism,
+            zernike=params.zernike
         )
-        self.last_pupil = pupil.copy()
+        self.last_pupil = pupil
 
         # Преобразование Фурье
-        pupil_shifted = np.fft.ifftshift(pupil)
-        field = np.fft.ifft2(pupil_shifted)
-        field = np.fft.fftshift(field)
+        field = FFT.fftshift(FFT.ifft2(FFT.ifftshift(pupil), overwrite_x=True))
 
         # Масштабирование: учитываем физический смысл преобразования
         # field уже представляет распределение поля в фокальной плоскости
@@ -45,7 +51,7 @@ class PSFCalculator:
         field *= (step_pupil / step_obj_can)
 
         # Интенсивность
-        intensity = np.abs(field) ** 2
+        intensity = field.real**2 + field.imag**2
         
         # Нормализация (сумма интенсивностей = 1)
         total_intensity = np.sum(intensity)
@@ -61,64 +67,260 @@ class PSFCalculator:
         
         return psf, self.strehl_ratio
 
-    def _calc_pupil_function(self, size, step_pupil, wavelength, back_aperture, defocus, astigmatism):
+    def compute_preview(self, params: ParamPSF, preview_size: int = 128) -> Tuple[np.ndarray, float]:
         """
-        Вычисление функции зрачка с правильным учетом всех параметров
+        Быстрый грубый расчет ФРТ для предпросмотра
         
-        Ключевые моменты:
-        1. Длина волны влияет на масштаб дифракции
-        2. Апертура определяет радиус апертуры
-        3. Defocus и astigmatism - аберрации в единицах длин волн
+        Зрачок дискретизуется на сетке preview_size x preview_size с более крупным шагом,
+        охват зрачка и шаг в плоскости изображения сохраняются. Результат совпадает
+        с центральной областью полной ФРТ в тех же физических координатах.
         """
-        # Создаем координатную сетку в плоскости зрачка
-        x = np.arange(size) - size // 2
-        y = np.arange(size) - size // 2
-        X, Y = np.meshgrid(x, y)
+        if params.size <= preview_size:
+            return self.compute(params)
         
-        # Координаты в единицах длины волны (важно для дифракции!)
-        # Нормируем на длину волны: координаты в единицах λ
-        X_norm = X * step_pupil / wavelength if wavelength > 0 else X * step_pupil
-        Y_norm = Y * step_pupil / wavelength if wavelength > 0 else Y * step_pupil
+        scale = params.size / preview_size
+        preview_params = replace(
+            params,
+            size=preview_size,
+            step_pupil=params.step_pupil * scale
+        )
+        return self.compute(preview_params)
+
+    def compute_batch(self, params_list: Sequence[ParamPSF]) -> List[Tuple[np.ndarray, float]]:
+        """
+        Расчет ФРТ для набора параметров пакетными БПФ
         
-        # Радиальная координата (в единицах λ)
-        rho = np.sqrt(X_norm**2 + Y_norm**2)
+        Строки с одинаковой геометрией зрачка (размер, шаги, λ, апертура) отличаются
+        только аберрациями, поэтому их зрачки собираются в пачку и преобразуются
+        одним вызовом БПФ по двум последним осям. Результаты совпадают с compute
+        и возвращаются в порядке params_list.
+        """
+        results: List[Optional[Tuple[np.ndarray, float]]] = [None] * len(params_list)
+        
+        groups = {}
+        for i, params in enumerate(params_list):
+            key = (params.size, params.step_pupil, params.wavelength,
+                   params.back_aperture, params.step_object)
+            groups.setdefault(key, []).append(i)
+        
+        for (size, step_pupil, wavelength, back_aperture, step_object), indices in groups.items():
+            geometry = PupilGeometry.get(size, step_pupil, wavelength, back_aperture)
+            chunk = max(1, self.BATCH_BYTES // (size * size * np.dtype(complex).itemsize))
+            
+            for start in range(0, len(indices), chunk):
+                batch = indices[start:start + chunk]
+                # Векторы Цернике разной длины дополняются нулями до общей
+                n_terms = max(len(params_list[i].zernike) for i in batch)
+                zernike = np.zeros((len(batch), n_terms))
+                for k, i in enumerate(batch):
+                    zernike[k, :len(params_list[i].zernike)] = params_list[i].zernike
+                W = geometry.wavefront(
+                    [params_list[i].defocus for i in batch],
+                    [params_list[i].astigmatism for i in batch],
+                    zernike
+                )
+                psfs = self._psf_stack(geometry, W, step_pupil, step_object)
+                
+                for k, i in enumerate(batch):
+                    psf = psfs[k]
+                    results[i] = (psf, self._calculate_strehl_ratio(psf, params_list[i]))
         
-        # Угловая координата
-        phi = np.arctan2(Y_norm, X_norm)
+        return results
+
+    def compute_focus_stack(self, params: ParamPSF, defocus_values: Sequence[float]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Серия ФРТ по фокусу: (пачка формы (n_focus, size, size), число Штреля по фокусу)
         
-        # Функция апертуры (круглая апертура)
-        # Радиус апертуры в нормированных координатах: NA / λ
-        # Где NA = back_aperture (числовая апертура)
-        if wavelength > 0:
-            aperture_radius_norm = back_aperture / wavelength
+        Геометрия зрачка строится один раз, расфокусировка params.defocus заменяется
+        значениями defocus_values и накладывается на остальные аберрации
+        broadcast-ом по пачке. Пачка преобразуется пакетными БПФ.
+        """
+        defocus_values = np.asarray(defocus_values, dtype=float)
+        size = params.size
+        geometry = PupilGeometry.for_params(params)
+        
+        stack = np.empty((defocus_values.size, size, size))
+        strehl_values = np.empty(defocus_values.size)
+        chunk = max(1, self.BATCH_BYTES // (size * size * np.dtype(complex).itemsize))
+        
+        for start in range(0, defocus_values.size, chunk):
+            defocus = defocus_values[start:start + chunk]
+            W = geometry.wavefront(defocus, params.astigmatism, params.zernike)
+            self._psf_stack(geometry, W, params.step_pupil, params.step_object,
+                            out=stack[start:start + defocus.size])
+        
+        for i in range(defocus_values.size):
+            strehl_values[i] = self._calculate_strehl_ratio(stack[i], params)
+        
+        return stack, strehl_values
+
+    @staticmethod
+    def resample_spectrum(wavelengths: Sequence[float], weights: Sequence[float],
+                          n_samples: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Свести спектр к n_samples отсчетам (регулятор точность/скорость)
+        
+        Диапазон длин волн делится на n_samples равных интервалов, каждый интервал
+        заменяется одной длиной волны (средней с весами) с суммарным весом.
+        Веса нормируются на 1. При n_samples=None спектр только нормируется.
+        """
+        wavelengths = np.asarray(wavelengths, dtype=float)
+        weights = np.asarray(weights, dtype=float)
+        if wavelengths.shape != weights.shape or wavelengths.size == 0:
+            raise ValueError("Длины волн и веса должны быть непустыми массивами одной длины")
+        if np.any(wavelengths <= 0) or np.any(weights < 0) or weights.sum() <= 0:
+            raise ValueError("Длины волн должны быть положительными, веса - неотрицательными")
+        
+        if n_samples is not None and 0 < n_samples < wavelengths.size:
+            edges = np.linspace(wavelengths.min(), wavelengths.max(), n_samples + 1)
+            bins = np.clip(np.searchsorted(edges, wavelengths, side='right') - 1, 0, n_samples - 1)
+            bin_weights = np.bincount(bins, weights=weights, minlength=n_samples)
+            bin_moments = np.bincount(bins, weights=weights * wavelengths, minlength=n_samples)
+            filled = bin_weights > 0
+            wavelengths = bin_moments[filled] / bin_weights[filled]
+            weights = bin_weights[filled]
         else:
-            aperture_radius_norm = back_aperture / 0.555  # по умолчанию для зеленого света
+            keep = weights > 0
+            wavelengths, weights = wavelengths[keep], weights[keep]
+        
+        return wavelengths, weights / weights.sum()
+
+    def compute_polychromatic(self, params: ParamPSF, wavelengths: Sequence[float], weights: Sequence[float],
+                              n_samples: Optional[int] = None) -> Tuple[np.ndarray, float]:
+        """
+        Полихроматическая ФРТ: некогерентная сумма монохроматических ФРТ с весами
+        
+        Сетка в плоскости изображения общая для всех длин волн (шаг как у params):
+        для длины волны λ шаг по зрачку берется step_pupil * λ / λ0, где λ0 = params.wavelength,
+        поэтому радиус апертуры в пикселях зрачка меняется как λ0 / λ и ФРТ каждой
+        длины волны сразу получается в нужном масштабе без передискретизации.
+        Аберрации params заданы в длинах волн λ0 (постоянная разность хода),
+        на длине волны λ они пересчитываются множителем λ0 / λ. Зрачки всех
+        отсчетов спектра собираются в пачку и преобразуются пакетными БПФ.
+        """
+        wavelengths, weights = self.resample_spectrum(wavelengths, weights, n_samples)
+        size = params.size
+        reference = params.wavelength
+        zernike = np.asarray(params.zernike, dtype=float)
+        
+        psf = np.zeros((size, size))
+        chunk = max(1, self.BATCH_BYTES // (size * size * np.dtype(complex).itemsize))
         
-        mask = rho <= aperture_radius_norm
+        for start in range(0, wavelengths.size, chunk):
+            batch = range(start, min(start + chunk, wavelengths.size))
+            pupil = np.zeros((len(batch), size * size), dtype=complex)
+            for k, i in enumerate(batch):
+                scale = reference / wavelengths[i]
+                geometry = PupilGeometry.get(size, params.step_pupil / scale, wavelengths[i], params.back_aperture)
+                W = geometry.wavefront(params.defocus * scale, params.astigmatism * scale, zernike * scale)
+                # Зрачок сразу в порядке ifftshift
+                pupil[k, geometry.shifted_index] = np.exp(1j * (2.0 * np.pi) * W)
+            
+            field = FFT.ifft2(pupil.reshape(-1, size, size), overwrite_x=True)
+            intensity = field.real**2 + field.imag**2
+            total_intensity = intensity.sum(axis=(-2, -1))
+            total_intensity[total_intensity <= 0] = 1.0
+            
+            # Взвешенная сумма нормированных ФРТ - одно свертывание по оси пачки
+            coefficients = weights[start:start + len(batch)] / total_intensity
+            psf += np.tensordot(coefficients, intensity, axes=1)
         
-        # Нормированный радиус внутри апертуры (от 0 до 1)
-        rho_norm = np.zeros_like(rho)
-        if aperture_radius_norm > 0:
-            rho_norm[mask] = rho[mask] / aperture_radius_norm
+        psf = FFT.fftshift(psf)
+        self.last_params = params
+        self.last_psf = psf
+        self.strehl_ratio = self._calculate_strehl_ratio(psf, params)
+        return psf, self.strehl_ratio
+
+    @staticmethod
+    def _psf_stack(geometry: PupilGeometry, W: np.ndarray, step_pupil: float, step_object: float,
+                   out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Нормированные ФРТ для пачки волновых аберраций W формы (n, n_pixels)"""
+        # Зрачок сразу в порядке ifftshift - без лишнего копирования пачки
+        pupil = geometry.pupil(W, shifted=True)
+        field = FFT.fftshift(FFT.ifft2(pupil, overwrite_x=True))
+        field *= (step_pupil / step_object)
         
-        # ВОЛНОВАЯ АБЕРРАЦИЯ (в единицах длин волн)
-        # Это то, что ДОЛЖНО зависеть от длины волны через ρ_norm
-        W = np.zeros_like(rho)
+        intensity = field.real**2 + field.imag**2
+        total_intensity = intensity.sum(axis=(-2, -1), keepdims=True)
+        total_intensity[total_intensity <= 0] = 1.0
+        return np.divide(intensity, total_intensity, out=intensity if out is None else out)
+
+    @staticmethod
+    def compute_otf(psf: np.ndarray) -> np.ndarray:
+        """
+        Оптическая передаточная функция по ФРТ (одиночной или пачке)
         
-        # Defocus: W = defocus * (2 * ρ^2 - 1)
-        # Astigmatism: W = astigmatism * ρ^2 * cos(2φ)
-        if np.any(mask):
-            W[mask] = (defocus * (2.0 * rho_norm[mask]**2 - 1.0) + 
-                      astigmatism * rho_norm[mask]**2 * np.cos(2.0 * phi[mask]))
+        Нулевая частота в центре, ОПФ нормирована на 1 на нулевой частоте.
+        Шаг по частоте равен 1 / (size * step_microns) лин/мкм.
+        """
+        otf = FFT.fftshift(FFT.fft2(FFT.ifftshift(psf), overwrite_x=True))
+        dc = otf[..., psf.shape[-2] // 2, psf.shape[-1] // 2][..., None, None]
+        return np.divide(otf, dc, out=otf, where=dc != 0)
+
+    @staticmethod
+    def mtf_slices(psf: np.ndarray, step_microns: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Сагиттальное и тангенциальное сечения ЧКХ: (частоты в лин/мм, MTF_s, MTF_t)
+        
+        Сечение ОПФ через нулевую частоту равно одномерному преобразованию Фурье
+        функции рассеяния линии, поэтому вместо двумерного БПФ достаточно
+        проекции ФРТ на ось и одного короткого БПФ. Сагиттальное сечение
+        берется вдоль оси x, тангенциальное - вдоль оси y.
+        """
+        size = psf.shape[-1]
+        lsf_x = psf.sum(axis=-2)
+        lsf_y = psf.sum(axis=-1)
         
-        # Фазовая задержка (в радианах) = 2π * W
-        phase = 2.0 * np.pi * W
+        mtf = np.abs(FFT.rfft(np.stack((lsf_x, lsf_y)), axis=-1))
+        dc = mtf[..., :1]
+        mtf = np.divide(mtf, dc, out=np.zeros_like(mtf), where=dc > 0)
         
-        # Функция зрачка: 1 внутри апертуры, 0 вне, с фазовым множителем
-        pupil = np.zeros((size, size), dtype=complex)
-        pupil[mask] = np.exp(1j * phase[mask])
+        step = step_microns if step_microns > 0 else 1.0
+        frequencies = np.fft.rfftfreq(size, d=step) * 1000.0
+        return frequencies, mtf[0], mtf[1]
+
+    @classmethod
+    def mtf_at(cls, psf: np.ndarray, step_microns: float,
+               frequencies: Sequence[float]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        ЧКХ на заданных частотах (лин/мм): (MTF_s, MTF_t) формы (..., len(frequencies))
         
-        return pupil
+        Значения линейно интерполируются между отсчетами, выше частоты Найквиста - nan.
+        """
+        grid, sagittal, tangential = cls.mtf_slices(psf, step_microns)
+        frequencies = np.asarray(frequencies, dtype=float)
+        
+        k = np.clip(np.searchsorted(grid, frequencies), 1, grid.size - 1)
+        t = (frequencies - grid[k - 1]) / (grid[k] - grid[k - 1])
+        outside = (frequencies < 0) | (frequencies > grid[-1])
+        
+        values = []
+        for mtf in (sagittal, tangential):
+            v = mtf[..., k - 1] * (1.0 - t) + mtf[..., k] * t
+            v[..., outside] = np.nan
+            values.append(v)
+        return values[0], values[1]
+
+    def _calc_pupil_function(self, size, step_pupil, wavelength, back_aperture, defocus, astigmatism, zernike=()):
+        """
+        Вычисление функции зрачка с правильным учетом всех параметров
+        
+        Ключевые моменты:
+        1. Длина волны влияет на масштаб дифракции
+        2. Апертура определяет радиус апертуры
+        3. Defocus и astigmatism - аберрации в единицах длин волн
+        4. zernike - коэффициенты Цернике по Ноллу (СКО в длинах волн)
+        
+        Координатная сетка и маска апертуры берутся из кэша PupilGeometry,
+        фаза вычисляется только для пикселей внутри апертуры.
+        """
+        geometry = PupilGeometry.get(size, step_pupil, wavelength, back_aperture)
+        
+        # ВОЛНОВАЯ АБЕРРАЦИЯ (в единицах длин волн), фазовая задержка = 2π * W
+        W = geometry.wavefront(defocus, astigmatism, zernike)
+        
+        # Функция зрачка: 1 внутри апертуры, 0 вне, с фазовым множителем
+        return geometry.pupil(W)
     
     def _calculate_strehl_ratio(self, psf: np.ndarray, params: ParamPSF) -> float:
         """Вычисление числа Штреля"""
@@ -0,0 +1,325 @@
+import re
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from core.psf_calculator import PSFCalculator
+
+
+class PSFMetrics:
+    """
+    Метрики ФРТ: радиальный профиль, энергия в круге и в квадрате,
+    ширина на полувысоте, центроид и вторые моменты
+
+    Все функции принимают одиночную ФРТ (size, size) или пачку (n, size, size)
+    с центром в пикселе (size // 2, size // 2), как в PSFCalculator.compute.
+    Радиальная гистограмма строится одним np.bincount по кэшированной карте
+    номеров колец для данного размера. Значения ЧКХ на заданных частотах
+    берутся из PSFCalculator.mtf_at (ключи вида 'mtf_s@500', 'mtf_t@500').
+    """
+
+    # Заголовки дополнительных колонок таблицы
+    COLUMN_TITLES = {
+        'ee50': "EE50, мкм",
+        'ee80': "EE80, мкм",
+        'es50': "ES50, мкм",
+        'es80': "ES80, мкм",
+        'fwhm_x': "FWHM X, мкм",
+        'fwhm_y': "FWHM Y, мкм",
+        'centroid_x': "Центроид X, мкм",
+        'centroid_y': "Центроид Y, мкм",
+        'sigma_x': "σX, мкм",
+        'sigma_y': "σY, мкм",
+        'ellipticity': "Эллиптичность",
+    }
+    SHAPE_KEYS = ('fwhm_x', 'fwhm_y', 'centroid_x', 'centroid_y', 'sigma_x', 'sigma_y', 'ellipticity')
+    
+    # Частоты ЧКХ по умолчанию, лин/мм
+    MTF_FREQUENCIES = [250.0, 500.0, 1000.0]
+    MTF_DIRECTIONS = {'s': "сагиттальная", 't': "тангенциальная"}
+    _MTF_KEY = re.compile(r"^mtf_([st])@([0-9.eE+-]+)$")
+
+    @staticmethod
+    def mtf_key(direction: str, frequency: float) -> str:
+        """Ключ колонки ЧКХ для направления 's'/'t' и частоты в лин/мм"""
+        return f"mtf_{direction}@{frequency:g}"
+    
+    @classmethod
+    def _parse_mtf_key(cls, key: str) -> Optional[Tuple[str, float]]:
+        """Направление и частота из ключа ЧКХ или None"""
+        match = cls._MTF_KEY.match(key)
+        if match is None:
+            return None
+        try:
+            return match.group(1), float(match.group(2))
+        except ValueError:
+            return None
+    
+    @classmethod
+    def is_metric_key(cls, key: str) -> bool:
+        """Известен ли ключ метрики"""
+        return key in cls.COLUMN_TITLES or cls._parse_mtf_key(key) is not None
+    
+    @classmethod
+    def column_title(cls, key: str) -> str:
+        """Заголовок колонки таблицы для ключа метрики"""
+        if key in cls.COLUMN_TITLES:
+            return cls.COLUMN_TITLES[key]
+        direction, frequency = cls._parse_mtf_key(key)
+        return f"MTF{direction} {frequency:g} лин/мм"
+    
+    @classmethod
+    def is_metric_title(cls, title: str) -> bool:
+        """Является ли заголовок колонки заголовком метрики"""
+        title = title.strip()
+        return title in cls.COLUMN_TITLES.values() or title.startswith("MTF")
+    
+    # Кэши карт бинов по (size, вид) и базисов моментов по size,
+    # вытесняются давно не использованные
+    _index_cache: "OrderedDict[tuple, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+    _moment_cache: "OrderedDict[int, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+    _cache_lock = threading.Lock()
+    CACHE_SIZE = 8
+
+    @classmethod
+    def _cached(cls, cache: OrderedDict, key, build: Callable[[], tuple]) -> tuple:
+        """Значение из кэша cache или построенное build (LRU на CACHE_SIZE записей)"""
+        with cls._cache_lock:
+            cached = cache.get(key)
+            if cached is not None:
+                cache.move_to_end(key)
+                return cached
+
+        value = build()
+        with cls._cache_lock:
+            cache[key] = value
+            while len(cache) > cls.CACHE_SIZE:
+                cache.popitem(last=False)
+        return value
+
+    @classmethod
+    def _bin_index(cls, size: int, kind: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Карта номеров колец (kind='radial') или квадратных рамок (kind='square')
+
+        Возвращает плоский массив номеров бинов и число пикселей в каждом бине.
+        Бин k радиальной карты содержит пиксели с расстоянием r в [k, k+1),
+        бин k квадратной карты - пиксели с max(|dx|, |dy|) = k.
+        """
+        def build():
+            coords = np.arange(size) - size // 2
+            if kind == 'radial':
+                r = np.hypot(coords[None, :], coords[:, None])
+                index = np.floor(r).astype(np.intp)
+            else:
+                index = np.maximum(np.abs(coords)[None, :], np.abs(coords)[:, None]).astype(np.intp)
+            index = index.ravel()
+            return index, np.bincount(index)
+
+        return cls._cached(cls._index_cache, (size, kind), build)
+
+    @classmethod
+    def _histogram(cls, psf: np.ndarray, kind: str) -> np.ndarray:
+        """Сумма интенсивности по бинам для одиночной ФРТ или пачки"""
+        size = psf.shape[-1]
+        index, counts = cls._bin_index(size, kind)
+        n_bins = counts.size
+
+        stack = psf.reshape(-1, size * size)
+        n = stack.shape[0]
+        if n == 1:
+            hist = np.bincount(index, weights=stack[0], minlength=n_bins)[None, :]
+        else:
+            # Одна гистограмма для всей пачки: бины каждой ФРТ сдвинуты на n_bins
+            offsets = (np.arange(n, dtype=np.intp) * n_bins)[:, None] + index[None, :]
+            hist = np.bincount(offsets.ravel(), weights=stack.ravel(),
+                               minlength=n * n_bins).reshape(n, n_bins)
+        return hist.reshape(psf.shape[:-2] + (n_bins,))
+
+    @classmethod
+    def radial_profile(cls, psf: np.ndarray, step: float = 1.0) -> Tuple[np.ndarray, np.ndarray]:
+        """Азимутально усредненный профиль: (радиусы центров колец, средняя интенсивность)"""
+        _, counts = cls._bin_index(psf.shape[-1], 'radial')
+        hist = cls._histogram(psf, 'radial')
+        radii = (np.arange(counts.size) + 0.5) * step
+        return radii, hist / counts
+
+    @classmethod
+    def _cumulative(cls, psf: np.ndarray, kind: str) -> np.ndarray:
+        """Нормированная накопленная энергия по бинам"""
+        cumulative = np.cumsum(cls._histogram(psf, kind), axis=-1)
+        total = cumulative[..., -1:]
+        return np.divide(cumulative, total, out=np.zeros_like(cumulative), where=total > 0)
+
+    @classmethod
+    def encircled_energy(cls, psf: np.ndarray, step: float = 1.0) -> Tuple[np.ndarray, np.ndarray]:
+        """Доля энергии в круге: (радиусы, доля энергии внутри радиуса)"""
+        ee = cls._cumulative(psf, 'radial')
+        radii = np.arange(1, ee.shape[-1] + 1) * step
+        return radii, ee
+
+    @classmethod
+    def ensquared_energy(cls, psf: np.ndarray, step: float = 1.0) -> Tuple[np.ndarray, np.ndarray]:
+        """Доля энергии в квадрате: (полуширины квадрата, доля энергии внутри)"""
+        es = cls._cumulative(psf, 'square')
+        half_widths = (np.arange(es.shape[-1]) + 0.5) * step
+        return half_widths, es
+
+    @staticmethod
+    def _crossing(edges: np.ndarray, cumulative: np.ndarray, fraction: float) -> np.ndarray:
+        """Радиус, на котором накопленная энергия достигает fraction (линейная интерполяция)"""
+        # Добавляем начальную точку: нулевая энергия на нулевом радиусе
+        edges = np.concatenate(([0.0], edges))
+        cumulative = np.concatenate((np.zeros(cumulative.shape[:-1] + (1,)), cumulative), axis=-1)
+
+        k = np.sum(cumulative < fraction, axis=-1)
+        k = np.clip(k, 1, edges.size - 1)
+        e_prev = np.take_along_axis(cumulative, (k - 1)[..., None], axis=-1)[..., 0]
+        e_next = np.take_along_axis(cumulative, k[..., None], axis=-1)[..., 0]
+        delta = e_next - e_prev
+        t = np.divide(fraction - e_prev, delta, out=np.zeros_like(delta), where=delta > 0)
+        return edges[k - 1] + np.clip(t, 0.0, 1.0) * (edges[k] - edges[k - 1])
+
+    @classmethod
+    def ee_radius(cls, psf: np.ndarray, fraction: float, step: float = 1.0) -> np.ndarray:
+        """Радиус круга, содержащего заданную долю энергии"""
+        radii, ee = cls.encircled_energy(psf, step)
+        return cls._crossing(radii, ee, fraction)
+
+    @classmethod
+    def es_half_width(cls, psf: np.ndarray, fraction: float, step: float = 1.0) -> np.ndarray:
+        """Полуширина квадрата, содержащего заданную долю энергии"""
+        half_widths, es = cls.ensquared_energy(psf, step)
+        return cls._crossing(half_widths, es, fraction)
+
+    @classmethod
+    def _moment_basis(cls, size: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Координаты пикселей и матрица [1, x, x^2] для расчета моментов"""
+        def build():
+            coords = (np.arange(size) - size // 2).astype(float)
+            return coords, np.stack((np.ones(size), coords, coords**2), axis=1)
+
+        return cls._cached(cls._moment_cache, size, build)
+
+    @staticmethod
+    def _half_max_width(profile: np.ndarray) -> np.ndarray:
+        """
+        Ширина профиля на полувысоте в пикселях (для пачки профилей)
+
+        От максимума в обе стороны ищется первый отсчет ниже половины максимума,
+        положение пересечения уточняется линейной интерполяцией между соседними
+        отсчетами. Если профиль не опускается до полувысоты - nan.
+        """
+        n = profile.shape[-1]
+        positions = np.arange(n)
+        peak = np.argmax(profile, axis=-1)[..., None]
+        half = np.take_along_axis(profile, peak, axis=-1) / 2.0
+        below = profile < half
+
+        # Правое пересечение: первый отсчет ниже полувысоты после максимума
+        right_mask = below & (positions > peak)
+        right = np.argmax(right_mask, axis=-1)[..., None]
+        right_found = np.take_along_axis(right_mask, right, axis=-1)
+        # Левое пересечение: последний отсчет ниже полувысоты до максимума
+        left_mask = below & (positions < peak)
+        left = n - 1 - np.argmax(left_mask[..., ::-1], axis=-1)[..., None]
+        left_found = np.take_along_axis(left_mask, left, axis=-1)
+
+        def crossing(outer, inner):
+            v_outer = np.take_along_axis(profile, outer, axis=-1)
+            v_inner = np.take_along_axis(profile, inner, axis=-1)
+            delta = v_inner - v_outer
+            t = np.divide(half - v_outer, delta, out=np.zeros_like(delta), where=delta > 0)
+            return outer + t * (inner - outer)
+
+        right_edge = crossing(right, np.maximum(right - 1, 0))
+        left_edge = crossing(left, np.minimum(left + 1, n - 1))
+        width = (right_edge - left_edge)[..., 0]
+        return np.where((right_found & left_found)[..., 0], width, np.nan)
+
+    @classmethod
+    def shape_metrics(cls, psf: np.ndarray, step: float = 1.0) -> Dict[str, np.ndarray]:
+        """
+        FWHM по X/Y, центроид, СКО и эллиптичность по ключам SHAPE_KEYS
+
+        Все моменты получаются из одного прохода по ФРТ: умножение на матрицу
+        [1, x, x^2] дает по каждой строке суммы нулевого, первого и второго
+        моментов по x, из которых сворачиваются моменты по y и смешанный момент.
+        FWHM берется по центральным сечениям, как в PSFView. Эллиптичность
+        1 - b/a определяется по собственным числам матрицы вторых моментов.
+        """
+        size = psf.shape[-1]
+        coords, basis = cls._moment_basis(size)
+
+        row_moments = psf @ basis  # (..., y, [S0, Sx, Sxx])
+        s0 = row_moments[..., 0]
+        total = s0.sum(axis=-1)
+        total = np.where(total > 0, total, 1.0)
+
+        mean_x = row_moments[..., 1].sum(axis=-1) / total
+        mean_y = (s0 @ coords) / total
+        var_x = row_moments[..., 2].sum(axis=-1) / total - mean_x**2
+        var_y = (s0 @ coords**2) / total - mean_y**2
+        cov_xy = (row_moments[..., 1] @ coords) / total - mean_x * mean_y
+        var_x = np.maximum(var_x, 0.0)
+        var_y = np.maximum(var_y, 0.0)
+
+        # Полуоси эллипса моментов
+        trace_half = (var_x + var_y) / 2.0
+        spread = np.sqrt(((var_x - var_y) / 2.0)**2 + cov_xy**2)
+        major = trace_half + spread
+        minor = np.maximum(trace_half - spread, 0.0)
+        ellipticity = 1.0 - np.sqrt(np.divide(minor, major, out=np.ones_like(major), where=major > 0))
+
+        center = size // 2
+        return {
+            'fwhm_x': cls._half_max_width(psf[..., center, :]) * step,
+            'fwhm_y': cls._half_max_width(psf[..., :, center]) * step,
+            'centroid_x': mean_x * step,
+            'centroid_y': mean_y * step,
+            'sigma_x': np.sqrt(var_x) * step,
+            'sigma_y': np.sqrt(var_y) * step,
+            'ellipticity': ellipticity,
+        }
+
+    @classmethod
+    def compute(cls, psf: np.ndarray, step: float, keys: Iterable[str]) -> Dict[str, np.ndarray]:
+        """
+        Рассчитать набор метрик по ключам (COLUMN_TITLES и ключи ЧКХ)
+
+        Для одиночной ФРТ значения - числа, для пачки - массивы формы (n,).
+        Гистограммы строятся один раз на вид (круг/квадрат).
+        """
+        keys = list(keys)
+        step = step if step > 0 else 1.0
+        results = {}
+
+        if any(k.startswith('ee') for k in keys):
+            radii, ee = cls.encircled_energy(psf, step)
+            for key in keys:
+                if key.startswith('ee'):
+                    results[key] = cls._crossing(radii, ee, int(key[2:]) / 100.0)
+
+        if any(k.startswith('es') for k in keys):
+            half_widths, es = cls.ensquared_energy(psf, step)
+            for key in keys:
+                if key.startswith('es'):
+                    results[key] = cls._crossing(half_widths, es, int(key[2:]) / 100.0)
+
+        if any(k in cls.SHAPE_KEYS for k in keys):
+            shape = cls.shape_metrics(psf, step)
+            for key in keys:
+                if key in shape:
+                    results[key] = shape[key]
+
+        mtf_keys = [(key, cls._parse_mtf_key(key)) for key in keys]
+        mtf_keys = [(key, parsed) for key, parsed in mtf_keys if parsed is not None]
+        if mtf_keys:
+            frequencies = [frequency for _, (_, frequency) in mtf_keys]
+            sagittal, tangential = PSFCalculator.mtf_at(psf, step, frequencies)
+            for i, (key, (direction, _)) in enumerate(mtf_keys):
+                results[key] = (sagittal if direction == 's' else tangential)[..., i]
+
+        if psf.ndim == 2:
+            results = {key: float(value) for key, value in results.items()}
+        return results
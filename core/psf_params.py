@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Tuple
 
 
 @dataclass
@@ -16,6 +17,9 @@ class ParamPSF:
     step_object: float = 0.13875     # к.ед.
     step_image: float = 0.13875      # к.ед.
     
+    # Коэффициенты Цернике по Ноллу (Z1, Z2, ...), СКО в длинах волн λ
+    zernike: Tuple[float, ...] = ()
+    
     def calculate_step_microns(self) -> float:
         """Вычислить шаг в микронах в плоскости изображения"""
         if self.step_image > 0 and self.wavelength > 0 and self.back_aperture > 0:
@@ -0,0 +1,107 @@
+import os
+import numpy as np
+from typing import Callable, Dict, Optional, Sequence
+from core.psf_params import ParamPSF
+from core.psf_calculator import PSFCalculator
+from core.psf_metrics import PSFMetrics
+from core.pupil_geometry import PupilGeometry
+
+
+class PSFVolume:
+    """
+    Трехмерная ФРТ вблизи фокуса методом углового спектра
+
+    Поле зрачка переносится в плоскость z умножением на exp(2πi·z·(k_z - k)):
+    для точки зрачка с нормированным радиусом ρ набег фазы в длинах волн равен
+    (z / λ) * (sqrt(n² - NA²ρ²) - n). Это точная (не параксиальная) расфокусировка.
+    Плоскости считаются пачками пакетными БПФ и сразу записываются в .npy файл,
+    открытый через np.memmap, поэтому объем целиком в памяти не хранится.
+    """
+
+    def __init__(self, immersion_index: float = 1.0):
+        self.immersion_index = immersion_index
+        self.calculator = PSFCalculator()
+
+    def propagation_phase(self, geometry: PupilGeometry, params: ParamPSF) -> np.ndarray:
+        """Набег фазы (в длинах волн) на пикселях апертуры при смещении на 1 мкм по z"""
+        n = self.immersion_index
+        if params.back_aperture >= n:
+            raise ValueError(f"Апертура {params.back_aperture} должна быть меньше показателя преломления {n}")
+        kz = np.sqrt(n**2 - params.back_aperture**2 * geometry.rho2)
+        return (kz - n) / params.wavelength
+
+    def compute(self, params: ParamPSF, z_values: Sequence[float], filename: str,
+                dtype=np.float32,
+                progress: Optional[Callable[[int, int], None]] = None,
+                is_canceled: Optional[Callable[[], bool]] = None) -> Optional[Dict[str, object]]:
+        """
+        Рассчитать объем (n_z, size, size) и записать его в filename (.npy)
+
+        z_values - положения плоскостей в мкм относительно плоскости params.
+        progress(done, total) вызывается после каждой пачки плоскостей,
+        is_canceled() позволяет прервать расчет (тогда возвращается None).
+        При отмене или ошибке недописанный файл удаляется.
+        Возвращает сводку: z, осевой профиль, число Штреля по z и метрики.
+        """
+        z_values = np.asarray(z_values, dtype=float)
+        size = params.size
+        n_z = z_values.size
+
+        geometry = PupilGeometry.for_params(params)
+        base = geometry.wavefront(params.defocus, params.astigmatism, params.zernike)
+        phase_per_micron = self.propagation_phase(geometry, params)
+
+        volume = np.lib.format.open_memmap(filename, mode='w+', dtype=dtype, shape=(n_z, size, size))
+        axial_profile = np.empty(n_z)
+        strehl_values = np.empty(n_z)
+        center = size // 2
+
+        chunk = max(1, PSFCalculator.BATCH_BYTES // (size * size * np.dtype(complex).itemsize))
+        completed = False
+        try:
+            for start in range(0, n_z, chunk):
+                if is_canceled is not None and is_canceled():
+                    return None
+
+                z = z_values[start:start + chunk]
+                W = base + z[:, None] * phase_per_micron
+                planes = PSFCalculator._psf_stack(geometry, W, params.step_pupil, params.step_object)
+
+                volume[start:start + z.size] = planes
+                axial_profile[start:start + z.size] = planes[:, center, center]
+                for k in range(z.size):
+                    strehl_values[start + k] = self.calculator._calculate_strehl_ratio(planes[k], params)
+
+                if progress is not None:
+                    progress(start + z.size, n_z)
+            completed = True
+        finally:
+            volume.flush()
+            del volume
+            if not completed and os.path.exists(filename):
+                os.remove(filename)
+
+        return {
+            'filename': filename,
+            'z': z_values,
+            'axial_profile': axial_profile,
+            'strehl': strehl_values,
+            **self.summary(z_values, axial_profile),
+        }
+
+    @staticmethod
+    def summary(z_values: np.ndarray, axial_profile: np.ndarray) -> Dict[str, float]:
+        """Положение максимума и ширина осевого профиля на полувысоте (мкм)"""
+        peak = int(np.argmax(axial_profile))
+        dz = float(z_values[1] - z_values[0]) if z_values.size > 1 else 0.0
+        axial_fwhm = float(PSFMetrics._half_max_width(axial_profile)) * abs(dz)
+        return {
+            'peak_z': float(z_values[peak]),
+            'peak_intensity': float(axial_profile[peak]),
+            'axial_fwhm': axial_fwhm,
+        }
+
+    @staticmethod
+    def load(filename: str) -> np.ndarray:
+        """Открыть сохраненный объем без чтения в память"""
+        return np.load(filename, mmap_mode='r')
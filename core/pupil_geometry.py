@@ -0,0 +1,134 @@
+import threading
+import numpy as np
+from collections import OrderedDict
+from core.zernike import Zernike
+
+
+class PupilGeometry:
+    """
+    Геометрия зрачка для заданной сетки дискретизации
+
+    Хранит маску апертуры и координаты только пикселей внутри апертуры,
+    поэтому волновая аберрация любой строки вычисляется без построения
+    полной координатной сетки. Экземпляры кэшируются и переиспользуются
+    всеми калькуляторами (в том числе из фоновых потоков).
+    """
+
+    _cache: "OrderedDict[tuple, PupilGeometry]" = OrderedDict()
+    _cache_lock = threading.Lock()
+    CACHE_SIZE = 16
+
+    def __init__(self, size: int, step_pupil: float, wavelength: float, back_aperture: float):
+        self.size = size
+        self.step_pupil = step_pupil
+
+        # Координатная сетка в плоскости зрачка (в единицах длины волны)
+        x = np.arange(size) - size // 2
+        X, Y = np.meshgrid(x, x)
+        X_norm = X * step_pupil / wavelength if wavelength > 0 else X * step_pupil
+        Y_norm = Y * step_pupil / wavelength if wavelength > 0 else Y * step_pupil
+        rho = np.sqrt(X_norm**2 + Y_norm**2)
+
+        # Радиус апертуры в нормированных координатах: NA / λ
+        if wavelength > 0:
+            aperture_radius_norm = back_aperture / wavelength
+        else:
+            aperture_radius_norm = back_aperture / 0.555  # по умолчанию для зеленого света
+
+        self.mask = rho <= aperture_radius_norm
+        self.index = np.flatnonzero(self.mask)
+
+        # Положения пикселей апертуры в массиве после ifftshift - зрачок можно
+        # заполнять сразу в порядке, готовом для БПФ
+        shifted = np.fft.ifftshift(np.arange(size * size).reshape(size, size))
+        inverse = np.empty(size * size, dtype=np.intp)
+        inverse[shifted.ravel()] = np.arange(size * size)
+        self.shifted_index = inverse[self.index]
+
+        # Нормированный радиус (от 0 до 1) и угол только внутри апертуры
+        rho_ap = rho.ravel()[self.index]
+        if aperture_radius_norm > 0:
+            self.rho2 = (rho_ap / aperture_radius_norm) ** 2
+        else:
+            self.rho2 = np.zeros_like(rho_ap)
+        phi = np.arctan2(Y_norm.ravel()[self.index], X_norm.ravel()[self.index])
+        self.cos2phi = np.cos(2.0 * phi)
+        self.phi = phi
+
+        # Матрица полиномов Цернике (n_terms, n_pixels), строится по требованию
+        self._zernike_basis = np.empty((0, self.index.size))
+        self._basis_lock = threading.Lock()
+
+    @classmethod
+    def get(cls, size: int, step_pupil: float, wavelength: float, back_aperture: float) -> "PupilGeometry":
+        """Получить геометрию из кэша или построить новую"""
+        key = (int(size), float(step_pupil), float(wavelength), float(back_aperture))
+        with cls._cache_lock:
+            geometry = cls._cache.get(key)
+            if geometry is not None:
+                cls._cache.move_to_end(key)
+                return geometry
+
+        geometry = cls(*key)
+        with cls._cache_lock:
+            cls._cache[key] = geometry
+            while len(cls._cache) > cls.CACHE_SIZE:
+                cls._cache.popitem(last=False)
+        return geometry
+
+    @classmethod
+    def for_params(cls, params) -> "PupilGeometry":
+        """Геометрия зрачка для параметров ParamPSF"""
+        return cls.get(params.size, params.step_pupil, params.wavelength, params.back_aperture)
+
+    @property
+    def n_pixels(self) -> int:
+        """Число пикселей внутри апертуры"""
+        return self.index.size
+
+    def zernike_basis(self, n_terms: int) -> np.ndarray:
+        """
+        Полиномы Цернике Z_1..Z_n_terms на пикселях апертуры, форма (n_terms, n_pixels)
+
+        Матрица строится один раз и дополняется только при запросе большего
+        числа членов; возвращается представление ее первых строк.
+        """
+        with self._basis_lock:
+            if self._zernike_basis.shape[0] < n_terms:
+                self._zernike_basis = Zernike.basis(np.sqrt(self.rho2), self.phi, n_terms)
+            return self._zernike_basis[:n_terms]
+
+    def wavefront(self, defocus, astigmatism, zernike=None) -> np.ndarray:
+        """
+        Волновая аберрация (в длинах волн) на пикселях апертуры
+
+        defocus и astigmatism могут быть числами или массивами одной формы (n,),
+        тогда результат имеет форму (n, n_pixels). zernike - вектор коэффициентов
+        по Ноллу формы (k,) или (n, k); его вклад - одно матричное произведение
+        с кэшированной матрицей полиномов.
+        """
+        defocus = np.asarray(defocus, dtype=float)[..., None]
+        astigmatism = np.asarray(astigmatism, dtype=float)[..., None]
+
+        # Defocus: W = defocus * (2 * ρ^2 - 1)
+        # Astigmatism: W = astigmatism * ρ^2 * cos(2φ)
+        W = defocus * (2.0 * self.rho2 - 1.0) + astigmatism * (self.rho2 * self.cos2phi)
+
+        if zernike is not None:
+            zernike = np.asarray(zernike, dtype=float)
+            if zernike.shape[-1] > 0:
+                W = W + zernike @ self.zernike_basis(zernike.shape[-1])
+        return W
+
+    def pupil(self, W: np.ndarray, shifted: bool = False) -> np.ndarray:
+        """
+        Комплексная функция зрачка по волновой аберрации на пикселях апертуры
+
+        При shifted=True зрачок сразу записывается в порядке ifftshift.
+        Для W формы (n, n_pixels) возвращается пачка формы (n, size, size).
+        """
+        batch_shape = W.shape[:-1]
+        pupil = np.zeros(batch_shape + (self.size * self.size,), dtype=complex)
+        index = self.shifted_index if shifted else self.index
+        pupil[..., index] = np.exp(1j * (2.0 * np.pi) * W)
+        return pupil.reshape(batch_shape + (self.size, self.size))
@@ -0,0 +1,123 @@
+from dataclasses import replace
+from typing import Callable, Dict, List, Optional, Sequence
+from core.psf_params import ParamPSF
+from core.psf_calculator import PSFCalculator
+from core.pupil_geometry import PupilGeometry
+from core.sweep import evaluate_metrics
+
+
+class SensitivityAnalysis:
+    """
+    Чувствительности метрик ФРТ к параметрам строк (центральные разности)
+
+    Все сдвинутые наборы параметров всех строк собираются в один список и
+    считаются evaluate_metrics: наборы сортируются по геометрии зрачка, поэтому
+    сдвиги аберраций и соседние строки с теми же λ и NA попадают в одну пачку
+    compute_batch и используют одну сетку из кэша PupilGeometry. ФРТ сразу
+    сводятся к метрикам и не хранятся.
+
+    Маска апертуры бинарная (радиус NA / step_pupil пикселей), поэтому малый
+    сдвиг NA либо не меняет ее, либо добавляет целое кольцо пикселей, и
+    разность получается нулевой или ложно большой. Шаг по NA - один пиксель
+    зрачка (step_pupil), а число пикселей маски в сдвинутых наборах
+    возвращается вместе с производной. Длины волны в списке нет: в
+    канонических единицах форма ФРТ от λ не зависит, и производная по ней
+    отражала бы только ту же дискретизацию маски.
+    """
+
+    # параметр: (подпись, шаг центральной разности; None - один пиксель зрачка по NA)
+    PARAMETERS = {
+        'back_aperture': ("NA", None),
+        'defocus': ("Расфок.", 1e-3),
+        'astigmatism': ("Астигм.", 1e-3),
+    }
+
+    # параметры, сдвиг которых меняет маску апертуры
+    MASK_PARAMETERS = ('back_aperture',)
+
+    METRICS = {
+        'strehl': "Штрель",
+        'ee80': "EE80",
+    }
+
+    def __init__(self, parameters: Sequence[str] = tuple(PARAMETERS), metrics: Sequence[str] = tuple(METRICS)):
+        self.parameters = [p for p in parameters if p in self.PARAMETERS]
+        self.metrics = [m for m in metrics if m in self.METRICS]
+        self.calculator = PSFCalculator()
+
+    @staticmethod
+    def key(metric: str, parameter: str) -> str:
+        """Ключ колонки чувствительности: 'd_strehl/d_defocus'"""
+        return f"d_{metric}/d_{parameter}"
+
+    @property
+    def keys(self) -> List[str]:
+        return [self.key(m, p) for m in self.metrics for p in self.parameters]
+
+    @staticmethod
+    def mask_key(parameter: str) -> str:
+        """Ключ пары (пикселей маски при -h, при +h) для параметра из MASK_PARAMETERS"""
+        return f"mask/d_{parameter}"
+
+    @staticmethod
+    def split_key(key: str) -> tuple:
+        """(метрика, параметр) по ключу колонки"""
+        metric, parameter = key[2:].split('/d_')
+        return metric, parameter
+
+    @classmethod
+    def column_title(cls, key: str) -> str:
+        """Заголовок колонки: '∂Штрель/∂NA'"""
+        metric, parameter = cls.split_key(key)
+        return f"∂{cls.METRICS[metric]}/∂{cls.PARAMETERS[parameter][0]}"
+
+    @staticmethod
+    def is_column_title(title: str) -> bool:
+        """Является ли заголовок колонки заголовком чувствительности"""
+        return title.strip().startswith("∂")
+
+    def step(self, params: ParamPSF, parameter: str) -> float:
+        """Шаг центральной разности для параметра"""
+        step = self.PARAMETERS[parameter][1]
+        return params.step_pupil if step is None else step
+
+    def compute(self, params_list: Sequence[ParamPSF],
+                progress: Optional[Callable[[int, int], None]] = None,
+                is_canceled: Optional[Callable[[], bool]] = None) -> Optional[List[Dict[str, float]]]:
+        """
+        Чувствительности для каждого набора параметров
+
+        Возвращает список словарей {ключ: производная} в порядке params_list
+        или None при отмене. Для параметров MASK_PARAMETERS в словаре есть
+        также mask_key(parameter): числа пикселей маски при -h и +h - если они
+        различаются, производная включает скачок дискретной маски.
+        """
+        # Все сдвинутые наборы: (строка, параметр, знак)
+        perturbed = []
+        for i, params in enumerate(params_list):
+            for parameter in self.parameters:
+                h = self.step(params, parameter)
+                value = getattr(params, parameter)
+                for sign in (1, -1):
+                    perturbed.append(replace(params, **{parameter: value + sign * h}))
+
+        values = evaluate_metrics(perturbed, self.metrics, self.calculator,
+                                  progress=progress, is_canceled=is_canceled)
+        if values is None:
+            return None
+
+        sensitivities = []
+        for i, params in enumerate(params_list):
+            row = {}
+            for j, parameter in enumerate(self.parameters):
+                plus = (i * len(self.parameters) + j) * 2
+                h = self.step(params, parameter)
+                for m, metric in enumerate(self.metrics):
+                    row[self.key(metric, parameter)] = float((values[plus, m] - values[plus + 1, m]) / (2.0 * h))
+                if parameter in self.MASK_PARAMETERS:
+                    row[self.mask_key(parameter)] = (
+                        PupilGeometry.for_params(perturbed[plus + 1]).n_pixels,
+                        PupilGeometry.for_params(perturbed[plus]).n_pixels,
+                    )
+            sensitivities.append(row)
+        return sensitivities
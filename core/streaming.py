@@ -0,0 +1,66 @@
+import itertools
+import numpy as np
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+from core.psf_params import ParamPSF
+from core.psf_calculator import PSFCalculator
+from core.psf_metrics import PSFMetrics
+from core.sweep import evaluate_metrics
+from core.process_pool import process_map
+
+
+def _compute_chunk(start: int, params_list: List[ParamPSF], metrics: Optional[Tuple[str, ...]]):
+    """Пачка ФРТ или метрик (выполняется в процессе пула или в вызывающем потоке)"""
+    if metrics is None:
+        return start, PSFCalculator().compute_batch(params_list)
+    values = evaluate_metrics(params_list, metrics)
+    return start, [dict(zip(metrics, row.tolist())) for row in values]
+
+
+def iter_compute(params_iterable: Iterable[ParamPSF], batch_size: Optional[int] = None,
+                 workers: int = 1, metrics: Optional[Sequence[str]] = None,
+                 ordered: bool = True) -> Iterator[Tuple[int, object]]:
+    """
+    Потоковый расчет ФРТ для последовательности параметров любой длины
+
+    Параметры забираются из params_iterable лениво, пачками по batch_size
+    (по умолчанию - пачка PSFCalculator.BATCH_BYTES по размеру первой ФРТ).
+    Выдаются пары (номер, результат): при metrics=None результат - (psf, strehl)
+    как у PSFCalculator.compute, иначе словарь {ключ: значение} для 'strehl'
+    и ключей PSFMetrics. При workers > 1 пачки считаются в пуле процессов, в
+    работе не больше двух пачек на процесс: новые параметры читаются, только
+    когда потребитель забрал готовые результаты, поэтому память не зависит от
+    длины входа. ordered=False выдает пачки в порядке готовности.
+
+    Qt не требуется; в скриптах с workers > 1 вызов должен находиться под
+    if __name__ == '__main__' (процессы запускаются через spawn).
+    """
+    if metrics is not None:
+        metrics = tuple(metrics)
+        unknown = [key for key in metrics if key != 'strehl' and not PSFMetrics.is_metric_key(key)]
+        if unknown:
+            raise ValueError(f"Неизвестные метрики: {', '.join(unknown)}")
+
+    iterator = iter(params_iterable)
+    first = next(iterator, None)
+    if first is None:
+        return
+    iterator = itertools.chain([first], iterator)
+    if batch_size is None:
+        batch_size = max(1, PSFCalculator.BATCH_BYTES // (first.size * first.size * np.dtype(complex).itemsize))
+
+    def batches():
+        for start in itertools.count(0, batch_size):
+            batch = list(itertools.islice(iterator, batch_size))
+            if not batch:
+                return
+            yield start, batch
+
+    if workers <= 1:
+        for start, batch in batches():
+            _, results = _compute_chunk(start, batch, metrics)
+            yield from enumerate(results, start)
+        return
+
+    tasks = ((start, batch, metrics) for start, batch in batches())
+    for start, results in process_map(_compute_chunk, tasks, workers, ordered=ordered):
+        yield from enumerate(results, start)
@@ -0,0 +1,215 @@
+import numpy as np
+from dataclasses import fields, replace
+from typing import Callable, Dict, Optional, Sequence, Tuple
+from scipy.interpolate import RectBivariateSpline
+from core.psf_params import ParamPSF
+from core.psf_calculator import PSFCalculator
+from core.psf_metrics import PSFMetrics
+from core.pupil_geometry import PupilGeometry
+
+
+class StrehlLUT:
+    """
+    Таблица метрик ФРТ по сетке (расфокусировка, астигматизм) для быстрых оценок
+
+    При фиксированной геометрии зрачка и прочих аберрациях число Штреля -
+    гладкая функция расфокусировки и астигматизма. Таблица строится один раз,
+    сохраняется в .npz, а запросы обслуживаются бикубическим сплайном за
+    микросекунды. Погрешность интерполяции измеряется точным расчетом в центрах
+    ячеек (там она наибольшая) и возвращается вместе с оценкой.
+
+    Число Штреля считается в той же постановке, что в таблице (среднее по
+    центральной области 3x3 нормированной ФРТ), но без БПФ: поле в пикселе
+    вблизи центра - сумма по апертуре, а энергия ФРТ по теореме Парсеваля
+    равна числу пикселей апертуры. EE80 и FWHM требуют полных ФРТ и считаются
+    пакетными БПФ.
+    """
+
+    METRICS = {
+        'strehl': "Число Штреля",
+        'ee80': PSFMetrics.COLUMN_TITLES['ee80'],
+        'fwhm_x': PSFMetrics.COLUMN_TITLES['fwhm_x'],
+        'fwhm_y': PSFMetrics.COLUMN_TITLES['fwhm_y'],
+    }
+
+    _FIELDS = tuple(f.name for f in fields(ParamPSF) if f.name != 'zernike')
+
+    ERROR_SAFETY = 2.0  # запас оценки погрешности относительно ошибки в центрах ячеек
+
+    STREHL_BATCH_BYTES = 16 * 1024 * 1024  # фазы одной пачки для суммы по апертуре
+
+    def __init__(self, params: ParamPSF, defocus: np.ndarray, astigmatism: np.ndarray,
+                 values: Dict[str, np.ndarray], errors: Dict[str, np.ndarray]):
+        self.params = replace(params, defocus=0.0, astigmatism=0.0)
+        self.defocus = np.asarray(defocus, dtype=float)
+        self.astigmatism = np.asarray(astigmatism, dtype=float)
+        self.values = values    # метрика: значения в узлах (n_defocus, n_astigmatism)
+        self.errors = errors    # метрика: ошибка сплайна в центрах ячеек (n_defocus - 1, n_astigmatism - 1)
+        self._splines = {
+            metric: RectBivariateSpline(self.defocus, self.astigmatism, data, kx=3, ky=3)
+            for metric, data in values.items()
+        }
+
+    @staticmethod
+    def key(params: ParamPSF) -> tuple:
+        """Все параметры, кроме расфокусировки и астигматизма, от которых зависит ФРТ"""
+        return (params.size, params.step_pupil, params.wavelength, params.back_aperture,
+                params.step_object, params.magnification, tuple(params.zernike))
+
+    @property
+    def metrics(self) -> Tuple[str, ...]:
+        return tuple(self.values)
+
+    def max_error(self, metric: str = 'strehl') -> float:
+        """Наибольшая ошибка интерполяции по таблице"""
+        return float(self.errors[metric].max())
+
+    def covers(self, params: ParamPSF) -> bool:
+        """Относятся ли параметры к этой таблице (геометрия и диапазоны)"""
+        return (self.key(params) == self.key(self.params)
+                and self.defocus[0] <= params.defocus <= self.defocus[-1]
+                and self.astigmatism[0] <= params.astigmatism <= self.astigmatism[-1])
+
+    def evaluate(self, defocus, astigmatism, metric: str = 'strehl') -> np.ndarray:
+        """Интерполированные значения метрики (векторно)"""
+        return self._splines[metric].ev(defocus, astigmatism)
+
+    def estimate(self, params: ParamPSF, metric: str = 'strehl') -> Optional[Tuple[float, float]]:
+        """
+        Оценка метрики для params: (значение, погрешность) или None
+
+        Погрешность - удвоенная наибольшая ошибка интерполяции в центрах
+        ячейки, содержащей точку, и соседних с ней. None - параметры вне таблицы или метрика не рассчитана.
+        """
+        if metric not in self.values or not self.covers(params):
+            return None
+        i = int(np.clip(np.searchsorted(self.defocus, params.defocus) - 1, 0, self.defocus.size - 2))
+        j = int(np.clip(np.searchsorted(self.astigmatism, params.astigmatism) - 1, 0, self.astigmatism.size - 2))
+        value = float(self._splines[metric].ev(params.defocus, params.astigmatism))
+        if metric == 'strehl':
+            value = min(max(value, 0.0), 1.0)
+        errors = self.errors[metric][max(i - 1, 0):i + 2, max(j - 1, 0):j + 2]
+        return value, self.ERROR_SAFETY * float(errors.max())
+
+    @classmethod
+    def build(cls, params: ParamPSF, defocus_range: Tuple[float, float] = (-1.0, 1.0),
+              astigmatism_range: Tuple[float, float] = (-1.0, 1.0), n_points: int = 33,
+              metrics: Sequence[str] = ('strehl',),
+              progress: Optional[Callable[[int, int], None]] = None,
+              is_canceled: Optional[Callable[[], bool]] = None) -> Optional["StrehlLUT"]:
+        """
+        Рассчитать таблицу для геометрии и прочих аберраций params
+
+        Точный расчет выполняется в n_points x n_points узлах и в центрах ячеек
+        для оценки погрешности. Возвращает None при отмене.
+        """
+        metrics = [metric for metric in cls.METRICS if metric in metrics]
+        if not metrics:
+            raise ValueError("Не выбраны метрики для таблицы")
+        if n_points < 4:
+            raise ValueError("Для бикубической интерполяции нужно не меньше 4 узлов по каждой оси")
+
+        defocus = np.linspace(*defocus_range, n_points)
+        astigmatism = np.linspace(*astigmatism_range, n_points)
+        mid_defocus = 0.5 * (defocus[1:] + defocus[:-1])
+        mid_astigmatism = 0.5 * (astigmatism[1:] + astigmatism[:-1])
+
+        nodes = np.stack(np.meshgrid(defocus, astigmatism, indexing='ij'), axis=-1).reshape(-1, 2)
+        centers = np.stack(np.meshgrid(mid_defocus, mid_astigmatism, indexing='ij'), axis=-1).reshape(-1, 2)
+        total = len(nodes) + len(centers)
+
+        exact = cls._exact(params, np.vstack((nodes, centers)), metrics, progress, is_canceled, total)
+        if exact is None:
+            return None
+
+        values = {metric: data[:len(nodes)].reshape(n_points, n_points) for metric, data in exact.items()}
+        lut = cls(params, defocus, astigmatism, values, {})
+        lut.errors = {
+            metric: np.abs(lut.evaluate(centers[:, 0], centers[:, 1], metric) - data[len(nodes):])
+                      .reshape(n_points - 1, n_points - 1)
+            for metric, data in exact.items()
+        }
+        return lut
+
+    @classmethod
+    def _exact(cls, params: ParamPSF, points: np.ndarray, metrics: Sequence[str],
+               progress, is_canceled, total: int) -> Optional[Dict[str, np.ndarray]]:
+        """Точные значения метрик в точках (defocus, astigmatism)"""
+        geometry = PupilGeometry.for_params(params)
+        psf_keys = [metric for metric in metrics if metric != 'strehl']
+        results = {metric: np.empty(len(points)) for metric in metrics}
+
+        if psf_keys:
+            chunk = max(1, PSFCalculator.BATCH_BYTES // (params.size * params.size * np.dtype(complex).itemsize))
+        else:
+            chunk = max(1, cls.STREHL_BATCH_BYTES // (max(geometry.n_pixels, 1) * np.dtype(complex).itemsize))
+        phasors = cls._center_phasors(geometry) if 'strehl' in metrics else None
+
+        for start in range(0, len(points), chunk):
+            if is_canceled is not None and is_canceled():
+                return None
+            batch = points[start:start + chunk]
+            W = geometry.wavefront(batch[:, 0], batch[:, 1], params.zernike)
+
+            if phasors is not None:
+                results['strehl'][start:start + len(batch)] = cls._strehl(geometry, W, phasors, params)
+            if psf_keys:
+                psfs = PSFCalculator._psf_stack(geometry, W, params.step_pupil, params.step_object)
+                values = PSFMetrics.compute(psfs, params.step_object * params.magnification, psf_keys)
+                for key in psf_keys:
+                    results[key][start:start + len(batch)] = values[key]
+
+            if progress is not None:
+                progress(start + len(batch), total)
+        return results
+
+    @staticmethod
+    def _center_phasors(geometry: PupilGeometry) -> np.ndarray:
+        """Множители exp(2πi(y·dy + x·dx)/size) для пикселей 3x3 вокруг центра ФРТ, (n_pixels, 9)"""
+        size = geometry.size
+        y = geometry.index // size - size // 2
+        x = geometry.index % size - size // 2
+        offsets = np.array([(dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1)])
+        return np.exp(2j * np.pi * (np.outer(y, offsets[:, 0]) + np.outer(x, offsets[:, 1])) / size)
+
+    @staticmethod
+    def _strehl(geometry: PupilGeometry, W: np.ndarray, phasors: np.ndarray, params: ParamPSF) -> np.ndarray:
+        """Число Штреля как в PSFCalculator._calculate_strehl_ratio, без построения ФРТ"""
+        field = np.exp(2j * np.pi * W) @ phasors
+        n_pixels = max(geometry.n_pixels, 1)
+        center = np.mean(field.real ** 2 + field.imag ** 2, axis=1) / (geometry.size ** 2 * n_pixels)
+
+        if params.back_aperture > 0 and params.wavelength > 0:
+            ideal = (np.pi * (params.back_aperture / params.wavelength) ** 2) ** 2
+        else:
+            ideal = 1.0
+        return np.clip(center / ideal, 0.0, 1.0)
+
+    def save(self, filename: str):
+        """Сохранить таблицу в .npz"""
+        arrays = {
+            'names': np.array(self._FIELDS),
+            'params': np.array([getattr(self.params, name) for name in self._FIELDS], dtype=float),
+            'zernike': np.array(self.params.zernike, dtype=float),
+            'defocus': self.defocus,
+            'astigmatism': self.astigmatism,
+            'metrics': np.array(self.metrics),
+        }
+        for metric in self.metrics:
+            arrays[f'values_{metric}'] = self.values[metric]
+            arrays[f'errors_{metric}'] = self.errors[metric]
+        np.savez(filename, **arrays)
+
+    @classmethod
+    def load(cls, filename: str) -> "StrehlLUT":
+        """Загрузить таблицу, сохраненную save"""
+        with np.load(filename) as data:
+            values = dict(zip([str(name) for name in data['names']], data['params'].tolist()))
+            values['size'] = int(values['size'])
+            params = ParamPSF(**values, zernike=tuple(data['zernike'].tolist()))
+            metrics = [str(metric) for metric in data['metrics']]
+            return cls(
+                params, data['defocus'], data['astigmatism'],
+                {metric: data[f'values_{metric}'] for metric in metrics},
+                {metric: data[f'errors_{metric}'] for metric in metrics},
+            )
@@ -0,0 +1,568 @@
+import os
+import json
+import tempfile
+import numpy as np
+from dataclasses import asdict, dataclass, fields, replace
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from core.psf_params import ParamPSF
+from core.psf_calculator import PSFCalculator
+from core.psf_metrics import PSFMetrics
+from core.zernike import Zernike
+from core.process_pool import process_map
+
+
+# Параметры, по которым строятся развертки
+SWEEP_AXES = {
+    'defocus': "Расфокусировка, λ",
+    'astigmatism': "Астигматизм, λ",
+    'back_aperture': "Числовая апертура",
+    'wavelength': "Длина волны, мкм",
+}
+
+# Метрики разверток: число Штреля как в таблице и метрики PSFMetrics
+SWEEP_METRICS = {
+    'strehl': "Число Штреля",
+    'ee80': PSFMetrics.COLUMN_TITLES['ee80'],
+    'fwhm_x': PSFMetrics.COLUMN_TITLES['fwhm_x'],
+    'fwhm_y': PSFMetrics.COLUMN_TITLES['fwhm_y'],
+}
+
+BATCH_BYTES = 64 * 1024 * 1024  # ФРТ одной пачки compute_batch
+
+
+def evaluate_metrics(params_list: Sequence[ParamPSF], metrics: Sequence[str],
+                     calculator: Optional[PSFCalculator] = None,
+                     progress: Optional[Callable[[int, int], None]] = None,
+                     is_canceled: Optional[Callable[[], bool]] = None) -> Optional[np.ndarray]:
+    """
+    Метрики для набора параметров, форма (len(params_list), len(metrics))
+
+    Наборы сортируются по геометрии зрачка, поэтому точки с общей геометрией
+    попадают в одну пачку compute_batch. ФРТ сразу сводятся к метрикам и не
+    хранятся. progress(done, total) вызывается после каждой пачки.
+    Возвращает None при отмене.
+    """
+    calculator = calculator or PSFCalculator()
+    metrics = list(metrics)
+    psf_keys = [metric for metric in metrics if metric != 'strehl']
+    values = np.full((len(params_list), len(metrics)), np.nan)
+
+    order = sorted(range(len(params_list)), key=lambda k: (
+        params_list[k].size, params_list[k].step_pupil, params_list[k].wavelength,
+        params_list[k].back_aperture, params_list[k].step_object
+    ))
+    start = 0
+    while start < len(order):
+        if is_canceled is not None and is_canceled():
+            return None
+        stop, nbytes = start, 0
+        while stop < len(order) and (stop == start or nbytes < BATCH_BYTES):
+            nbytes += params_list[order[stop]].size ** 2 * np.dtype(complex).itemsize
+            stop += 1
+        chunk = order[start:stop]
+        results = calculator.compute_batch([params_list[k] for k in chunk])
+
+        # Метрики PSFMetrics - по стопкам ФРТ одного размера и шага
+        groups = {}
+        for k, (psf, strehl) in zip(chunk, results):
+            if 'strehl' in metrics:
+                values[k, metrics.index('strehl')] = strehl
+            params = params_list[k]
+            groups.setdefault((psf.shape, params.step_object * params.magnification), []).append((k, psf))
+        if psf_keys:
+            for (_, step_microns), entries in groups.items():
+                computed = PSFMetrics.compute(np.stack([psf for _, psf in entries]), step_microns, psf_keys)
+                for key in psf_keys:
+                    values[[k for k, _ in entries], metrics.index(key)] = computed[key]
+        start = stop
+        if progress is not None:
+            progress(start, len(order))
+    return values
+
+
+@dataclass
+class SweepResult:
+    """Адаптивная развертка метрики по двум параметрам"""
+    x_name: str
+    y_name: str
+    metric: str
+    x: np.ndarray              # координаты столбцов самой мелкой сетки
+    y: np.ndarray              # координаты строк самой мелкой сетки
+    values: np.ndarray         # (ny, nx), NaN в невычисленных точках
+    stride: int                # шаг грубой сетки в узлах самой мелкой
+    level: int                 # последний выполненный уровень уточнения
+    evaluations: int
+
+    @property
+    def full_grid(self) -> int:
+        """Число точек равномерной сетки той же детальности"""
+        return self.values.size
+
+    @property
+    def evaluated(self) -> np.ndarray:
+        return np.isfinite(self.values)
+
+    def image(self) -> np.ndarray:
+        """
+        Карта на самой мелкой сетке
+
+        Неуточненные ячейки заполняются билинейной интерполяцией по углам,
+        начиная с крупных: ячейка с вычисленным центром была уточнена и
+        заполняется на следующем уровне по своим подъячейкам.
+        """
+        known = self.evaluated
+        image = self.values.copy()
+        n = image.shape[0]
+        index = np.arange(n)
+        stride = self.stride
+        while stride >= 1:
+            i0 = np.minimum(index // stride * stride, n - 1 - stride)
+            t = (index - i0) / stride
+            y0, x0 = i0[:, None], i0[None, :]
+            ty, tx = t[:, None], t[None, :]
+            interpolated = ((1 - ty) * (1 - tx) * image[y0, x0] + (1 - ty) * tx * image[y0, x0 + stride]
+                            + ty * (1 - tx) * image[y0 + stride, x0] + ty * tx * image[y0 + stride, x0 + stride])
+            fill = np.isnan(image) & np.isfinite(interpolated)
+            if stride > 1:
+                fill &= ~known[y0 + stride // 2, x0 + stride // 2]
+            image[fill] = interpolated[fill]
+            stride //= 2
+        return image
+
+
+class AdaptiveSweep:
+    """
+    Адаптивная развертка метрики ФРТ по двум параметрам
+
+    Начинается с грубой равномерной сетки; ячейки, в которых изменение метрики
+    между углами (градиент) или ожидаемая ошибка билинейной интерполяции
+    (кривизна) больше допуска, делятся на четыре. Новые точки одного уровня
+    считаются одним пакетным расчетом. Кривизна на грубой сетке оценивается
+    по вторым разностям, на следующих уровнях - по отклонению середин ребер и
+    центра ячейки от линейной интерполяции (у подъячеек оно вчетверо меньше).
+    Допуски задаются в долях размаха метрики на грубой сетке.
+    """
+
+    def __init__(self, x_name: str, x_range: Tuple[float, float], y_name: str, y_range: Tuple[float, float],
+                 metric: str = 'strehl', coarse: int = 9, levels: int = 4,
+                 gradient_tolerance: float = 0.1, curvature_tolerance: float = 0.01):
+        for name in (x_name, y_name):
+            if name not in SWEEP_AXES:
+                raise ValueError(f"Неизвестный параметр развертки: {name}")
+        if x_name == y_name:
+            raise ValueError("Параметры развертки должны различаться")
+        if metric not in SWEEP_METRICS:
+            raise ValueError(f"Неизвестная метрика: {metric}")
+        if coarse < 2:
+            raise ValueError("Грубая сетка должна содержать не меньше 2 точек по оси")
+        self.x_name, self.y_name = x_name, y_name
+        self.x_range, self.y_range = tuple(x_range), tuple(y_range)
+        self.metric = metric
+        self.coarse = coarse
+        self.levels = levels
+        self.gradient_tolerance = gradient_tolerance
+        self.curvature_tolerance = curvature_tolerance
+        self.calculator = PSFCalculator()
+
+    @property
+    def size(self) -> int:
+        """Число точек самой мелкой сетки по оси"""
+        return (self.coarse - 1) * 2 ** self.levels + 1
+
+    def _evaluate(self, params: ParamPSF, result: SweepResult, points: np.ndarray, is_canceled) -> bool:
+        """Рассчитать метрику в узлах points (n, 2) = (iy, ix); False при отмене"""
+        params_list = [
+            replace(params, **{self.x_name: float(result.x[ix]), self.y_name: float(result.y[iy])})
+            for iy, ix in points
+        ]
+        values = evaluate_metrics(params_list, [self.metric], self.calculator, is_canceled=is_canceled)
+        if values is None:
+            return False
+        result.values[points[:, 0], points[:, 1]] = values[:, 0]
+        result.evaluations += len(points)
+        return True
+
+    def run(self, params: ParamPSF,
+            progress: Optional[Callable[[int, int], None]] = None,
+            is_canceled: Optional[Callable[[], bool]] = None,
+            on_level: Optional[Callable[[SweepResult], None]] = None) -> Optional[SweepResult]:
+        """
+        Выполнить развертку вокруг остальных параметров params
+
+        progress(вычислено точек, точек полной сетки); on_level(result) вызывается
+        после каждого уровня. Возвращает None при отмене.
+        """
+        n, stride = self.size, 2 ** self.levels
+        result = SweepResult(
+            x_name=self.x_name, y_name=self.y_name, metric=self.metric,
+            x=np.linspace(*self.x_range, n), y=np.linspace(*self.y_range, n),
+            values=np.full((n, n), np.nan), stride=stride, level=0, evaluations=0,
+        )
+
+        # Уровень 0: грубая сетка
+        coarse = np.arange(0, n, stride)
+        points = np.stack(np.meshgrid(coarse, coarse, indexing='ij'), axis=-1).reshape(-1, 2)
+        if not self._evaluate(params, result, points, is_canceled):
+            return None
+        grid = result.values[np.ix_(coarse, coarse)]
+        span = float(np.nanmax(grid) - np.nanmin(grid)) if np.isfinite(grid).any() else 0.0
+        span = span if span > 0 else 1.0
+
+        cells = np.stack(np.meshgrid(coarse[:-1], coarse[:-1], indexing='ij'), axis=-1).reshape(-1, 2)
+        deviation = self._coarse_deviation(grid)[cells[:, 0] // stride, cells[:, 1] // stride]
+        self._report(result, progress, on_level)
+
+        for level in range(1, self.levels + 1):
+            if len(cells) == 0:
+                break
+            corners = np.stack([result.values[cells[:, 0] + dy, cells[:, 1] + dx]
+                                for dy in (0, stride) for dx in (0, stride)], axis=1)
+            gradient = np.nanmax(corners, axis=1) - np.nanmin(corners, axis=1)
+            refine = (gradient > self.gradient_tolerance * span) | (deviation > self.curvature_tolerance * span)
+            refine |= ~np.isfinite(corners).all(axis=1)
+            cells = cells[refine]
+            if len(cells) == 0:
+                break
+
+            # Середины ребер и центры всех уточняемых ячеек - одна пачка
+            half = stride // 2
+            offsets = np.array([(0, half), (half, 0), (half, half), (half, stride), (stride, half)])
+            points = (cells[:, None, :] + offsets[None, :, :]).reshape(-1, 2)
+            points = np.unique(points, axis=0)
+            points = points[np.isnan(result.values[points[:, 0], points[:, 1]])]
+            if not self._evaluate(params, result, points, is_canceled):
+                return None
+
+            deviation = self._cell_deviation(result.values, cells, stride) / 4.0
+            children = np.array([(0, 0), (0, half), (half, 0), (half, half)])
+            cells = (cells[:, None, :] + children[None, :, :]).reshape(-1, 2)
+            deviation = np.repeat(deviation, 4)
+            stride = half
+            result.level = level
+            self._report(result, progress, on_level)
+
+        return result
+
+    @staticmethod
+    def _coarse_deviation(grid: np.ndarray) -> np.ndarray:
+        """
+        Ожидаемая ошибка линейной интерполяции в ячейках грубой сетки по вторым разностям
+
+        Вторая разность равна h²f'', отклонение середины от хорды - h²f''/8.
+        Возвращает максимум по углам ячейки, форма (ny - 1, nx - 1).
+        """
+        curvature = np.zeros_like(grid)
+        if grid.shape[0] > 2:
+            d2 = np.abs(grid[:-2] - 2.0 * grid[1:-1] + grid[2:]) / 8.0
+            d2 = np.vstack((d2[:1], d2, d2[-1:]))
+            curvature = np.fmax(curvature, d2)
+        if grid.shape[1] > 2:
+            d2 = np.abs(grid[:, :-2] - 2.0 * grid[:, 1:-1] + grid[:, 2:]) / 8.0
+            d2 = np.hstack((d2[:, :1], d2, d2[:, -1:]))
+            curvature = np.fmax(curvature, d2)
+        return np.fmax(np.fmax(curvature[:-1, :-1], curvature[:-1, 1:]),
+                       np.fmax(curvature[1:, :-1], curvature[1:, 1:]))
+
+    @staticmethod
+    def _cell_deviation(values: np.ndarray, cells: np.ndarray, stride: int) -> np.ndarray:
+        """Отклонение середин ребер и центра ячеек от линейной интерполяции по углам"""
+        half = stride // 2
+        y, x = cells[:, 0], cells[:, 1]
+        c00, c01 = values[y, x], values[y, x + stride]
+        c10, c11 = values[y + stride, x], values[y + stride, x + stride]
+        deviations = [
+            values[y, x + half] - 0.5 * (c00 + c01),
+            values[y + stride, x + half] - 0.5 * (c10 + c11),
+            values[y + half, x] - 0.5 * (c00 + c10),
+            values[y + half, x + stride] - 0.5 * (c01 + c11),
+            values[y + half, x + half] - 0.25 * (c00 + c01 + c10 + c11),
+        ]
+        return np.nanmax(np.abs(np.stack(deviations)), axis=0)
+
+    @staticmethod
+    def _report(result: SweepResult, progress, on_level):
+        if progress is not None:
+            progress(result.evaluations, result.full_grid)
+        if on_level is not None:
+            on_level(result)
+
+
+@dataclass(frozen=True)
+class SweepAxis:
+    """Ось сеточной развертки: поле ParamPSF или коэффициент Цернике 'Z<j>' и его значения"""
+    name: str
+    values: Tuple[float, ...]
+
+    # Поля дискретизации и пересчет остальных шагов после их изменения, как в таблице.
+    # size пересчитывается от охвата зрачка, если вместе с ним не задано другое поле
+    SAMPLING_FIELDS = {
+        'size': 'recalculate_from_pupil_diameter',
+        'pupil_diameter': 'recalculate_from_pupil_diameter',
+        'step_pupil': 'recalculate_from_step_pupil',
+        'step_object': 'recalculate_from_step_object',
+        'step_image': 'recalculate_from_step_image',
+    }
+
+    def __post_init__(self):
+        numeric = [f.name for f in fields(ParamPSF) if f.name != 'zernike']
+        if self.name not in numeric:
+            if not Zernike.is_term_name(self.name):
+                raise ValueError(f"Неизвестная ось развертки: {self.name}")
+            Zernike.noll_index(self.name)
+        if not self.values:
+            raise ValueError(f"Пустая ось развертки: {self.name}")
+
+    @classmethod
+    def linspace(cls, name: str, start: float, stop: float, count: int) -> "SweepAxis":
+        return cls(name, tuple(float(v) for v in np.linspace(start, stop, count)))
+
+    @classmethod
+    def parse(cls, text: str) -> List["SweepAxis"]:
+        """Оси из строки вида 'defocus -1 1 21; Z7 0 0.2 5'"""
+        axes = []
+        for part in text.split(';'):
+            if not part.strip():
+                continue
+            name, start, stop, count = part.replace(',', ' ').split()
+            axes.append(cls.linspace(name, float(start), float(stop), int(count)))
+        return axes
+
+    @property
+    def title(self) -> str:
+        if self.name in SWEEP_AXES:
+            return SWEEP_AXES[self.name]
+        if Zernike.is_term_name(self.name):
+            return f"{Zernike.title(Zernike.noll_index(self.name))}, λ"
+        return self.name
+
+    @classmethod
+    def apply(cls, params: ParamPSF, axes: Sequence["SweepAxis"], values: Sequence[float]) -> ParamPSF:
+        """
+        Копия params со значениями осей
+
+        После осей дискретизации остальные шаги пересчитываются от заданного
+        поля (SAMPLING_FIELDS). Две оси из pupil_diameter и шагов определяют
+        один и тот же шаг по-разному, такое сочетание - ValueError.
+        """
+        changes, terms = {}, {}
+        for axis, value in zip(axes, values):
+            if Zernike.is_term_name(axis.name):
+                terms[Zernike.noll_index(axis.name)] = value
+            else:
+                changes[axis.name] = int(round(value)) if axis.name == 'size' else float(value)
+        if terms:
+            changes['zernike'] = Zernike.with_terms(params.zernike, terms)
+        result = replace(params, **changes)
+        sampling = [name for name in cls.SAMPLING_FIELDS if name in changes and name != 'size']
+        if len(sampling) > 1:
+            raise ValueError(f"Оси развертки задают несовместимые шаги дискретизации: {', '.join(sampling)}")
+        if sampling or 'size' in changes:
+            getattr(result, cls.SAMPLING_FIELDS[sampling[0] if sampling else 'size'])()
+        return result
+
+
+def _grid_points(params: ParamPSF, axes: Sequence[SweepAxis], start: int, stop: int) -> List[ParamPSF]:
+    """Наборы параметров узлов развертки с плоскими номерами start..stop-1"""
+    shape = tuple(len(axis.values) for axis in axes)
+    indices = np.unravel_index(np.arange(start, stop), shape)
+    return [
+        SweepAxis.apply(params, axes, [axis.values[index[k]] for axis, index in zip(axes, indices)])
+        for k in range(stop - start)
+    ]
+
+
+def _evaluate_grid_chunk(params: ParamPSF, axes: Tuple[SweepAxis, ...], start: int, stop: int,
+                         metrics: Tuple[str, ...]) -> Tuple[int, np.ndarray]:
+    """Метрики узлов start..stop-1 (выполняется в процессе пула)"""
+    return start, evaluate_metrics(_grid_points(params, axes, start, stop), metrics)
+
+
+@dataclass
+class SweepCube:
+    """Результат сеточной развертки: куб метрик (*форма осей, n_metrics), NaN - не рассчитано"""
+    params: ParamPSF                # базовые параметры (значения вне осей)
+    axes: List[SweepAxis]
+    metrics: List[str]
+    data: np.ndarray                # np.ndarray или np.memmap
+    filename: Optional[str] = None  # .npy с кубом, если он отображен в память
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self.data.shape[:-1]
+
+    def axis_index(self, name: str) -> int:
+        return [axis.name for axis in self.axes].index(name)
+
+    def values(self, metric: str) -> np.ndarray:
+        """N-мерный массив одной метрики (без копирования)"""
+        return self.data[..., self.metrics.index(metric)]
+
+    def slice(self, metric: str, x_name: str, y_name: str, fixed: Dict[str, int]) -> np.ndarray:
+        """
+        Двумерный срез (ny, nx) по осям x_name и y_name
+
+        fixed - номера значений остальных осей (по умолчанию 0).
+        """
+        ix, iy = self.axis_index(x_name), self.axis_index(y_name)
+        index = tuple(slice(None) if k in (ix, iy) else fixed.get(axis.name, 0)
+                      for k, axis in enumerate(self.axes))
+        plane = np.asarray(self.values(metric)[index], dtype=float)
+        return plane if iy < ix else plane.T
+
+    def params_at(self, index: Sequence[int]) -> ParamPSF:
+        """Параметры узла с номерами index по осям"""
+        return SweepAxis.apply(self.params, self.axes, [axis.values[i] for axis, i in zip(self.axes, index)])
+
+    @staticmethod
+    def _metadata_filename(filename: str) -> str:
+        return os.path.splitext(filename)[0] + '.json'
+
+    def save_metadata(self):
+        """Записать оси и базовые параметры рядом с .npy файлом куба"""
+        metadata = {
+            'params': asdict(self.params),
+            'axes': [{'name': axis.name, 'values': list(axis.values)} for axis in self.axes],
+            'metrics': list(self.metrics),
+        }
+        with open(self._metadata_filename(self.filename), 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False, indent=2)
+
+    def remove_files(self):
+        """Закрыть отображение и удалить .npy куба и .json с осями"""
+        if self.filename is None:
+            return
+        self.data = None  # последняя ссылка на np.memmap - файл закрывается
+        for name in (self.filename, self._metadata_filename(self.filename)):
+            if os.path.exists(name):
+                os.remove(name)
+        self.filename = None
+
+    @classmethod
+    def load(cls, filename: str) -> "SweepCube":
+        """Открыть сохраненный куб без чтения в память"""
+        with open(cls._metadata_filename(filename), encoding='utf-8') as f:
+            metadata = json.load(f)
+        params = ParamPSF(**metadata['params'])
+        params.zernike = tuple(params.zernike)
+        return cls(
+            params=params,
+            axes=[SweepAxis(axis['name'], tuple(axis['values'])) for axis in metadata['axes']],
+            metrics=metadata['metrics'],
+            data=np.load(filename, mmap_mode='r'),
+            filename=filename,
+        )
+
+
+class GridSweep:
+    """
+    Сеточная развертка по любому числу осей (поля ParamPSF и коэффициенты Цернике)
+
+    Декартово произведение не строится целиком: узлы нумеруются плоским
+    индексом, и наборы параметров создаются только для текущей пачки. Пачки
+    считаются в пуле процессов (не больше двух на процесс в работе), внутри
+    пачки точки с общей геометрией зрачка идут одним пакетным расчетом.
+    Результаты пишутся в куб метрик; большой куб или куб с именем файла
+    отображается в .npy через np.memmap.
+    """
+
+    MEMMAP_BYTES = 256 * 1024 * 1024  # кубы больше отображаются в файл
+
+    def __init__(self, axes: Sequence[SweepAxis], metrics: Sequence[str] = ('strehl',),
+                 workers: Optional[int] = None):
+        if not axes:
+            raise ValueError("Не заданы оси развертки")
+        names = [axis.name for axis in axes]
+        if len(set(names)) != len(names):
+            raise ValueError("Оси развертки повторяются")
+        sampling = [name for name in names if name in SweepAxis.SAMPLING_FIELDS and name != 'size']
+        if len(sampling) > 1:
+            raise ValueError(f"Оси развертки задают несовместимые шаги дискретизации: {', '.join(sampling)}")
+        self.axes = list(axes)
+        self.metrics = tuple(metric for metric in SWEEP_METRICS if metric in metrics)
+        if not self.metrics:
+            raise ValueError("Не выбраны метрики")
+        self.workers = workers if workers else (os.cpu_count() or 1)
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return tuple(len(axis.values) for axis in self.axes)
+
+    @property
+    def n_points(self) -> int:
+        return int(np.prod(self.shape))
+
+    @property
+    def nbytes(self) -> int:
+        """Объем куба метрик"""
+        return self.n_points * len(self.metrics) * np.dtype(float).itemsize
+
+    def chunk_size(self, params: ParamPSF) -> int:
+        """Точек в пачке: пакет ФРТ наибольшего размера на осях"""
+        sizes = [params.size] + [int(v) for axis in self.axes if axis.name == 'size' for v in axis.values]
+        return max(16, BATCH_BYTES // (max(sizes) ** 2 * np.dtype(complex).itemsize))
+
+    def run(self, params: ParamPSF, filename: Optional[str] = None,
+            progress: Optional[Callable[[int, int], None]] = None,
+            is_canceled: Optional[Callable[[], bool]] = None) -> Optional[SweepCube]:
+        """
+        Рассчитать куб метрик вокруг params
+
+        Если filename не задан, а куб больше MEMMAP_BYTES, он записывается во
+        временный .npy. При отмене или ошибке временный файл удаляется, иначе
+        он переходит к вызывающему: SweepCube.filename указывает на него, и
+        после работы с кубом его удаляют SweepCube.remove_files. Возвращает
+        None при отмене.
+        """
+        shape = self.shape + (len(self.metrics),)
+        temporary = filename is None and self.nbytes > self.MEMMAP_BYTES
+        if temporary:
+            handle, filename = tempfile.mkstemp(suffix='.npy', prefix='psf_sweep_')
+            os.close(handle)
+        if filename is not None:
+            data = np.lib.format.open_memmap(filename, mode='w+', dtype=float, shape=shape)
+            data[...] = np.nan
+        else:
+            data = np.full(shape, np.nan)
+        cube = SweepCube(params=params, axes=self.axes, metrics=list(self.metrics), data=data, filename=filename)
+        if filename is not None:
+            cube.save_metadata()
+
+        flat = data.reshape(-1, len(self.metrics))
+        total, chunk = self.n_points, self.chunk_size(params)
+        axes, done = tuple(self.axes), 0
+        completed = False
+
+        def accept(start: int, values: np.ndarray):
+            nonlocal done
+            flat[start:start + len(values)] = values
+            done += len(values)
+            if progress is not None:
+                progress(done, total)
+
+        try:
+            if self.workers <= 1:
+                calculator = PSFCalculator()
+                for start in range(0, total, chunk):
+                    points = _grid_points(params, axes, start, min(start + chunk, total))
+                    values = evaluate_metrics(points, self.metrics, calculator, is_canceled=is_canceled)
+                    if values is None:
+                        return None
+                    accept(start, values)
+                completed = True
+                return cube
+
+            tasks = ((params, axes, start, min(start + chunk, total), self.metrics)
+                     for start in range(0, total, chunk))
+            for start, values in process_map(_evaluate_grid_chunk, tasks, self.workers,
+                                             ordered=False, is_canceled=is_canceled):
+                accept(start, values)
+            if is_canceled is not None and is_canceled():
+                return None
+            completed = True
+            return cube
+        finally:
+            if isinstance(data, np.memmap):
+                data.flush()
+            if temporary and not completed:
+                del flat, data
+                cube.remove_files()
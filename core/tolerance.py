@@ -0,0 +1,251 @@
+import os
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from core.psf_params import ParamPSF
+from core.psf_calculator import PSFCalculator
+from core.psf_metrics import PSFMetrics
+from core.pupil_geometry import PupilGeometry
+from core.optimizer import PSFOptimizer
+from core.process_pool import process_map
+
+
+@dataclass(frozen=True)
+class Tolerance:
+    """Допуск на один параметр аберраций ('defocus', 'astigmatism' или 'Z<j>')"""
+    name: str
+    width: float                  # СКО для 'normal', полуширина для 'uniform' (λ)
+    distribution: str = 'normal'  # 'normal' или 'uniform'
+
+    DISTRIBUTIONS = {
+        'normal': "Нормальное (СКО)",
+        'uniform': "Равномерное (±)",
+    }
+
+    def sample(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        """Случайные отклонения параметра от номинала"""
+        if self.distribution == 'normal':
+            return rng.normal(0.0, self.width, n)
+        if self.distribution == 'uniform':
+            return rng.uniform(-self.width, self.width, n)
+        raise ValueError(f"Неизвестное распределение: {self.distribution}")
+
+
+class OnlineHistogram:
+    """
+    Потоковая гистограмма со средним и дисперсией
+
+    Значения не хранятся: число бинов постоянно, а при выходе значения за
+    диапазон соседние бины попарно сливаются и диапазон удваивается.
+    Среднее и дисперсия накапливаются по формулам Уэлфорда для пачек.
+    """
+
+    def __init__(self, bins: int = 256, low: Optional[float] = None, high: Optional[float] = None):
+        self.bins = bins + bins % 2
+        self.low = low
+        self.high = high
+        self.counts = np.zeros(self.bins, dtype=np.int64)
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values: np.ndarray):
+        """Добавить пачку значений (NaN и inf пропускаются)"""
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return
+
+        if self.low is None or self.high is None:
+            low, high = float(values.min()), float(values.max())
+            margin = 0.05 * (high - low) if high > low else max(abs(high) * 0.05, 1e-12)
+            self.low, self.high = low - margin, high + margin
+        while values.min() < self.low:
+            self._extend(downward=True)
+        while values.max() > self.high:
+            self._extend(downward=False)
+
+        index = ((values - self.low) / (self.high - self.low) * self.bins).astype(int)
+        self.counts += np.bincount(np.clip(index, 0, self.bins - 1), minlength=self.bins)
+
+        # Объединение средних и сумм квадратов отклонений (Чан и др.)
+        n, mean = values.size, float(values.mean())
+        m2 = float(np.sum((values - mean) ** 2))
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self._m2 += m2 + delta ** 2 * self.count * n / total
+        self.count = total
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def _extend(self, downward: bool):
+        """Удвоить диапазон, слив бины попарно"""
+        merged = self.counts.reshape(-1, 2).sum(axis=1)
+        self.counts = np.zeros(self.bins, dtype=np.int64)
+        width = self.high - self.low
+        if downward:
+            self.counts[self.bins // 2:] = merged
+            self.low = self.high - 2.0 * width
+        else:
+            self.counts[:self.bins // 2] = merged
+            self.high = self.low + 2.0 * width
+
+    @property
+    def edges(self) -> np.ndarray:
+        return np.linspace(self.low, self.high, self.bins + 1)
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self._m2 / (self.count - 1))) if self.count > 1 else 0.0
+
+    @property
+    def sem(self) -> float:
+        """Стандартная ошибка среднего - показатель сходимости"""
+        return self.std / np.sqrt(self.count) if self.count > 0 else np.nan
+
+    def percentile(self, q: float) -> float:
+        """Процентиль по гистограмме (линейно внутри бина)"""
+        if self.count == 0:
+            return np.nan
+        cumulative = np.concatenate(([0], np.cumsum(self.counts)))
+        target = q / 100.0 * self.count
+        value = float(np.interp(target, cumulative, self.edges))
+        return min(max(value, self.min), self.max)
+
+
+def _evaluate_chunk(params: ParamPSF, names: Tuple[str, ...], deltas: np.ndarray,
+                    keys: Tuple[str, ...]) -> Dict[str, np.ndarray]:
+    """Метрики для пачки отклонений (выполняется в процессе пула)"""
+    geometry = PupilGeometry.for_params(params)
+    W0 = geometry.wavefront(params.defocus, params.astigmatism, params.zernike)
+    directions = PSFOptimizer.directions(geometry, names)
+
+    results = {}
+    if 'strehl' in keys:
+        # |<exp(2πiW)>|² через cos/sin в float32 - векторные функции в разы быстрее комплексной экспоненты
+        phase = deltas.astype(np.float32) @ (2.0 * np.pi * directions).astype(np.float32)
+        phase += (2.0 * np.pi * W0).astype(np.float32)
+        real = np.cos(phase).mean(axis=1, dtype=np.float64)
+        imag = np.sin(phase).mean(axis=1, dtype=np.float64)
+        results['strehl'] = real ** 2 + imag ** 2
+    psf_keys = [key for key in keys if key != 'strehl']
+    if psf_keys:
+        W = W0 + deltas @ directions
+        psfs = PSFCalculator._psf_stack(geometry, W, params.step_pupil, params.step_object)
+        metrics = PSFMetrics.compute(psfs, params.step_object * params.magnification, psf_keys)
+        results.update({key: np.atleast_1d(metrics[key]) for key in psf_keys})
+    return results
+
+
+@dataclass
+class ToleranceResult:
+    """Итог анализа допусков"""
+    histograms: Dict[str, OnlineHistogram]
+    nominal: Dict[str, float]
+    n_draws: int
+    seed: int
+    history: List[Tuple[int, Dict[str, Tuple[float, float]]]] = field(default_factory=list)
+
+    def summary(self, key: str) -> Dict[str, float]:
+        """Среднее, СКО и процентили метрики"""
+        histogram = self.histograms[key]
+        return {
+            'mean': histogram.mean,
+            'std': histogram.std,
+            'sem': histogram.sem,
+            'p5': histogram.percentile(5),
+            'p50': histogram.percentile(50),
+            'p95': histogram.percentile(95),
+        }
+
+
+class ToleranceAnalysis:
+    """
+    Анализ допусков методом Монте-Карло
+
+    Отклонения всех параметров генерируются векторно одним генератором с
+    заданным зерном (результат не зависит от числа процессов), пачки
+    отклонений считаются в пуле процессов: число Штреля - по сумме по зрачку
+    без БПФ, остальные метрики - по пакетным ФРТ. Значения сразу попадают в
+    потоковые гистограммы, ФРТ и отдельные значения не сохраняются.
+    """
+
+    STREHL_BATCH_BYTES = 64 * 1024 * 1024  # фазы float32 одной пачки для суммы по зрачку
+
+    def __init__(self, tolerances: Sequence[Tolerance], keys: Sequence[str] = ('strehl',),
+                 n_draws: int = 5000, seed: int = 0, workers: Optional[int] = None, bins: int = 256):
+        if not tolerances:
+            raise ValueError("Не заданы допуски")
+        self.tolerances = list(tolerances)
+        self.keys = tuple(keys)
+        self.n_draws = n_draws
+        self.seed = seed
+        self.workers = workers if workers else (os.cpu_count() or 1)
+        self.bins = bins
+
+    def chunk_size(self, params: ParamPSF) -> int:
+        """Размер пачки по памяти: пакетные ФРТ или фазы на пикселях апертуры"""
+        if any(key != 'strehl' for key in self.keys):
+            return max(1, PSFCalculator.BATCH_BYTES // (params.size * params.size * np.dtype(complex).itemsize))
+        n_pixels = max(PupilGeometry.for_params(params).n_pixels, 1)
+        return max(64, self.STREHL_BATCH_BYTES // (n_pixels * np.dtype(np.float32).itemsize))
+
+    def _draws(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        """Матрица отклонений (n, p)"""
+        return np.column_stack([tolerance.sample(rng, n) for tolerance in self.tolerances])
+
+    def run(self, params: ParamPSF,
+            progress: Optional[Callable[[int, int], None]] = None,
+            is_canceled: Optional[Callable[[], bool]] = None,
+            on_chunk: Optional[Callable[[ToleranceResult], None]] = None) -> Optional[ToleranceResult]:
+        """
+        Выполнить анализ для номинальных параметров params
+
+        on_chunk(result) вызывается после каждой обработанной пачки - по нему
+        видно, как сходятся среднее и процентили. Возвращает None при отмене.
+        """
+        names = tuple(tolerance.name for tolerance in self.tolerances)
+        nominal = _evaluate_chunk(params, names, np.zeros((1, len(names))), self.keys)
+        result = ToleranceResult(
+            histograms={key: OnlineHistogram(self.bins, *((0.0, 1.0) if key == 'strehl' else (None, None)))
+                        for key in self.keys},
+            nominal={key: float(values[0]) for key, values in nominal.items()},
+            n_draws=self.n_draws,
+            seed=self.seed,
+        )
+
+        rng = np.random.default_rng(self.seed)
+        chunk = self.chunk_size(params)
+        starts = range(0, self.n_draws, chunk)
+
+        def accept(values: Dict[str, np.ndarray]):
+            for key, data in values.items():
+                result.histograms[key].update(data)
+            done = result.histograms[self.keys[0]].count
+            result.history.append((done, {key: (h.mean, h.sem) for key, h in result.histograms.items()}))
+            if progress is not None:
+                progress(done, self.n_draws)
+            if on_chunk is not None:
+                on_chunk(result)
+
+        if self.workers <= 1:
+            for start in starts:
+                if is_canceled is not None and is_canceled():
+                    return None
+                deltas = self._draws(rng, min(chunk, self.n_draws - start))
+                accept(_evaluate_chunk(params, names, deltas, self.keys))
+            return result
+
+        # Пул процессов: отклонения генерируются лениво в порядке пачек, а
+        # результаты принимаются в том же порядке, поэтому выборка и
+        # гистограммы не зависят от пула
+        tasks = ((params, names, self._draws(rng, min(chunk, self.n_draws - start)), self.keys)
+                 for start in starts)
+        for values in process_map(_evaluate_chunk, tasks, self.workers, is_canceled=is_canceled):
+            accept(values)
+        if is_canceled is not None and is_canceled():
+            return None
+        return result
@@ -0,0 +1,140 @@
+import re
+import numpy as np
+from math import factorial
+from typing import Dict, Sequence, Tuple
+
+
+class Zernike:
+    """
+    Полиномы Цернике в нумерации Нолла
+
+    Полиномы нормированы по Ноллу (СКО по единичному кругу равно 1),
+    поэтому коэффициенты задаются как СКО волновой аберрации в длинах волн.
+    Коэффициент с индексом j - 1 в векторе относится к полиному Z_j.
+    """
+
+    MAX_NOLL = 36
+
+    # Названия младших членов для подсказок и отчетов
+    NAMES = {
+        1: "Поршень",
+        2: "Наклон X",
+        3: "Наклон Y",
+        4: "Расфокусировка",
+        5: "Астигматизм 45°",
+        6: "Астигматизм 0°",
+        7: "Кома Y",
+        8: "Кома X",
+        9: "Трилистник Y",
+        10: "Трилистник X",
+        11: "Сферическая",
+    }
+
+    _TERM = re.compile(r"^Z?(\d+)=([-+0-9.eE]+)$", re.IGNORECASE)
+    _NAME = re.compile(r"^Z(\d+)$", re.IGNORECASE)
+
+    @staticmethod
+    def noll_to_nm(j: int) -> Tuple[int, int]:
+        """Радиальный порядок n и азимутальная частота m для индекса Нолла j"""
+        if j < 1:
+            raise ValueError(f"Индекс Нолла должен быть >= 1: {j}")
+        n = 0
+        j1 = j - 1
+        while j1 > n:
+            n += 1
+            j1 -= n
+        m = (n % 2) + 2 * ((j1 + ((n + 1) % 2)) // 2)
+        # Четные j - косинусные члены, нечетные - синусные
+        return n, (m if j % 2 == 0 or m == 0 else -m)
+
+    @staticmethod
+    def radial(n: int, m: int, rho_powers: Sequence[np.ndarray]) -> np.ndarray:
+        """Радиальный полином R_n^m по заранее вычисленным степеням ρ"""
+        m = abs(m)
+        result = np.zeros_like(rho_powers[0])
+        for k in range((n - m) // 2 + 1):
+            coefficient = ((-1) ** k * factorial(n - k)
+                           / (factorial(k) * factorial((n + m) // 2 - k) * factorial((n - m) // 2 - k)))
+            result += coefficient * rho_powers[n - 2 * k]
+        return result
+
+    @classmethod
+    def basis(cls, rho: np.ndarray, phi: np.ndarray, n_terms: int) -> np.ndarray:
+        """
+        Матрица полиномов Z_1..Z_n_terms формы (n_terms, len(rho))
+
+        rho - нормированный радиус (0..1), phi - угол для тех же точек.
+        """
+        if not 0 <= n_terms <= cls.MAX_NOLL:
+            raise ValueError(f"Число членов Цернике должно быть от 0 до {cls.MAX_NOLL}")
+
+        orders = [cls.noll_to_nm(j) for j in range(1, n_terms + 1)]
+        n_max = max((n for n, _ in orders), default=0)
+
+        rho_powers = [np.ones_like(rho)]
+        for _ in range(n_max):
+            rho_powers.append(rho_powers[-1] * rho)
+
+        basis = np.empty((n_terms, rho.size))
+        for i, (n, m) in enumerate(orders):
+            radial = cls.radial(n, m, rho_powers)
+            if m == 0:
+                basis[i] = np.sqrt(n + 1) * radial
+            elif m > 0:
+                basis[i] = np.sqrt(2 * (n + 1)) * radial * np.cos(m * phi)
+            else:
+                basis[i] = np.sqrt(2 * (n + 1)) * radial * np.sin(-m * phi)
+        return basis
+
+    @classmethod
+    def is_term_name(cls, name: str) -> bool:
+        """Является ли имя именем члена Цернике вида 'Z7'"""
+        return cls._NAME.match(name) is not None
+
+    @classmethod
+    def noll_index(cls, name: str) -> int:
+        """Номер Нолла для имени вида 'Z7'"""
+        match = cls._NAME.match(name)
+        if match is None:
+            raise ValueError(f"Неверное имя члена Цернике: {name}")
+        j = int(match.group(1))
+        if not 1 <= j <= cls.MAX_NOLL:
+            raise ValueError(f"Номер Цернике должен быть от 1 до {cls.MAX_NOLL}: {name}")
+        return j
+
+    @classmethod
+    def title(cls, j: int) -> str:
+        """Подпись члена: 'Z7 Кома Y'"""
+        return f"Z{j} {cls.NAMES.get(j, '')}".strip()
+
+    @staticmethod
+    def with_terms(coefficients: Sequence[float], terms: Dict[int, float]) -> Tuple[float, ...]:
+        """Вектор коэффициентов с заменой членов {j: значение}, при необходимости удлиненный"""
+        result = list(coefficients)
+        result.extend([0.0] * (max(terms, default=0) - len(result)))
+        for j, value in terms.items():
+            result[j - 1] = float(value)
+        return tuple(result)
+
+    @classmethod
+    def format(cls, coefficients: Sequence[float]) -> str:
+        """Краткая запись ненулевых коэффициентов: 'Z4=0.1 Z11=-0.05'"""
+        return " ".join(f"Z{j}={c:g}" for j, c in enumerate(coefficients, 1) if c != 0)
+
+    @classmethod
+    def parse(cls, text: str) -> Tuple[float, ...]:
+        """Разобрать запись вида 'Z4=0.1 Z11=-0.05' в вектор коэффициентов"""
+        terms = {}
+        for part in text.replace(';', ' ').split():
+            match = cls._TERM.match(part)
+            if match is None:
+                raise ValueError(f"Неверная запись коэффициента Цернике: {part}")
+            j = int(match.group(1))
+            if not 1 <= j <= cls.MAX_NOLL:
+                raise ValueError(f"Индекс Нолла должен быть от 1 до {cls.MAX_NOLL}: {j}")
+            terms[j] = float(match.group(2))
+
+        coefficients = [0.0] * max(terms, default=0)
+        for j, value in terms.items():
+            coefficients[j - 1] = value
+        return tuple(coefficients)
@@ -0,0 +1,26 @@
+import numpy as np
+from core.coherence import Illumination, PartialCoherenceImager
+from core.psf_calculator import PSFCalculator
+from core.psf_metrics import PSFMetrics
+from core.psf_params import ParamPSF
+
+
+def test_coherent_point_image_matches_psf_with_coma():
+    """При σ → 0 изображение точечного объекта совпадает с ФРТ, кома не переворачивается"""
+    params = ParamPSF(size=128, zernike=(0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.3))
+    psf, _ = PSFCalculator().compute(params)
+
+    n = 64
+    transmission = np.zeros((n, n))
+    transmission[n // 2, n // 2] = 1.0
+    image = PartialCoherenceImager(n_kernels=4).image(transmission, params, Illumination(sigma=0.0))
+
+    center = params.size // 2
+    expected = psf[center - n // 2:center + n // 2, center - n // 2:center + n // 2]
+    image = image / image.sum()
+    expected = expected / expected.sum()
+
+    assert np.max(np.abs(image - expected)) < 1e-3 * expected.max()
+    centroid = PSFMetrics.compute(image[None], 1.0, ['centroid_y'])['centroid_y'][0]
+    expected_centroid = PSFMetrics.compute(expected[None], 1.0, ['centroid_y'])['centroid_y'][0]
+    assert abs(centroid - expected_centroid) < 0.05
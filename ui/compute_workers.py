@@ -0,0 +1,426 @@
+"""
+Фоновые потоки для расчета ФРТ без блокировки интерфейса
+"""
+
+import threading
+from dataclasses import replace
+import numpy as np
+from typing import Callable, List, Tuple
+from PyQt6.QtCore import QThread, pyqtSignal
+from core.psf_params import ParamPSF
+from core.psf_calculator import PSFCalculator
+from core.psf_cache import PSFCache
+from core.psf_volume import PSFVolume
+from core.field_grid import FieldGrid, FieldAberrations
+from core.imaging import ImageSimulator, SpatiallyVariantSimulator
+from core.coherence import PartialCoherenceImager, Illumination
+from core.phase_retrieval import PhaseRetrieval
+from core.aberration_fit import AberrationFit
+from core.optimizer import PSFOptimizer
+from core.tolerance import ToleranceAnalysis
+from core.sensitivity import SensitivityAnalysis
+from core.strehl_lut import StrehlLUT
+from core.sweep import AdaptiveSweep, GridSweep
+
+
+class RefineWorker(QThread):
+    """
+    Поток уточнения ФРТ до полного размера после быстрого предпросмотра
+
+    Один поток на окно: schedule заменяет ожидающее задание, поэтому
+    устаревшие уточнения отбрасываются, не начавшись, и одновременно
+    считается не больше одной полной ФРТ. Начатый расчет (один вызов БПФ)
+    не прерывается - его результат отбрасывается окном по номеру token.
+    """
+
+    refined = pyqtSignal(int, int, object, float)  # token, row, psf, strehl_ratio
+    failed = pyqtSignal(int, int, str)  # token, row, message
+    idle = pyqtSignal()  # задание выполнено, новых нет
+
+    def __init__(self):
+        super().__init__()
+        self.calculator = PSFCalculator()
+        self._job = None  # (token, row, params) - только последнее задание
+        self._busy = False
+        self._condition = threading.Condition()
+        self._stopped = False
+
+    def schedule(self, token: int, row: int, params: ParamPSF):
+        """Заменить ожидающее задание новым"""
+        with self._condition:
+            self._job = (token, row, params)
+            self._condition.notify()
+
+    def cancel(self):
+        """Отбросить ожидающее задание"""
+        with self._condition:
+            self._job = None
+
+    def is_idle(self) -> bool:
+        """Нет ни выполняемого, ни ожидающего задания"""
+        with self._condition:
+            return self._job is None and not self._busy
+
+    def stop(self):
+        """Остановить поток"""
+        with self._condition:
+            self._stopped = True
+            self._job = None
+            self._condition.notify()
+
+    def run(self):
+        """Цикл уточнения: всегда берется последнее задание"""
+        while True:
+            with self._condition:
+                while self._job is None and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                token, row, params = self._job
+                self._job = None
+                self._busy = True
+
+            try:
+                psf, strehl_ratio = self.calculator.compute(params)
+            except Exception as e:
+                self.failed.emit(token, row, str(e))
+            else:
+                self.refined.emit(token, row, psf, strehl_ratio)
+                psf = None  # поток не держит полную ФРТ до следующего задания
+
+            with self._condition:
+                self._busy = False
+                idle = self._job is None
+            if idle:
+                self.idle.emit()
+
+
+class PrefetchWorker(QThread):
+    """
+    Фоновая предзагрузка ФРТ соседних строк в кэш
+
+    Очередь заданий заменяется целиком при каждом новом выборе строки.
+    Перед каждым расчетом поток ждет, пока интерфейс не освободит
+    передний план, и не вытесняет из кэша уже сохраненные ФРТ.
+    """
+
+    prefetched = pyqtSignal(int)  # row
+
+    def __init__(self, cache: PSFCache):
+        super().__init__()
+        self.cache = cache
+        self.calculator = PSFCalculator()
+        self._jobs: List[Tuple[int, ParamPSF]] = []
+        self._condition = threading.Condition()
+        self._foreground_idle = threading.Event()
+        self._foreground_idle.set()
+        self._stopped = False
+
+    def schedule(self, jobs: List[Tuple[int, ParamPSF]]):
+        """Заменить очередь заданий (строка, параметры) в порядке приоритета"""
+        with self._condition:
+            self._jobs = list(jobs)
+            self._condition.notify()
+
+    def pause(self):
+        """Уступить процессор расчету на переднем плане"""
+        self._foreground_idle.clear()
+
+    def resume(self):
+        """Продолжить предзагрузку после расчета на переднем плане"""
+        self._foreground_idle.set()
+
+    def stop(self):
+        """Остановить поток"""
+        with self._condition:
+            self._stopped = True
+            self._jobs = []
+            self._condition.notify()
+        self._foreground_idle.set()
+
+    def run(self):
+        """Цикл обработки очереди предзагрузки"""
+        while True:
+            with self._condition:
+                while not self._jobs and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+
+            self._foreground_idle.wait()
+
+            with self._condition:
+                if self._stopped:
+                    return
+                if not self._jobs:
+                    continue
+                row, params = self._jobs.pop(0)
+
+            if params in self.cache:
+                continue
+            # Не начинаем расчет, результат которого не поместится в бюджет памяти
+            if self.cache.nbytes + PSFCache.estimate_nbytes(params) > self.cache.budget_bytes:
+                continue
+
+            try:
+                psf, strehl_ratio = self.calculator.compute(params)
+            except Exception as e:
+                print(f"Ошибка предзагрузки строки {row}: {e}")
+                continue
+
+            if self.cache.put(params, psf, strehl_ratio, evict=False):
+                self.prefetched.emit(row)
+
+
+class JobWorker(QThread):
+    """
+    Базовый класс потока долгого расчета с прогрессом и отменой
+
+    Подкласс переопределяет compute(progress, is_canceled), который выполняется
+    в потоке run. Результат compute передается сигналом result_ready, None
+    (отмена) не передается, исключение превращается в сигнал failed с текстом
+    ошибки. Окно запускает такие потоки через PSFMainWindow._run_job.
+    """
+
+    progress_updated = pyqtSignal(int, int)  # done, total
+    result_ready = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self):
+        super().__init__()
+        self.is_canceled = False
+
+    def compute(self, progress: Callable[[int, int], None], is_canceled: Callable[[], bool]):
+        """
+        Расчет, переопределяется в подклассах
+
+        progress(done, total) сообщает о ходе расчета (вызывается из рабочего
+        потока, передается в progress_updated); is_canceled() нужно проверять
+        между порциями работы и при отмене возвращать None.
+        """
+        raise NotImplementedError(f"{type(self).__name__} не реализует compute")
+
+    def run(self):
+        """Выполнение расчета"""
+        try:
+            result = self.compute(self.progress_updated.emit, lambda: self.is_canceled)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+
+        if result is not None:
+            self.result_ready.emit(result)
+
+    def cancel(self):
+        """Отмена расчета"""
+        self.is_canceled = True
+
+
+class VolumeWorker(JobWorker):
+    """Поток расчета трехмерной ФРТ с записью в файл"""
+
+    def __init__(self, params: ParamPSF, z_values: np.ndarray, filename: str):
+        super().__init__()
+        self.params = params
+        self.z_values = z_values
+        self.filename = filename
+        self.volume = PSFVolume()
+
+    def compute(self, progress, is_canceled):
+        return self.volume.compute(self.params, self.z_values, self.filename,
+                                   progress=progress, is_canceled=is_canceled)
+
+
+class FieldGridWorker(JobWorker):
+    """Поток расчета сетки ФРТ по полю зрения с записью в файл"""
+
+    def __init__(self, params: ParamPSF, field_points: np.ndarray, model: FieldAberrations, filename: str):
+        super().__init__()
+        self.params = params
+        self.field_points = field_points
+        self.model = model
+        self.filename = filename
+        self.field_grid = FieldGrid()
+
+    def compute(self, progress, is_canceled):
+        return self.field_grid.compute(self.params, self.field_points, self.field_points, self.model,
+                                       self.filename, progress=progress, is_canceled=is_canceled)
+
+
+class ImageSimulationWorker(JobWorker):
+    """Поток моделирования изображения объекта через ФРТ"""
+
+    def __init__(self, image: np.ndarray, psf: np.ndarray, simulator: ImageSimulator):
+        super().__init__()
+        self.image = image
+        self.psf = psf
+        self.simulator = simulator
+
+    def compute(self, progress, is_canceled):
+        return self.simulator.convolve(self.image, self.psf, progress=progress, is_canceled=is_canceled)
+
+
+class SpatiallyVariantWorker(JobWorker):
+    """Поток моделирования изображения с ФРТ, меняющейся по полю зрения"""
+
+    def __init__(self, image: np.ndarray, psf_grid: np.ndarray, field_x: np.ndarray, field_y: np.ndarray,
+                 simulator: SpatiallyVariantSimulator):
+        super().__init__()
+        self.image = image
+        self.psf_grid = psf_grid
+        self.field_x = field_x
+        self.field_y = field_y
+        self.simulator = simulator
+
+    def compute(self, progress, is_canceled):
+        explained = self.simulator.decompose(self.psf_grid, self.field_x, self.field_y)
+        result = self.simulator.convolve(self.image, progress=progress, is_canceled=is_canceled)
+        if result is None:
+            return None
+        return explained, result
+
+
+class PartialCoherenceWorker(JobWorker):
+    """Поток расчета частично когерентного изображения"""
+
+    def __init__(self, transmission: np.ndarray, params: ParamPSF, illumination: Illumination,
+                 imager: PartialCoherenceImager):
+        super().__init__()
+        self.transmission = transmission
+        self.params = params
+        self.illumination = illumination
+        self.imager = imager
+
+    def compute(self, progress, is_canceled):
+        return self.imager.image(self.transmission, self.params, self.illumination,
+                                 progress=progress, is_canceled=is_canceled)
+
+
+class PhaseRetrievalWorker(JobWorker):
+    """Поток восстановления фазы зрачка по измеренным ФРТ"""
+
+    def __init__(self, measured: np.ndarray, params: ParamPSF, diversity: List[float],
+                 retrieval: PhaseRetrieval):
+        super().__init__()
+        self.measured = measured
+        self.params = params
+        self.diversity = diversity
+        self.retrieval = retrieval
+
+    def compute(self, progress, is_canceled):
+        return self.retrieval.retrieve(self.measured, self.params, self.diversity,
+                                       progress=progress, is_canceled=is_canceled)
+
+
+class AberrationFitWorker(JobWorker):
+    """Поток подбора аберраций по измеренной ФРТ"""
+
+    def __init__(self, measured: np.ndarray, params: ParamPSF, fitter: AberrationFit):
+        super().__init__()
+        self.measured = measured
+        self.params = params
+        self.fitter = fitter
+
+    def compute(self, progress, is_canceled):
+        return self.fitter.fit(self.measured, self.params, progress=progress, is_canceled=is_canceled)
+
+
+class OptimizationWorker(JobWorker):
+    """Поток поиска оптимальных параметров"""
+
+    evaluated = pyqtSignal(int, object, float)  # номер оценки, точка, значение критерия
+
+    def __init__(self, params: ParamPSF, names: List[str], bounds: List[Tuple[float, float]],
+                 optimizer: PSFOptimizer):
+        super().__init__()
+        self.params = params
+        self.names = names
+        self.bounds = bounds
+        self.optimizer = optimizer
+
+    def compute(self, progress, is_canceled):
+        def callback(n, x, value):
+            self.evaluated.emit(n, x, value)
+            progress(min(n, self.optimizer.max_evaluations), self.optimizer.max_evaluations)
+
+        return self.optimizer.optimize(self.params, self.names, self.bounds,
+                                       callback=callback, is_canceled=is_canceled)
+
+
+class ToleranceWorker(JobWorker):
+    """Поток анализа допусков методом Монте-Карло"""
+
+    chunk_done = pyqtSignal(int, object)  # число реализаций, сводка по числу Штреля
+
+    def __init__(self, params: ParamPSF, analysis: ToleranceAnalysis):
+        super().__init__()
+        self.params = params
+        self.analysis = analysis
+
+    def compute(self, progress, is_canceled):
+        def on_chunk(result):
+            self.chunk_done.emit(result.histograms['strehl'].count, result.summary('strehl'))
+
+        return self.analysis.run(self.params, progress=progress, is_canceled=is_canceled, on_chunk=on_chunk)
+
+
+class SensitivityWorker(JobWorker):
+    """Поток расчета чувствительностей для строк таблицы"""
+
+    def __init__(self, params_list: List[ParamPSF], analysis: SensitivityAnalysis):
+        super().__init__()
+        self.params_list = params_list
+        self.analysis = analysis
+
+    def compute(self, progress, is_canceled):
+        return self.analysis.compute(self.params_list, progress=progress, is_canceled=is_canceled)
+
+
+class StrehlLUTWorker(JobWorker):
+    """Поток расчета таблицы оценок Штреля с записью в .npz"""
+
+    def __init__(self, params: ParamPSF, limits: Tuple[float, float], n_points: int,
+                 metrics: Tuple[str, ...], filename: str):
+        super().__init__()
+        self.params = params
+        self.limits = limits
+        self.n_points = n_points
+        self.metrics = metrics
+        self.filename = filename
+
+    def compute(self, progress, is_canceled):
+        lut = StrehlLUT.build(self.params, self.limits, self.limits, self.n_points, self.metrics,
+                              progress=progress, is_canceled=is_canceled)
+        if lut is not None:
+            lut.save(self.filename)
+        return lut
+
+
+class SweepWorker(JobWorker):
+    """Поток адаптивной развертки; после каждого уровня отправляет копию результата"""
+
+    level_done = pyqtSignal(object)  # SweepResult
+
+    def __init__(self, params: ParamPSF, sweep: AdaptiveSweep):
+        super().__init__()
+        self.params = params
+        self.sweep = sweep
+
+    def compute(self, progress, is_canceled):
+        def on_level(result):
+            self.level_done.emit(replace(result, values=result.values.copy()))
+
+        return self.sweep.run(self.params, progress=progress, is_canceled=is_canceled, on_level=on_level)
+
+
+class GridSweepWorker(JobWorker):
+    """Поток сеточной развертки в куб метрик"""
+
+    def __init__(self, params: ParamPSF, sweep: GridSweep, filename: str = None):
+        super().__init__()
+        self.params = params
+        self.sweep = sweep
+        self.filename = filename
+
+    def compute(self, progress, is_canceled):
+        return self.sweep.run(self.params, self.filename, progress=progress, is_canceled=is_canceled)
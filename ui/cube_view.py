@@ -0,0 +1,113 @@
+"""
+Виджет куба сеточной развертки: двумерные срезы N-мерного куба метрик
+"""
+
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QGridLayout, QLabel, QComboBox, QSlider
+from PyQt6.QtCore import Qt, pyqtSignal
+from core.sweep import SWEEP_METRICS, SweepCube
+from ui.map_view import MapView
+
+
+class CubeView(QWidget):
+    """Тепловая карта среза куба: выбор метрики, осей карты и положения по остальным осям"""
+
+    point_selected = pyqtSignal(object)  # ParamPSF выбранного узла
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.cube = None
+        self.sliders = {}
+        self._init_ui()
+
+    def _init_ui(self):
+        layout = QVBoxLayout(self)
+
+        control_layout = QHBoxLayout()
+        control_layout.addWidget(QLabel("Метрика:"))
+        self.metric_combo = QComboBox()
+        control_layout.addWidget(self.metric_combo)
+        control_layout.addWidget(QLabel("X:"))
+        self.x_combo = QComboBox()
+        control_layout.addWidget(self.x_combo)
+        control_layout.addWidget(QLabel("Y:"))
+        self.y_combo = QComboBox()
+        control_layout.addWidget(self.y_combo)
+        control_layout.addStretch()
+        layout.addLayout(control_layout)
+
+        self.slider_layout = QGridLayout()
+        layout.addLayout(self.slider_layout)
+
+        self.map_view = MapView()
+        self.map_view.point_selected.connect(self._on_point_selected)
+        layout.addWidget(self.map_view)
+
+        for combo in (self.metric_combo, self.x_combo, self.y_combo):
+            combo.currentIndexChanged.connect(self._on_axes_changed)
+
+    def set_cube(self, cube: SweepCube):
+        """Показать куб"""
+        self.cube = cube
+        for combo in (self.metric_combo, self.x_combo, self.y_combo):
+            combo.blockSignals(True)
+            combo.clear()
+        for metric in cube.metrics:
+            self.metric_combo.addItem(SWEEP_METRICS[metric], metric)
+        for axis in cube.axes:
+            self.x_combo.addItem(axis.title, axis.name)
+            self.y_combo.addItem(axis.title, axis.name)
+        self.y_combo.setCurrentIndex(min(1, len(cube.axes) - 1))
+        for combo in (self.metric_combo, self.x_combo, self.y_combo):
+            combo.blockSignals(False)
+        self._on_axes_changed()
+
+    def _on_axes_changed(self):
+        """Пересоздать ползунки для осей, не показанных на карте"""
+        if self.cube is None:
+            return
+        while self.slider_layout.count():
+            widget = self.slider_layout.takeAt(0).widget()
+            if widget is not None:
+                widget.deleteLater()
+        self.sliders = {}
+
+        shown = (self.x_combo.currentData(), self.y_combo.currentData())
+        for row, axis in enumerate(axis for axis in self.cube.axes if axis.name not in shown):
+            slider = QSlider(Qt.Orientation.Horizontal)
+            slider.setRange(0, len(axis.values) - 1)
+            label = QLabel()
+            slider.valueChanged.connect(lambda i, a=axis, l=label: l.setText(f"{a.values[i]:.4g}"))
+            slider.valueChanged.connect(self._show_slice)
+            label.setText(f"{axis.values[0]:.4g}")
+            self.slider_layout.addWidget(QLabel(axis.title), row, 0)
+            self.slider_layout.addWidget(slider, row, 1)
+            self.slider_layout.addWidget(label, row, 2)
+            self.sliders[axis.name] = slider
+        self._show_slice()
+
+    def _fixed(self) -> dict:
+        return {name: slider.value() for name, slider in self.sliders.items()}
+
+    def _show_slice(self):
+        """Отрисовать текущий срез"""
+        x_name, y_name = self.x_combo.currentData(), self.y_combo.currentData()
+        metric = self.metric_combo.currentData()
+        x_axis = self.cube.axes[self.cube.axis_index(x_name)]
+        title = SWEEP_METRICS[metric]
+        if x_name == y_name:
+            # Одна ось на обеих координатах - профиль в виде карты из одной строки
+            plane = self.cube.slice(metric, x_name, x_name, self._fixed())[None, :]
+            self.map_view.set_maps({title: plane}, x_axis.values, [0.0], x_axis.title, "")
+            return
+        y_axis = self.cube.axes[self.cube.axis_index(y_name)]
+        plane = self.cube.slice(metric, x_name, y_name, self._fixed())
+        self.map_view.set_maps({title: plane}, x_axis.values, y_axis.values, x_axis.title, y_axis.title)
+
+    def _on_point_selected(self, iy: int, ix: int):
+        """Сообщить параметры выбранного узла куба"""
+        x_name, y_name = self.x_combo.currentData(), self.y_combo.currentData()
+        fixed = self._fixed()
+        fixed[x_name] = ix
+        if y_name != x_name:
+            fixed[y_name] = iy
+        self.point_selected.emit(self.cube.params_at([fixed.get(axis.name, 0) for axis in self.cube.axes]))
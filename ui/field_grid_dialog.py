@@ -0,0 +1,74 @@
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QSpinBox,
+    QDoubleSpinBox, QGroupBox, QPushButton, QGridLayout
+)
+import numpy as np
+from core.field_grid import FieldAberrations
+
+
+class FieldGridDialog(QDialog):
+    """Диалог настройки сетки точек поля и полевых аберраций"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("ФРТ по полю зрения")
+        self.setModal(True)
+
+        self._init_ui()
+
+    def _init_ui(self):
+        layout = QVBoxLayout(self)
+
+        grid_group = QGroupBox("Сетка точек поля")
+        grid_layout = QGridLayout(grid_group)
+        grid_layout.addWidget(QLabel("Точек по стороне:"), 0, 0)
+        self.points_spin = QSpinBox()
+        self.points_spin.setRange(2, 101)
+        self.points_spin.setValue(21)
+        grid_layout.addWidget(self.points_spin, 0, 1)
+        layout.addWidget(grid_group)
+
+        aberration_group = QGroupBox("Аберрации на краю поля (СКО, λ)")
+        aberration_layout = QGridLayout(aberration_group)
+        self.curvature_spin = self._make_spin(0.1)
+        self.astigmatism_spin = self._make_spin(0.05)
+        self.coma_spin = self._make_spin(0.05)
+        for i, (title, spin) in enumerate([
+            ("Кривизна поля (Z4 ~ h²):", self.curvature_spin),
+            ("Астигматизм (Z5/Z6 ~ h²):", self.astigmatism_spin),
+            ("Кома (Z7/Z8 ~ h):", self.coma_spin),
+        ]):
+            aberration_layout.addWidget(QLabel(title), i, 0)
+            aberration_layout.addWidget(spin, i, 1)
+        layout.addWidget(aberration_group)
+
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        btn_ok = QPushButton("Рассчитать")
+        btn_ok.clicked.connect(self.accept)
+        btn_cancel = QPushButton("Отмена")
+        btn_cancel.clicked.connect(self.reject)
+        button_layout.addWidget(btn_ok)
+        button_layout.addWidget(btn_cancel)
+        layout.addLayout(button_layout)
+
+    @staticmethod
+    def _make_spin(value: float) -> QDoubleSpinBox:
+        spin = QDoubleSpinBox()
+        spin.setRange(-5.0, 5.0)
+        spin.setSingleStep(0.01)
+        spin.setDecimals(3)
+        spin.setValue(value)
+        return spin
+
+    def get_field_points(self) -> np.ndarray:
+        """Нормированные координаты точек поля по одной оси"""
+        return np.linspace(-1.0, 1.0, self.points_spin.value())
+
+    def get_model(self) -> FieldAberrations:
+        """Модель полевых аберраций"""
+        return FieldAberrations(
+            field_curvature=self.curvature_spin.value(),
+            astigmatism=self.astigmatism_spin.value(),
+            coma=self.coma_spin.value()
+        )
@@ -0,0 +1,92 @@
+"""
+Виджет гистограмм распределений метрик (анализ допусков)
+"""
+
+import numpy as np
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox
+from PyQt6.QtCore import Qt
+import pyqtgraph as pg
+
+
+class HistogramView(QWidget):
+    """Гистограмма выбранной метрики с процентилями и номиналом"""
+
+    PERCENTILES = (5, 50, 95)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self.result = None
+        self.titles = {}
+
+        self._init_ui()
+
+    def _init_ui(self):
+        layout = QVBoxLayout(self)
+
+        control_layout = QHBoxLayout()
+        control_layout.addWidget(QLabel("Метрика:"))
+        self.metric_combo = QComboBox()
+        self.metric_combo.currentIndexChanged.connect(self._show_current)
+        control_layout.addWidget(self.metric_combo)
+        control_layout.addStretch()
+        layout.addLayout(control_layout)
+
+        self.plot = pg.PlotWidget()
+        self.plot.setBackground('k')
+        self.plot.showGrid(x=True, y=True, alpha=0.3)
+        self.plot.setLabel('left', "Доля реализаций")
+        self.curve = pg.PlotCurveItem([0.0, 1.0], [0.0], stepMode='center', fillLevel=0,
+                                      brush=(80, 140, 220, 150),
+                                      pen=pg.mkPen((120, 180, 255), width=1))
+        self.plot.addItem(self.curve)
+        self.lines = []
+        for _ in self.PERCENTILES:
+            line = pg.InfiniteLine(angle=90, pen=pg.mkPen('y', style=Qt.PenStyle.DashLine))
+            self.plot.addItem(line)
+            self.lines.append(line)
+        self.nominal_line = pg.InfiniteLine(angle=90, pen=pg.mkPen('r', width=2))
+        self.plot.addItem(self.nominal_line)
+        layout.addWidget(self.plot)
+
+        self.stats_label = QLabel()
+        layout.addWidget(self.stats_label)
+
+    def set_result(self, result, titles: dict):
+        """Показать результат ToleranceAnalysis; titles - подписи метрик по ключам"""
+        self.result = result
+        self.titles = titles
+        self.metric_combo.blockSignals(True)
+        self.metric_combo.clear()
+        for key in result.histograms:
+            self.metric_combo.addItem(titles.get(key, key), key)
+        self.metric_combo.blockSignals(False)
+        self._show_current()
+
+    def _show_current(self):
+        """Отрисовать гистограмму выбранной метрики"""
+        key = self.metric_combo.currentData()
+        if self.result is None or key is None:
+            return
+        histogram = self.result.histograms[key]
+        counts = histogram.counts / max(histogram.count, 1)
+
+        # Пустые крайние бины не показываем
+        filled = np.flatnonzero(histogram.counts)
+        if filled.size:
+            first, last = filled[0], filled[-1] + 1
+            self.curve.setData(histogram.edges[first:last + 1], counts[first:last])
+        else:
+            self.curve.setData([0, 1], [0])
+
+        summary = self.result.summary(key)
+        for line, q in zip(self.lines, self.PERCENTILES):
+            line.setValue(summary[f"p{q}"])
+        self.nominal_line.setValue(self.result.nominal.get(key, np.nan))
+        self.plot.setLabel('bottom', self.titles.get(key, key))
+        self.stats_label.setText(
+            f"N = {histogram.count}, зерно {self.result.seed}: среднее {summary['mean']:.4g} "
+            f"± {summary['sem']:.2g}, СКО {summary['std']:.4g}, "
+            f"P5 {summary['p5']:.4g}, P50 {summary['p50']:.4g}, P95 {summary['p95']:.4g} "
+            f"(номинал {self.result.nominal.get(key, np.nan):.4g}, красная линия)"
+        )
@@ -0,0 +1,65 @@
+"""
+Просмотр результата моделирования изображения
+"""
+
+import numpy as np
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QTabWidget, QPushButton, QFileDialog, QMessageBox
+import pyqtgraph as pg
+
+
+class ImageSimulationView(QWidget):
+    """Объект и его изображение через ФРТ с общим масштабированием"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self.object_image = None
+        self.result_image = None
+
+        self._init_ui()
+
+    def _init_ui(self):
+        layout = QVBoxLayout(self)
+
+        self.tabs = QTabWidget()
+        self.object_view = pg.ImageView()
+        self.result_view = pg.ImageView()
+        self.tabs.addTab(self.result_view, "Изображение")
+        self.tabs.addTab(self.object_view, "Объект")
+        layout.addWidget(self.tabs)
+
+        # Масштаб и положение на обеих вкладках совпадают
+        self.object_view.getView().setXLink(self.result_view.getView())
+        self.object_view.getView().setYLink(self.result_view.getView())
+
+        button_layout = QHBoxLayout()
+        self.btn_save = QPushButton("Сохранить изображение")
+        self.btn_save.clicked.connect(self._save_result)
+        button_layout.addWidget(self.btn_save)
+        button_layout.addStretch()
+        layout.addLayout(button_layout)
+
+    def set_images(self, object_image: np.ndarray, result_image: np.ndarray):
+        """Показать объект и его изображение"""
+        self.object_image = object_image
+        self.result_image = result_image
+        self.object_view.setImage(object_image.T)
+        self.result_view.setImage(result_image.T)
+        self.tabs.setCurrentWidget(self.result_view)
+
+    def _save_result(self):
+        """Сохранить изображение в PNG (16 бит)"""
+        if self.result_image is None:
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Сохранить изображение", "simulated.png", "PNG (*.png)")
+        if not path:
+            return
+
+        from PIL import Image
+
+        try:
+            peak = self.result_image.max()
+            data = self.result_image / peak if peak > 0 else self.result_image
+            Image.fromarray(np.round(np.clip(data, 0, 1) * 65535).astype(np.uint16)).save(path)
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить изображение: {str(e)}")
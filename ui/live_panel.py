@@ -0,0 +1,134 @@
+"""
+Панель живого режима: интерактивное изменение аберраций ползунками
+"""
+
+import time
+from dataclasses import replace
+from PyQt6.QtWidgets import (
+    QWidget, QVBoxLayout, QGridLayout, QHBoxLayout, QLabel, QSlider, QPushButton
+)
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
+from core.psf_params import ParamPSF
+from core.psf_calculator import PSFCalculator
+
+
+class LivePanel(QWidget):
+    """Ползунки аберраций с непрерывным пересчетом ФРТ"""
+
+    # Поля ParamPSF, привязанные к ползункам: (поле, подпись, минимум, максимум)
+    FIELDS = [
+        ('defocus', "Расфокусировка, λ", -1.0, 1.0),
+        ('astigmatism', "Астигматизм, λ", -1.0, 1.0),
+    ]
+    SLIDER_STEPS = 1000  # дискретность ползунка на весь диапазон
+
+    psf_computed = pyqtSignal(object, float, float)  # psf, strehl_ratio, step_microns
+    apply_requested = pyqtSignal(ParamPSF)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self.params = ParamPSF()
+        self.calculator = PSFCalculator()
+        self.sliders = {}
+        self.value_labels = {}
+        self._frame_pending = False
+        self._frame_time_avg = 0.0
+
+        self._init_ui()
+
+    def _init_ui(self):
+        layout = QVBoxLayout(self)
+
+        sliders_layout = QGridLayout()
+        for i, (field, title, minimum, maximum) in enumerate(self.FIELDS):
+            slider = QSlider(Qt.Orientation.Horizontal)
+            slider.setRange(0, self.SLIDER_STEPS)
+            slider.valueChanged.connect(lambda value, f=field: self._on_slider_changed(f, value))
+
+            value_label = QLabel("0.000")
+            value_label.setMinimumWidth(50)
+            value_label.setAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+
+            sliders_layout.addWidget(QLabel(title), i, 0)
+            sliders_layout.addWidget(slider, i, 1)
+            sliders_layout.addWidget(value_label, i, 2)
+
+            self.sliders[field] = slider
+            self.value_labels[field] = value_label
+        sliders_layout.setColumnStretch(1, 1)
+        layout.addLayout(sliders_layout)
+
+        # Время кадра
+        self.frame_label = QLabel("Кадр: - мс")
+        layout.addWidget(self.frame_label)
+
+        button_layout = QHBoxLayout()
+        self.btn_apply = QPushButton("Применить к строке")
+        self.btn_apply.setToolTip("Записать значения ползунков в выбранную строку таблицы")
+        self.btn_apply.clicked.connect(lambda: self.apply_requested.emit(replace(self.params)))
+        button_layout.addWidget(self.btn_apply)
+        button_layout.addStretch()
+        layout.addLayout(button_layout)
+
+        layout.addStretch()
+
+    def _slider_to_value(self, field: str, position: int) -> float:
+        """Перевести положение ползунка в значение параметра"""
+        _, _, minimum, maximum = next(f for f in self.FIELDS if f[0] == field)
+        return minimum + (maximum - minimum) * position / self.SLIDER_STEPS
+
+    def _value_to_slider(self, field: str, value: float) -> int:
+        """Перевести значение параметра в положение ползунка"""
+        _, _, minimum, maximum = next(f for f in self.FIELDS if f[0] == field)
+        value = min(max(value, minimum), maximum)
+        return round((value - minimum) / (maximum - minimum) * self.SLIDER_STEPS)
+
+    def set_params(self, params: ParamPSF):
+        """Установить исходные параметры (например, из выбранной строки)"""
+        self.params = replace(params)
+        for field, slider in self.sliders.items():
+            slider.blockSignals(True)
+            slider.setValue(self._value_to_slider(field, getattr(self.params, field)))
+            slider.blockSignals(False)
+            self.value_labels[field].setText(f"{getattr(self.params, field):.3f}")
+        self._schedule_frame()
+
+    def _on_slider_changed(self, field: str, position: int):
+        """Обработчик перемещения ползунка"""
+        value = self._slider_to_value(field, position)
+        setattr(self.params, field, value)
+        self.value_labels[field].setText(f"{value:.3f}")
+        self._schedule_frame()
+
+    def _schedule_frame(self):
+        """Запланировать кадр; все изменения до его отрисовки объединяются в один"""
+        if not self._frame_pending:
+            self._frame_pending = True
+            QTimer.singleShot(0, self._render_frame)
+
+    def _render_frame(self):
+        """Пересчитать и отобразить ФРТ по текущим значениям ползунков"""
+        self._frame_pending = False
+        if not self.isVisible():
+            return
+
+        start = time.perf_counter()
+        try:
+            # Геометрия зрачка берется из кэша, поэтому кадр - это фаза, БПФ и отрисовка
+            psf, strehl_ratio = self.calculator.compute(self.params)
+            self.psf_computed.emit(psf, strehl_ratio, self.params.calculate_step_microns())
+        except Exception as e:
+            self.frame_label.setText(f"Ошибка: {e}")
+            return
+
+        frame_time = time.perf_counter() - start
+        # Экспоненциальное сглаживание, чтобы показания не прыгали
+        if self._frame_time_avg > 0:
+            self._frame_time_avg = 0.8 * self._frame_time_avg + 0.2 * frame_time
+        else:
+            self._frame_time_avg = frame_time
+        fps = 1.0 / self._frame_time_avg if self._frame_time_avg > 0 else 0.0
+        self.frame_label.setText(
+            f"Кадр: {self._frame_time_avg * 1000:.1f} мс ({fps:.0f} кадр/с), Штрель = {strehl_ratio:.6f}"
+        )
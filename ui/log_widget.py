@@ -1,5 +1,6 @@
 from PyQt6.QtWidgets import QTextEdit, QVBoxLayout, QWidget, QGroupBox
 from PyQt6.QtCore import QDateTime
+from core.zernike import Zernike
 
 class LogWidget(QGroupBox):
     def __init__(self, parent=None):
@@ -31,4 +32,6 @@ class LogWidget(QGroupBox):
         self.add_log(f"Увеличение: {params.magnification}")
         self.add_log(f"Расфокусировка: {params.defocus}")
         self.add_log(f"Астигматизм: {params.astigmatism}")
+        if any(params.zernike):
+            self.add_log(f"Цернике: {Zernike.format(params.zernike)}")
         self.add_log(f"Диаметр зрачка: {params.pupil_diameter} к.ед.")
\ No newline at end of file
@@ -3,10 +3,10 @@ from PyQt6.QtWidgets import (
     QComboBox, QPushButton, QGroupBox, QFileDialog, QMessageBox, QToolBar,
     QVBoxLayout, QHBoxLayout, QSplitter, QTableWidget, QTableWidgetItem,
     QHeaderView, QTabWidget, QSpinBox, QDoubleSpinBox, QCheckBox,
-    QApplication, QMenu, QAbstractItemView, QDockWidget, QDialog
+    QApplication, QMenu, QAbstractItemView, QDockWidget, QDialog, QInputDialog
 )
 from PyQt6.QtGui import QAction, QClipboard, QKeySequence
-from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtCore import Qt, pyqtSignal, QThread
 from core.psf_params import ParamPSF
 from core.psf_calculator import PSFCalculator
 from ui.psf_view import PSFView
@@ -24,6 +24,36 @@ from ui.report_generator import ReportGenerator
 from ui.preview_dialog import PreviewDialog
 from PyQt6.QtCore import QTimer
 from ui.progress_dialog import ProgressDialog, CalculationWorker
+from core.psf_cache import PSFCache
+from core.psf_metrics import PSFMetrics
+from core.zernike import Zernike
+from ui.compute_workers import (
+    RefineWorker, PrefetchWorker, VolumeWorker, FieldGridWorker, ImageSimulationWorker,
+    SpatiallyVariantWorker, PartialCoherenceWorker, PhaseRetrievalWorker,
+    AberrationFitWorker, OptimizationWorker, ToleranceWorker, SensitivityWorker,
+    StrehlLUTWorker, SweepWorker, GridSweepWorker
+)
+from core.imaging import ImageSimulator, SpatiallyVariantSimulator, TestObjects
+from core.coherence import PartialCoherenceImager, Illumination
+from core.phase_retrieval import PhaseRetrieval, PhaseRetrievalResult
+from core.aberration_fit import AberrationFit, AberrationFitResult
+from core.optimizer import PSFOptimizer, OptimizationResult
+from core.tolerance import ToleranceAnalysis, ToleranceResult
+from core.sensitivity import SensitivityAnalysis
+from core.strehl_lut import StrehlLUT
+from core.sweep import AdaptiveSweep, SweepResult, GridSweep, SweepAxis, SweepCube, SWEEP_AXES, SWEEP_METRICS
+from ui.image_sim_view import ImageSimulationView
+from core.psf_volume import PSFVolume
+from core.field_grid import FieldGrid
+from ui.field_grid_dialog import FieldGridDialog
+from ui.optimization_dialog import OptimizationDialog
+from ui.tolerance_dialog import ToleranceDialog
+from ui.histogram_view import HistogramView
+from ui.sweep_dialog import SweepDialog
+from ui.sweep_view import SweepView
+from ui.cube_view import CubeView
+from ui.map_view import MapView
+from ui.live_panel import LivePanel
 
 
 class ParameterTable(QTableWidget):
@@ -33,11 +63,17 @@ class ParameterTable(QTableWidget):
     selection_changed = pyqtSignal(int)  # row
     cell_changed = pyqtSignal(int, int)  # row, col - НОВЫЙ СИГНАЛ
     
+    ZERNIKE_COLUMN = 13     # коэффициенты Цернике в записи 'Z4=0.1 Z11=-0.05'
+    BASE_COLUMN_COUNT = 14  # колонки до дополнительных метрик
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         
         self.calculator = PSFCalculator()
         self.current_params_list = []
+        self.metric_keys = []  # ключи метрик PSFMetrics в колонках 13+
+        self.sensitivity_keys = []  # ключи SensitivityAnalysis в колонках после метрик
+        self.strehl_luts = []  # таблицы StrehlLUT для мгновенных оценок
         
         self._init_table()
         self.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
@@ -48,13 +84,43 @@ class ParameterTable(QTableWidget):
     
     def _on_cell_changed(self, row: int, column: int):
         """Обработчик изменения ячейки"""
-        # Игнорируем колонки №, Штрель, Статус
-        if column not in [0, 11, 12]:
+        # Игнорируем колонки №, Штрель, Статус и метрики
+        if 0 < column < 11 or column == self.ZERNIKE_COLUMN:
             self.cell_changed.emit(row, column)
+            self._clear_sensitivity_cells(row)
             
             # Автоматически пересчитываем шаги если изменились связанные параметры
             if column in [1, 7]:  # Размер или охват зрачка
                 self._recalculate_steps_for_row(row)
+            
+            self.show_strehl_estimate(row)
+    
+    def strehl_estimate(self, params: ParamPSF):
+        """Оценка числа Штреля по загруженным таблицам: (значение, погрешность) или None"""
+        for lut in self.strehl_luts:
+            estimate = lut.estimate(params)
+            if estimate is not None:
+                return estimate
+        return None
+    
+    def show_strehl_estimate(self, row: int):
+        """Показать оценку числа Штреля до точного расчета строки"""
+        if not self.strehl_luts:
+            return
+        params = self._get_params_from_row(row)
+        estimate = self.strehl_estimate(params) if params is not None else None
+        if estimate is None:
+            return
+        
+        value, error = estimate
+        item = QTableWidgetItem(f"≈{value:.6f}")
+        item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+        item.setToolTip(f"Оценка по таблице, погрешность ±{error:.2g}")
+        self.setItem(row, 11, item)
+        
+        item = QTableWidgetItem("Оценка")
+        item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.setItem(row, 12, item)
     
     def _recalculate_steps_for_row(self, row: int):
         """Пересчитать шаги для конкретной строки"""
@@ -84,7 +150,8 @@ class ParameterTable(QTableWidget):
             "Шаг предм.",  # Шаг по предмету (к.ед.)
             "Шаг изобр.",  # Шаг по изображению (к.ед.)
             "Штрель", 
-            "Статус"
+            "Статус",
+            "Цернике"      # Коэффициенты Цернике по Ноллу
         ]
         
         self.setColumnCount(len(headers))
@@ -105,6 +172,7 @@ class ParameterTable(QTableWidget):
         self.setColumnWidth(10, 70)  # Шаг по изображению (к.ед.)
         self.setColumnWidth(11, 80)  # Штрель
         self.setColumnWidth(12, 100) # Статус
+        self.setColumnWidth(13, 150) # Цернике
         
         # Настраиваем выбор строк
         self.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
@@ -113,6 +181,105 @@ class ParameterTable(QTableWidget):
         # Подключаем сигнал выбора
         self.itemSelectionChanged.connect(self._on_selection_changed)
     
+    def set_metric_columns(self, keys: list):
+        """Показать дополнительные колонки метрик (ключи PSFMetrics)"""
+        # Колонки чувствительности стоят после метрик - переносим их значения
+        sensitivity_items = self._take_sensitivity_items()
+        self.metric_keys = [key for key in keys if PSFMetrics.is_metric_key(key)]
+        self.setColumnCount(self.BASE_COLUMN_COUNT + len(self.metric_keys) + len(self.sensitivity_keys))
+        for i, key in enumerate(self.metric_keys):
+            col = self.BASE_COLUMN_COUNT + i
+            self.setHorizontalHeaderItem(col, QTableWidgetItem(PSFMetrics.column_title(key)))
+            self.setColumnWidth(col, 80)
+        self._set_sensitivity_headers()
+        for (row, i), item in sensitivity_items.items():
+            self.setItem(row, self._sensitivity_column(i), item)
+    
+    def _sensitivity_column(self, index: int) -> int:
+        """Номер колонки чувствительности с индексом index"""
+        return self.BASE_COLUMN_COUNT + len(self.metric_keys) + index
+    
+    def _take_sensitivity_items(self) -> dict:
+        """Забрать ячейки колонок чувствительности {(строка, индекс): ячейка}"""
+        items = {}
+        for row in range(self.rowCount()):
+            for i in range(len(self.sensitivity_keys)):
+                item = self.takeItem(row, self._sensitivity_column(i))
+                if item is not None:
+                    items[(row, i)] = item
+        return items
+    
+    def _set_sensitivity_headers(self):
+        """Заголовки колонок чувствительности"""
+        for i, key in enumerate(self.sensitivity_keys):
+            col = self._sensitivity_column(i)
+            self.setHorizontalHeaderItem(col, QTableWidgetItem(SensitivityAnalysis.column_title(key)))
+            self.setColumnWidth(col, 95)
+    
+    def set_sensitivity_columns(self, keys: list, rows: list = None, values: list = None):
+        """
+        Показать колонки чувствительности (ключи SensitivityAnalysis)
+        
+        rows и values - номера строк и словари {ключ: производная} для них.
+        Производные, в которых меняется число пикселей маски апертуры,
+        помечаются "≈" и подсказкой. Пустой список keys убирает колонки.
+        """
+        self.sensitivity_keys = list(keys)
+        self.setColumnCount(self.BASE_COLUMN_COUNT + len(self.metric_keys) + len(self.sensitivity_keys))
+        self._set_sensitivity_headers()
+        for row, row_values in zip(rows or [], values or []):
+            for i, key in enumerate(self.sensitivity_keys):
+                value = row_values.get(key, np.nan)
+                item = QTableWidgetItem(f"{value:.4g}" if np.isfinite(value) else "-")
+                _, parameter = SensitivityAnalysis.split_key(key)
+                n_minus, n_plus = row_values.get(SensitivityAnalysis.mask_key(parameter), (0, 0))
+                if n_minus != n_plus and np.isfinite(value):
+                    item.setText("≈" + item.text())
+                    item.setToolTip(
+                        f"Маска апертуры меняется: {n_minus} → {n_plus} пикселей; "
+                        f"производная по шагу в один пиксель зрачка"
+                    )
+                item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                self.setItem(row, self._sensitivity_column(i), item)
+    
+    def _clear_sensitivity_cells(self, row: int):
+        """Очистить устаревшие чувствительности строки после изменения параметров"""
+        for i in range(len(self.sensitivity_keys)):
+            item = self.item(row, self._sensitivity_column(i))
+            if item is not None and item.text():
+                item.setText("")
+    
+    def fill_metric_columns(self, row: int, psf: np.ndarray, params: ParamPSF):
+        """Заполнить колонки метрик строки по рассчитанной ФРТ"""
+        self.fill_metric_columns_batch([row], [psf], [params])
+    
+    def fill_metric_columns_batch(self, rows: list, psfs: list, params_list: list):
+        """
+        Заполнить колонки метрик нескольких строк
+        
+        ФРТ одного размера с одинаковым шагом собираются в пачку,
+        и метрики для них считаются одним векторным вызовом.
+        """
+        if not self.metric_keys:
+            return
+        
+        groups = {}
+        for row, psf, params in zip(rows, psfs, params_list):
+            # Шаг в микронах, как в PSFCalculator.compute
+            step_microns = params.step_object * params.magnification
+            groups.setdefault((psf.shape, step_microns), []).append((row, psf))
+        
+        for (_, step_microns), entries in groups.items():
+            stack = np.stack([psf for _, psf in entries])
+            values = PSFMetrics.compute(stack, step_microns, self.metric_keys)
+            
+            for k, (row, _) in enumerate(entries):
+                for i, key in enumerate(self.metric_keys):
+                    value = values[key][k]
+                    item = QTableWidgetItem(f"{value:.4f}" if np.isfinite(value) else "-")
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                    self.setItem(row, self.BASE_COLUMN_COUNT + i, item)
+    
     def get_selected_rows(self):
         """Получить список выбранных строк"""
         try:
@@ -186,7 +353,8 @@ class ParameterTable(QTableWidget):
                 "0.0625",    # Шаг по зрачку
                 "0.13875",   # Шаг по предмету
                 "0.13875",   # Шаг по изображению
-                "0.000", "Не рассч."
+                "0.000", "Не рассч.",
+                ""           # Цернике
             ]
             
             for col, value in enumerate(default_values, 1):
@@ -217,7 +385,8 @@ class ParameterTable(QTableWidget):
             f"{params.step_object:.6f}",        # Шаг по предмету
             f"{params.step_image:.6f}",         # Шаг по изображению
             "0.000",
-            "Не рассч."
+            "Не рассч.",
+            Zernike.format(params.zernike)
         ]
         
         for col, value in enumerate(values, 1):
@@ -293,6 +462,8 @@ class ParameterTable(QTableWidget):
             item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
             self.setItem(row, 12, item)
             
+            self.fill_metric_columns(row, psf, params)
+            
             # Сохраняем обновленные параметры
             if row < len(self.current_params_list):
                 self.current_params_list[row] = params
@@ -335,6 +506,9 @@ class ParameterTable(QTableWidget):
             params.step_object = float(cells[9]) if cells[9] else 0.13875
             params.step_image = float(cells[10]) if cells[10] else 0.13875
             
+            item = self.item(row, self.ZERNIKE_COLUMN)
+            params.zernike = Zernike.parse(item.text()) if item else ()
+            
             return params
             
         except Exception as e:
@@ -533,6 +707,9 @@ class ParameterTable(QTableWidget):
                         # Маппинг колонок
                         col_map = {}
                         for i, header in enumerate(headers):
+                            # Колонки метрик и чувствительностей пересчитываются, а не импортируются
+                            if PSFMetrics.is_metric_title(header) or SensitivityAnalysis.is_column_title(header):
+                                continue
                             header_lower = header.lower()
                             if 'размер' in header_lower or 'size' in header_lower:
                                 col_map['size'] = i
@@ -558,6 +735,8 @@ class ParameterTable(QTableWidget):
                                 col_map['strehl'] = i
                             elif 'статус' in header_lower or 'status' in header_lower:
                                 col_map['status'] = i
+                            elif 'цернике' in header_lower or 'zernike' in header_lower:
+                                col_map['zernike'] = i
                             elif '№' in header or 'номер' in header_lower or 'num' in header_lower:
                                 col_map['num'] = i
                         
@@ -582,6 +761,8 @@ class ParameterTable(QTableWidget):
                             params.step_object = float(parts[col_map['step_object']]) if parts[col_map['step_object']] else 0.13875
                         if 'step_image' in col_map:
                             params.step_image = float(parts[col_map['step_image']]) if parts[col_map['step_image']] else 0.13875
+                        if 'zernike' in col_map and col_map['zernike'] < len(parts):
+                            params.zernike = Zernike.parse(parts[col_map['zernike']].strip())
                         
                         # Добавляем строку
                         self.add_row(params)
@@ -617,6 +798,14 @@ class ParameterTable(QTableWidget):
 
 
 class PSFMainWindow(QMainWindow):
+    # Размер сетки быстрого предпросмотра при редактировании параметров
+    PREVIEW_SIZE = 128
+    REFINE_DELAY_MS = 300  # уточнение начинается после паузы в редактировании
+    # Число соседних строк сверху и снизу, рассчитываемых заранее
+    PREFETCH_NEIGHBOURS = 3
+    # Бюджет памяти кэша ФРТ
+    PSF_CACHE_BUDGET_MB = 512
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Расчет ФРТ с таблицей параметров")
@@ -624,10 +813,35 @@ class PSFMainWindow(QMainWindow):
 
         self.params = ParamPSF()
         self.calculator = PSFCalculator()
+        self.preview_calculator = PSFCalculator()
         self.current_psf = None
         self.strehl_ratio = 0.0
         self.table_data = []
 
+        # Прогрессивный расчет: номер актуального уточнения, отложенное задание
+        # и единственный поток уточнения
+        self._refine_token = 0
+        self._pending_refinement = None
+        self._refine_timer = QTimer(self)
+        self._refine_timer.setSingleShot(True)
+        self._refine_timer.timeout.connect(self._start_refinement)
+        self.refine_worker = RefineWorker()
+        self.refine_worker.refined.connect(self._on_refine_finished)
+        self.refine_worker.failed.connect(self._on_refine_failed)
+        self.refine_worker.idle.connect(self._on_refine_idle)
+        self.refine_worker.start()
+        
+        # Кэш ФРТ и фоновая предзагрузка соседних строк
+        self.psf_cache = PSFCache(self.PSF_CACHE_BUDGET_MB * 1024 * 1024)
+        self.spectrum_text = ""  # последний введенный спектр
+        self.image_simulator = ImageSimulator()  # кэширует спектр ФРТ между запусками
+        self.coherent_imager = PartialCoherenceImager()  # ядра SOCS кэшируются по зрачку и источнику
+        self.illumination = Illumination()
+        self._optimization_best = None  # лучшее значение критерия текущей оптимизации
+        self._tolerance_next_log = 0    # число реализаций для следующей записи о сходимости
+        self.prefetch_worker = PrefetchWorker(self.psf_cache)
+        self.prefetch_worker.start(QThread.Priority.LowestPriority)
+
         self._init_ui()
         self._init_menu_toolbar()
         self._init_dock_widgets()
@@ -758,7 +972,9 @@ class PSFMainWindow(QMainWindow):
         self._recalculate_timer.timeout.connect(
             lambda: self._process_cell_change(row, column)
         )
-        self._recalculate_timer.start(500)  # 500ms задержка
+        # Нулевая задержка объединяет пачку изменений одного цикла событий,
+        # а предпросмотр отображается сразу
+        self._recalculate_timer.start(0)
 
     def _process_cell_change(self, row: int, column: int):
         """Обработать изменение ячейки после задержки"""
@@ -774,10 +990,10 @@ class PSFMainWindow(QMainWindow):
             else:
                 self.table_widget.current_params_list.append(params)
             
-            # Если эта строка выбрана - пересчитываем PSF
+            # Если эта строка выбрана - показываем предпросмотр и уточняем PSF в фоне
             selected_rows = self.table_widget.get_selected_rows()
             if selected_rows and selected_rows[0] == row:
-                self._recalculate_and_display_psf(row, params)
+                self._show_progressive_psf(row, params)
                 
         except Exception as e:
             print(f"Ошибка обработки изменения ячейки: {e}")
@@ -798,6 +1014,48 @@ class PSFMainWindow(QMainWindow):
         info_dock.setWidget(info_widget)
         self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, info_dock)
         
+        # Док живого режима (ползунки аберраций)
+        self.live_dock = QDockWidget("Живой режим", self)
+        self.live_panel = LivePanel()
+        self.live_panel.psf_computed.connect(self._on_live_psf_computed)
+        self.live_panel.apply_requested.connect(self._on_live_apply)
+        self.live_dock.setWidget(self.live_panel)
+        self.live_dock.visibilityChanged.connect(self._on_live_dock_visibility_changed)
+        self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.live_dock)
+        self.live_dock.hide()
+        
+        act_live = self.live_dock.toggleViewAction()
+        act_live.setText("Живой режим")
+        self.table_menu.addSeparator()
+        self.table_menu.addAction(act_live)
+        self.main_toolbar.addSeparator()
+        self.main_toolbar.addAction(act_live)
+        
+    def _on_live_dock_visibility_changed(self, visible: bool):
+        """Обработчик открытия панели живого режима"""
+        if visible:
+            params = self.table_widget.get_selected_params()
+            self.live_panel.set_params(params if params is not None else self.params)
+            
+    def _on_live_psf_computed(self, psf: np.ndarray, strehl_ratio: float, step_microns: float):
+        """Отобразить кадр живого режима"""
+        self._cancel_refinement()
+        self.psf_view.show_psf(psf, step_microns)
+        
+    def _on_live_apply(self, params: ParamPSF):
+        """Записать значения ползунков в выбранную строку"""
+        selected_rows = self.table_widget.get_selected_rows()
+        if not selected_rows:
+            QMessageBox.warning(self, "Предупреждение", "Выберите строку для обновления")
+            return
+        
+        row = selected_rows[0]
+        self._update_table_row_with_params(row, params)
+        self.log_widget.add_log(
+            f"Строка {row+1}: применены значения живого режима "
+            f"(расфокусировка {params.defocus:.3f}, астигматизм {params.astigmatism:.3f})"
+        )
+        
     def _init_menu_toolbar(self):
         menu = self.menuBar()
         
@@ -849,6 +1107,7 @@ class PSFMainWindow(QMainWindow):
         
         # Меню Таблица
         table_menu = menu.addMenu("Таблица")
+        self.table_menu = table_menu
         
         act_settings = QAction("Настройки параметров", self)
         act_copy_table = QAction("Копировать таблицу", self)
@@ -867,9 +1126,104 @@ class PSFMainWindow(QMainWindow):
         table_menu.addSeparator()
         table_menu.addAction(act_import_csv)
         
+        # Серия ФРТ по фокусу для выбранной строки
+        act_focus_stack = QAction("Серия по фокусу...", self)
+        act_focus_stack.triggered.connect(self._show_focus_stack)
+        act_volume = QAction("Объем ФРТ (3D)...", self)
+        act_volume.triggered.connect(self._compute_volume)
+        table_menu.addSeparator()
+        table_menu.addAction(act_focus_stack)
+        table_menu.addAction(act_volume)
+        
+        act_polychromatic = QAction("Полихроматическая ФРТ...", self)
+        act_polychromatic.triggered.connect(self._show_polychromatic_psf)
+        table_menu.addAction(act_polychromatic)
+        
+        act_field_grid = QAction("ФРТ по полю зрения...", self)
+        act_field_grid.triggered.connect(self._compute_field_grid)
+        table_menu.addAction(act_field_grid)
+        
+        act_image_simulation = QAction("Моделирование изображения...", self)
+        act_image_simulation.triggered.connect(self._simulate_image)
+        table_menu.addAction(act_image_simulation)
+        
+        act_variant_simulation = QAction("Моделирование с ФРТ по полю...", self)
+        act_variant_simulation.triggered.connect(self._simulate_image_variant)
+        table_menu.addAction(act_variant_simulation)
+        
+        act_partial_coherence = QAction("Частично когерентное изображение...", self)
+        act_partial_coherence.triggered.connect(self._simulate_partial_coherence)
+        table_menu.addAction(act_partial_coherence)
+        
+        act_phase_retrieval = QAction("Восстановление фазы по ФРТ...", self)
+        act_phase_retrieval.triggered.connect(self._retrieve_phase)
+        table_menu.addAction(act_phase_retrieval)
+        
+        act_aberration_fit = QAction("Подбор аберраций по ФРТ...", self)
+        act_aberration_fit.triggered.connect(self._fit_aberrations)
+        table_menu.addAction(act_aberration_fit)
+        
+        act_optimize = QAction("Оптимизация параметров...", self)
+        act_optimize.triggered.connect(self._optimize_params)
+        table_menu.addAction(act_optimize)
+        
+        act_tolerance = QAction("Анализ допусков (Монте-Карло)...", self)
+        act_tolerance.triggered.connect(self._run_tolerance_analysis)
+        table_menu.addAction(act_tolerance)
+        
+        act_sensitivity = QAction("Чувствительности (∂Штрель, ∂EE80)", self)
+        act_sensitivity.triggered.connect(self._compute_sensitivities)
+        act_clear_sensitivity = QAction("Убрать колонки чувствительности", self)
+        act_clear_sensitivity.triggered.connect(lambda: self.table_widget.set_sensitivity_columns([]))
+        table_menu.addAction(act_sensitivity)
+        table_menu.addAction(act_clear_sensitivity)
+        
+        act_build_lut = QAction("Построить таблицу оценок Штреля...", self)
+        act_build_lut.triggered.connect(self._build_strehl_lut)
+        act_load_lut = QAction("Загрузить таблицу оценок Штреля...", self)
+        act_load_lut.triggered.connect(self._load_strehl_lut)
+        table_menu.addAction(act_build_lut)
+        table_menu.addAction(act_load_lut)
+        
+        act_sweep = QAction("Адаптивная развертка по параметрам...", self)
+        act_sweep.triggered.connect(self._run_adaptive_sweep)
+        table_menu.addAction(act_sweep)
+        
+        act_grid_sweep = QAction("Сеточная развертка (куб метрик)...", self)
+        act_grid_sweep.triggered.connect(self._run_grid_sweep)
+        act_open_cube = QAction("Открыть куб развертки...", self)
+        act_open_cube.triggered.connect(self._open_sweep_cube)
+        table_menu.addAction(act_grid_sweep)
+        table_menu.addAction(act_open_cube)
+        
+        # Дополнительные колонки метрик
+        metrics_menu = table_menu.addMenu("Дополнительные метрики")
+        self.metric_actions = {}
+        for key, title in PSFMetrics.COLUMN_TITLES.items():
+            act_metric = QAction(title, self)
+            act_metric.setCheckable(True)
+            act_metric.toggled.connect(self._on_metric_columns_changed)
+            metrics_menu.addAction(act_metric)
+            self.metric_actions[key] = act_metric
+        
+        # ЧКХ на заданных частотах
+        metrics_menu.addSeparator()
+        self.mtf_frequencies = list(PSFMetrics.MTF_FREQUENCIES)
+        self.mtf_actions = {}
+        for direction, title in PSFMetrics.MTF_DIRECTIONS.items():
+            act_mtf = QAction(f"ЧКХ {title}", self)
+            act_mtf.setCheckable(True)
+            act_mtf.toggled.connect(self._on_metric_columns_changed)
+            metrics_menu.addAction(act_mtf)
+            self.mtf_actions[direction] = act_mtf
+        act_mtf_frequencies = QAction("Частоты ЧКХ...", self)
+        act_mtf_frequencies.triggered.connect(self._edit_mtf_frequencies)
+        metrics_menu.addAction(act_mtf_frequencies)
+        
         # Toolbar (ОБНОВЛЕННЫЙ)
         toolbar = QToolBar("Основные действия")
         self.addToolBar(toolbar)
+        self.main_toolbar = toolbar
         
         toolbar.addAction(act_new_table)
         toolbar.addAction(act_load_table)
@@ -884,6 +1238,952 @@ class PSFMainWindow(QMainWindow):
         toolbar.addAction(act_print_report)
         toolbar.addAction(act_export_image)
         
+    def _show_focus_stack(self):
+        """Рассчитать и показать серию ФРТ по фокусу для выбранной строки"""
+        row = self.table_widget.currentRow()
+        params = self.table_widget.get_selected_params()
+        if params is None:
+            QMessageBox.warning(self, "Предупреждение", "Выберите строку таблицы")
+            return
+        
+        text, ok = QInputDialog.getText(
+            self, "Серия по фокусу",
+            "Расфокусировка от, до (λ) и число положений:",
+            text=f"{params.defocus - 1.0:g} {params.defocus + 1.0:g} 41"
+        )
+        if not ok:
+            return
+        try:
+            start, stop, count = text.replace(',', ' ').split()
+            defocus_values = np.linspace(float(start), float(stop), int(count))
+        except ValueError:
+            QMessageBox.warning(self, "Ошибка", "Введите три числа: начало, конец и число положений")
+            return
+        if defocus_values.size < 2:
+            QMessageBox.warning(self, "Ошибка", "Число положений должно быть не меньше 2")
+            return
+        
+        try:
+            QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+            try:
+                stack, strehl_values = self.table_widget.calculator.compute_focus_stack(params, defocus_values)
+            finally:
+                QApplication.restoreOverrideCursor()
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Ошибка расчета серии по фокусу: {str(e)}")
+            traceback.print_exc()
+            return
+        
+        step_microns = params.step_object * params.magnification
+        self.psf_view.show_focus_stack(stack, defocus_values, strehl_values, step_microns)
+        
+        best = int(np.argmax(strehl_values))
+        self.log_widget.add_log(
+            f"Строка {row+1}: серия по фокусу из {defocus_values.size} положений, "
+            f"лучший фокус {defocus_values[best]:.3f} λ (Штрель = {strehl_values[best]:.6f})"
+        )
+    
+    def _show_polychromatic_psf(self):
+        """Рассчитать и показать полихроматическую ФРТ выбранной строки"""
+        row = self.table_widget.currentRow()
+        params = self.table_widget.get_selected_params()
+        if params is None:
+            QMessageBox.warning(self, "Предупреждение", "Выберите строку таблицы")
+            return
+        
+        # По умолчанию - равномерный спектр ±10% вокруг длины волны строки
+        default = self.spectrum_text or " ".join(
+            f"{params.wavelength * k:.4g}:1" for k in (0.9, 0.95, 1.0, 1.05, 1.1)
+        )
+        text, ok = QInputDialog.getText(
+            self, "Полихроматическая ФРТ",
+            "Спектр - пары длина волны (мкм):вес через пробел:",
+            text=default
+        )
+        if not ok:
+            return
+        try:
+            pairs = [part.split(':') for part in text.replace(',', ' ').split()]
+            wavelengths = [float(wl) for wl, _ in pairs]
+            weights = [float(w) for _, w in pairs]
+        except ValueError:
+            QMessageBox.warning(self, "Ошибка", "Введите пары вида 0.55:1")
+            return
+        
+        n_samples, ok = QInputDialog.getInt(
+            self, "Полихроматическая ФРТ",
+            "Число отсчетов спектра (точность/скорость):",
+            min(len(wavelengths), 7), 1, max(len(wavelengths), 1)
+        )
+        if not ok:
+            return
+        self.spectrum_text = text
+        
+        try:
+            QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+            try:
+                psf, strehl_ratio = self.table_widget.calculator.compute_polychromatic(
+                    params, wavelengths, weights, n_samples
+                )
+            finally:
+                QApplication.restoreOverrideCursor()
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Ошибка расчета полихроматической ФРТ: {str(e)}")
+            traceback.print_exc()
+            return
+        
+        self.current_psf, self.strehl_ratio = psf, strehl_ratio
+        self.psf_view.show_psf(psf, params.step_object * params.magnification)
+        self.log_widget.add_log(
+            f"Строка {row+1}: полихроматическая ФРТ ({n_samples} отсчетов спектра, "
+            f"{min(wavelengths):.3f}-{max(wavelengths):.3f} мкм), Штрель = {strehl_ratio:.6f}"
+        )
+    
+    def _compute_volume(self):
+        """Рассчитать трехмерную ФРТ выбранной строки с записью в .npy файл"""
+        row = self.table_widget.currentRow()
+        params = self.table_widget.get_selected_params()
+        if params is None:
+            QMessageBox.warning(self, "Предупреждение", "Выберите строку таблицы")
+            return
+        
+        text, ok = QInputDialog.getText(
+            self, "Объем ФРТ",
+            "Положение по z от, до (мкм) и число плоскостей:",
+            text="-5 5 101"
+        )
+        if not ok:
+            return
+        try:
+            start, stop, count = text.replace(',', ' ').split()
+            z_values = np.linspace(float(start), float(stop), int(count))
+        except ValueError:
+            QMessageBox.warning(self, "Ошибка", "Введите три числа: начало, конец и число плоскостей")
+            return
+        if z_values.size < 2:
+            QMessageBox.warning(self, "Ошибка", "Число плоскостей должно быть не меньше 2")
+            return
+        
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Сохранить объем ФРТ",
+            f"psf_volume_{datetime.now().strftime('%Y%m%d_%H%M%S')}.npy",
+            "NumPy (*.npy)"
+        )
+        if not path:
+            return
+        if not path.endswith('.npy'):
+            path += '.npy'
+        
+        self._run_job(
+            VolumeWorker(params, z_values, path), "Расчет объема ФРТ", z_values.size, "Плоскости",
+            lambda summary: self._on_volume_ready(row, params, summary)
+        )
+    
+    def _run_job(self, worker, title: str, total: int, item_name: str, on_ready):
+        """Выполнить JobWorker с диалогом прогресса и отменой"""
+        progress_dialog = ProgressDialog(self, title, total)
+        progress_dialog.set_worker(worker)
+        
+        worker.progress_updated.connect(lambda done, total: progress_dialog.set_progress(done))
+        worker.progress_updated.connect(
+            lambda done, total: progress_dialog.set_status(f"{item_name}: {done} из {total}")
+        )
+        worker.result_ready.connect(lambda result: self._on_job_ready(progress_dialog, on_ready, result))
+        worker.failed.connect(lambda message: self._on_job_failed(title, message, progress_dialog))
+        worker.finished.connect(lambda: self._on_job_finished(title, progress_dialog))
+        
+        worker.start()
+        progress_dialog.exec()
+        worker.wait()
+    
+    def _on_job_ready(self, dialog, on_ready, result):
+        """Закрыть диалог прогресса и передать результат расчета"""
+        dialog.accept()
+        on_ready(result)
+    
+    def _on_job_finished(self, title: str, dialog):
+        """Закрыть диалог прогресса после отмены расчета"""
+        if dialog.is_canceled:
+            self.log_widget.add_log(f"{title}: отменено пользователем")
+            dialog.reject()
+    
+    def _on_job_failed(self, title: str, message: str, dialog):
+        """Обработчик ошибки фонового расчета"""
+        dialog.reject()
+        self.log_widget.add_log(f"{title}: ошибка - {message}")
+        QMessageBox.critical(self, "Ошибка", f"{title}: {message}")
+    
+    def _on_volume_ready(self, row: int, params: ParamPSF, summary: dict):
+        """Показать рассчитанный объем: плоскости по z на ползунке и осевой профиль"""
+        volume = PSFVolume.load(summary['filename'])
+        step_microns = params.step_object * params.magnification
+        self.psf_view.show_focus_stack(volume, summary['z'], summary['strehl'], step_microns,
+                                       title="z", unit="мкм")
+        self.log_widget.add_log(
+            f"Строка {row+1}: объем ФРТ {volume.shape} сохранен в {summary['filename']}; "
+            f"максимум на z = {summary['peak_z']:.3f} мкм, "
+            f"осевая FWHM = {summary['axial_fwhm']:.3f} мкм"
+        )
+    
+    def _compute_field_grid(self):
+        """Рассчитать ФРТ по сетке точек поля зрения для выбранной строки"""
+        row = self.table_widget.currentRow()
+        params = self.table_widget.get_selected_params()
+        if params is None:
+            QMessageBox.warning(self, "Предупреждение", "Выберите строку таблицы")
+            return
+        
+        dialog = FieldGridDialog(self)
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+        field_points = dialog.get_field_points()
+        model = dialog.get_model()
+        
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Сохранить сетку ФРТ по полю",
+            f"psf_field_{datetime.now().strftime('%Y%m%d_%H%M%S')}.npy",
+            "NumPy (*.npy)"
+        )
+        if not path:
+            return
+        if not path.endswith('.npy'):
+            path += '.npy'
+        
+        self._run_job(
+            FieldGridWorker(params, field_points, model, path), "Расчет ФРТ по полю",
+            field_points.size ** 2, "Точки поля",
+            lambda summary: self._on_field_grid_ready(row, params, summary)
+        )
+    
+    def _on_field_grid_ready(self, row: int, params: ParamPSF, summary: dict):
+        """Показать карты по полю; щелчок по карте показывает ФРТ точки поля"""
+        grid = FieldGrid.load(summary['filename'])
+        step_microns = params.step_object * params.magnification
+        maps = {FieldGrid.MAP_TITLES[key]: values for key, values in summary['maps'].items()}
+        
+        map_view = self._show_map_dock("Карты по полю зрения", maps, summary['field_x'], summary['field_y'],
+                                       "Поле X (норм.)", "Поле Y (норм.)")
+        map_view.point_selected.connect(
+            lambda iy, ix: self.psf_view.show_psf(np.asarray(grid[iy, ix], dtype=float), step_microns)
+        )
+        
+        strehl = summary['maps']['strehl']
+        self.log_widget.add_log(
+            f"Строка {row+1}: ФРТ по полю {grid.shape[:2]} сохранены в {summary['filename']}; "
+            f"Штрель от {strehl.min():.6f} до {strehl.max():.6f}"
+        )
+    
+    def _choose_test_object(self, title: str):
+        """Выбрать тестовый объект; возвращает (название, изображение) или None"""
+        objects = ["Мира USAF", "Звездное поле", "Изображение из файла..."]
+        choice, ok = QInputDialog.getItem(self, title, "Объект:", objects, 0, False)
+        if not ok:
+            return None
+        
+        if choice == objects[2]:
+            path, _ = QFileDialog.getOpenFileName(
+                self, "Открыть изображение", "", "Изображения (*.png *.jpg *.jpeg *.tif *.tiff *.bmp)"
+            )
+            if not path:
+                return None
+            return choice, TestObjects.load_image(path)
+        
+        size, ok = QInputDialog.getInt(self, title, "Размер объекта (пикс.):", 2048, 64, 16384)
+        if not ok:
+            return None
+        if choice == objects[0]:
+            return choice, TestObjects.usaf_target(size)
+        return choice, TestObjects.star_field(size, n_stars=size // 2)
+    
+    def _simulate_image(self):
+        """Смоделировать изображение тестового объекта через ФРТ выбранной строки"""
+        row = self.table_widget.currentRow()
+        params = self.table_widget.get_selected_params()
+        if params is None:
+            QMessageBox.warning(self, "Предупреждение", "Выберите строку таблицы")
+            return
+        
+        try:
+            selected = self._choose_test_object("Моделирование изображения")
+            if selected is None:
+                return
+            choice, image = selected
+            psf, _ = self._compute_psf_cached(params)
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Ошибка подготовки моделирования: {str(e)}")
+            traceback.print_exc()
+            return
+        
+        self._run_job(
+            ImageSimulationWorker(image, psf, self.image_simulator), "Моделирование изображения",
+            self.image_simulator.tile_count(image.shape), "Блоки",
+            lambda result: self._on_image_simulated(row, choice, image, result)
+        )
+    
+    def _simulate_image_variant(self):
+        """Смоделировать изображение с ФРТ, меняющейся по полю (по сохраненной сетке ФРТ)"""
+        path, _ = QFileDialog.getOpenFileName(self, "Открыть сетку ФРТ по полю", "", "NumPy (*.npy)")
+        if not path:
+            return
+        
+        try:
+            grid = FieldGrid.load(path)
+            if grid.ndim != 4:
+                raise ValueError(f"ожидается сетка (ny, nx, size, size), получено {grid.shape}")
+            n_points = grid.shape[0] * grid.shape[1]
+            rank, ok = QInputDialog.getInt(self, "Переменная по полю ФРТ", "Число базисных ФРТ:",
+                                           min(4, n_points), 1, min(32, n_points))
+            if not ok:
+                return
+            selected = self._choose_test_object("Переменная по полю ФРТ")
+            if selected is None:
+                return
+            choice, image = selected
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Ошибка подготовки моделирования: {str(e)}")
+            traceback.print_exc()
+            return
+        
+        # Сетка FieldGridDialog равномерна от -1 до 1 и покрывает все изображение
+        field_y = np.linspace(-1.0, 1.0, grid.shape[0])
+        field_x = np.linspace(-1.0, 1.0, grid.shape[1])
+        simulator = SpatiallyVariantSimulator(rank, self.image_simulator)
+        self._run_job(
+            SpatiallyVariantWorker(image, grid, field_x, field_y, simulator),
+            "Моделирование с переменной ФРТ", simulator.tile_count(image.shape), "Блоки",
+            lambda result: self._on_variant_image_simulated(path, choice, image, simulator, result)
+        )
+    
+    def _on_variant_image_simulated(self, grid_path: str, object_name: str, image: np.ndarray,
+                                    simulator: SpatiallyVariantSimulator, result: tuple):
+        """Показать результат моделирования с переменной ФРТ"""
+        explained, image_result = result
+        self._show_image_dock(f"Изображение: {object_name} (ФРТ по полю)", image, image_result)
+        self.log_widget.add_log(
+            f"Смоделировано изображение {image.shape} по сетке {grid_path}: "
+            f"{simulator.basis.shape[0]} базисных ФРТ описывают {explained * 100:.2f}% энергии сетки"
+        )
+    
+    def _simulate_partial_coherence(self):
+        """Смоделировать частично когерентное изображение объекта для выбранной строки"""
+        row = self.table_widget.currentRow()
+        params = self.table_widget.get_selected_params()
+        if params is None:
+            QMessageBox.warning(self, "Предупреждение", "Выберите строку таблицы")
+            return
+        
+        title = "Частично когерентное изображение"
+        sigma, ok = QInputDialog.getDouble(self, title, "Степень когерентности σ:",
+                                           self.illumination.sigma, 0.0, 1.0, 2)
+        if not ok:
+            return
+        n_kernels, ok = QInputDialog.getInt(self, title, "Число ядер SOCS:",
+                                            self.coherent_imager.n_kernels, 1, 64)
+        if not ok:
+            return
+        
+        try:
+            selected = self._choose_test_object(title)
+            if selected is None:
+                return
+            choice, image = selected
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Ошибка подготовки моделирования: {str(e)}")
+            traceback.print_exc()
+            return
+        
+        self.illumination = Illumination(sigma=sigma)
+        self.coherent_imager.n_kernels = n_kernels
+        cached = PartialCoherenceImager.is_cached(params, self.illumination, n_kernels)
+        tiles = self.image_simulator.tile_count(image.shape)
+        self._run_job(
+            PartialCoherenceWorker(image, params, self.illumination, self.coherent_imager), title,
+            (4 if np.iscomplexobj(image) else 2) * n_kernels * tiles, "Свертки",
+            lambda result: self._on_partial_coherence_ready(row, choice, image, params, cached, result)
+        )
+    
+    def _on_partial_coherence_ready(self, row: int, object_name: str, image: np.ndarray,
+                                    params: ParamPSF, cached: bool, result: np.ndarray):
+        """Показать частично когерентное изображение"""
+        socs = self.coherent_imager.kernels(params, self.illumination)
+        self._show_image_dock(
+            f"Изображение: {object_name}, σ = {self.illumination.sigma:.2f} (строка {row+1})", image, result
+        )
+        self.log_widget.add_log(
+            f"Строка {row+1}: частично когерентное изображение {image.shape}, "
+            f"{socs.values.size} ядер SOCS ({'из кэша' if cached else 'рассчитаны'}) "
+            f"описывают {socs.captured * 100:.2f}% TCC"
+        )
+    
+    def _retrieve_phase(self):
+        """Восстановить фазу зрачка по измеренным ФРТ с геометрией выбранной строки"""
+        row = self.table_widget.currentRow()
+        params = self.table_widget.get_selected_params()
+        if params is None:
+            QMessageBox.warning(self, "Предупреждение", "Выберите строку таблицы")
+            return
+        
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Открыть измеренные ФРТ", "",
+            "NumPy (*.npy);;Изображения (*.png *.jpg *.jpeg *.tif *.tiff *.bmp)"
+        )
+        if not path:
+            return
+        
+        title = "Восстановление фазы"
+        try:
+            measured = np.load(path) if path.endswith('.npy') else TestObjects.load_image(path)
+            measured = np.asarray(measured, dtype=float)
+            if measured.ndim == 2:
+                measured = measured[None]
+            default = ", ".join(f"{d:g}" for d in np.linspace(-0.5, 0.5, measured.shape[0])) \
+                if measured.shape[0] > 1 else "0"
+            text, ok = QInputDialog.getText(self, title, "Расфокусировка изображений (λ, через запятую):",
+                                            text=default)
+            if not ok:
+                return
+            diversity = [float(value) for value in text.replace(';', ',').split(',') if value.strip()]
+            iterations, ok = QInputDialog.getInt(self, title, "Максимум итераций:", 200, 1, 10000)
+            if not ok:
+                return
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Ошибка чтения измерений: {str(e)}")
+            traceback.print_exc()
+            return
+        
+        retrieval = PhaseRetrieval(max_iterations=iterations)
+        self._run_job(
+            PhaseRetrievalWorker(measured, params, diversity, retrieval), title, iterations, "Итерации",
+            lambda result: self._on_phase_retrieved(row, params, result)
+        )
+    
+    def _on_phase_retrieved(self, row: int, params: ParamPSF, result: PhaseRetrievalResult):
+        """Показать восстановленный волновой фронт и его коэффициенты Цернике"""
+        wavefront = result.wavefront
+        rows, cols = np.nonzero(np.isfinite(wavefront))
+        crop = wavefront[rows.min():rows.max() + 1, cols.min():cols.max() + 1]
+        # Координаты зрачка, нормированные на радиус апертуры
+        scale = params.step_pupil / params.back_aperture
+        x_values = (np.arange(cols.min(), cols.max() + 1) - params.size // 2) * scale
+        y_values = (np.arange(rows.min(), rows.max() + 1) - params.size // 2) * scale
+        self._show_map_dock(f"Восстановленный фронт (строка {row+1})", {"Волновой фронт, λ": crop},
+                            x_values, y_values, "Зрачок X", "Зрачок Y")
+        
+        status = "сошлось" if result.converged else "достигнут максимум итераций"
+        self.log_widget.add_log(
+            f"Строка {row+1}: восстановление фазы - {result.iterations} итераций ({status}), "
+            f"{result.iteration_times.mean() * 1e3:.1f} мс на итерацию, "
+            f"ошибка {result.errors[0]:.4g} -> {result.errors[-1]:.4g}, СКО фронта {result.rms:.4f} λ"
+        )
+        self.log_widget.add_log(f"Цернике: {Zernike.format([round(c, 4) for c in result.zernike])}")
+    
+    def _fit_aberrations(self):
+        """Подобрать аберрации по измеренной ФРТ; результат - новая строка таблицы"""
+        row = self.table_widget.currentRow()
+        params = self.table_widget.get_selected_params()
+        if params is None:
+            QMessageBox.warning(self, "Предупреждение", "Выберите строку таблицы")
+            return
+        
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Открыть измеренную ФРТ", "",
+            "Изображения (*.png *.jpg *.jpeg *.tif *.tiff *.bmp);;NumPy (*.npy)"
+        )
+        if not path:
+            return
+        
+        title = "Подбор аберраций"
+        try:
+            measured = np.load(path) if path.endswith('.npy') else TestObjects.load_image(path)
+            text, ok = QInputDialog.getText(
+                self, title, "Дополнительные члены Цернике (номера по Ноллу через пробел):", text="7 8 11"
+            )
+            if not ok:
+                return
+            terms = [int(value) for value in text.replace(',', ' ').split()]
+            if any(j < 1 or j > Zernike.MAX_NOLL for j in terms):
+                raise ValueError(f"Номера Цернике должны быть от 1 до {Zernike.MAX_NOLL}")
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Ошибка подготовки подбора: {str(e)}")
+            traceback.print_exc()
+            return
+        
+        fitter = AberrationFit(zernike_terms=terms)
+        self._run_job(
+            AberrationFitWorker(measured, params, fitter), title, fitter.max_iterations, "Итерации",
+            lambda result: self._on_aberrations_fitted(row, path, result)
+        )
+    
+    def _on_aberrations_fitted(self, row: int, path: str, result: AberrationFitResult):
+        """Добавить строку с подобранными аберрациями"""
+        self.table_widget.add_row(result.params)
+        new_row = self.table_widget.rowCount() - 1
+        self.table_widget.selectRow(new_row)
+        
+        fitted = result.params
+        if result.converged:
+            status = "сошлось"
+        elif result.residual > AberrationFit.MAX_RESIDUAL:
+            status = "не сошлось: большая невязка"
+        else:
+            status = "достигнут максимум итераций"
+        self.log_widget.add_log(
+            f"Подбор по {path} (начало - строка {row+1}): {result.iterations} итераций ({status}), "
+            f"невязка {result.residual:.4g}, сдвиг ({result.shift[0]:.2f}, {result.shift[1]:.2f}) пикс; расфокусировка {fitted.defocus:.4f} λ, "
+            f"астигматизм {fitted.astigmatism:.4f} λ "
+            f"{Zernike.format([round(c, 4) for c in fitted.zernike])} -> строка {new_row+1}"
+        )
+    
+    def _optimize_params(self):
+        """Найти аберрации, оптимизирующие выбранную метрику, для выбранной строки"""
+        row = self.table_widget.currentRow()
+        params = self.table_widget.get_selected_params()
+        if params is None:
+            QMessageBox.warning(self, "Предупреждение", "Выберите строку таблицы")
+            return
+        
+        dialog = OptimizationDialog(self)
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+        names, bounds = dialog.get_fields()
+        if not names:
+            QMessageBox.warning(self, "Предупреждение", "Выберите хотя бы один параметр")
+            return
+        
+        optimizer = PSFOptimizer(dialog.get_objective())
+        title, maximize = PSFOptimizer.OBJECTIVES[optimizer.objective]
+        self.log_widget.add_log(
+            f"Строка {row+1}: оптимизация ({title}, {'максимум' if maximize else 'минимум'}) "
+            f"по {', '.join(names)}"
+        )
+        
+        worker = OptimizationWorker(params, names, bounds, optimizer)
+        self._optimization_best = None
+        worker.evaluated.connect(lambda n, x, value: self._on_optimization_step(names, maximize, n, x, value))
+        self._run_job(
+            worker, "Оптимизация параметров", optimizer.max_evaluations, "Оценки",
+            lambda result: self._on_optimization_ready(row, names, result)
+        )
+    
+    def _on_optimization_step(self, names, maximize: bool, n: int, x, value: float):
+        """Записать в журнал каждое улучшение критерия (сходимость)"""
+        best = self._optimization_best
+        # Улучшения меньше 1e-6 относительно лучшего значения не показываем
+        if best is not None and (value - best) * (1 if maximize else -1) <= 1e-6 * abs(best):
+            return
+        self._optimization_best = value
+        point = ", ".join(f"{name}={v:.4f}" for name, v in zip(names, x))
+        self.log_widget.add_log(f"  оценка {n}: {point} -> {value:.6g}")
+    
+    def _on_optimization_ready(self, row: int, names, result: OptimizationResult):
+        """Добавить строку с найденными параметрами"""
+        self.table_widget.add_row(result.params)
+        new_row = self.table_widget.rowCount() - 1
+        self.table_widget.selectRow(new_row)
+        
+        point = ", ".join(f"{name}={PSFOptimizer.get_value(result.params, name):.4f}" for name in names)
+        status = "сошлось" if result.converged else "достигнут предел оценок"
+        self.log_widget.add_log(
+            f"Оптимизация строки {row+1}: {point}, критерий {result.value:.6g}, "
+            f"Штрель {result.strehl:.6f}; {result.evaluations} оценок ({status}) -> строка {new_row+1}"
+        )
+    
+    def _run_tolerance_analysis(self):
+        """Распределения метрик при случайных аберрациях вокруг выбранной строки"""
+        row = self.table_widget.currentRow()
+        params = self.table_widget.get_selected_params()
+        if params is None:
+            QMessageBox.warning(self, "Предупреждение", "Выберите строку таблицы")
+            return
+        
+        dialog = ToleranceDialog(self)
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+        tolerances = dialog.get_tolerances()
+        if not tolerances:
+            QMessageBox.warning(self, "Предупреждение", "Задайте хотя бы один ненулевой допуск")
+            return
+        n_draws, seed, workers = dialog.get_settings()
+        
+        analysis = ToleranceAnalysis(tolerances, dialog.get_keys(), n_draws=n_draws, seed=seed, workers=workers)
+        self.log_widget.add_log(
+            f"Строка {row+1}: анализ допусков, {n_draws} реализаций, зерно {seed}, процессов {workers}; "
+            + ", ".join(f"{t.name} {t.distribution} {t.width:g}" for t in tolerances)
+        )
+        
+        worker = ToleranceWorker(params, analysis)
+        self._tolerance_next_log = 0
+        worker.chunk_done.connect(lambda done, strehl: self._on_tolerance_chunk(n_draws, done, strehl))
+        self._run_job(
+            worker, "Анализ допусков", n_draws, "Реализации",
+            lambda result: self._on_tolerance_ready(row, result)
+        )
+    
+    def _on_tolerance_chunk(self, n_draws: int, done: int, strehl: dict):
+        """Сходимость: среднее, его ошибка и P5 числа Штреля (не чаще чем через 5% реализаций)"""
+        if done < self._tolerance_next_log and done < n_draws:
+            return
+        self._tolerance_next_log = done + n_draws // 20
+        self.log_widget.add_log(
+            f"  N = {done}: Штрель {strehl['mean']:.5f} ± {strehl['sem']:.1e}, P5 {strehl['p5']:.5f}"
+        )
+    
+    def _on_tolerance_ready(self, row: int, result: ToleranceResult):
+        """Показать гистограммы анализа допусков"""
+        titles = {'strehl': "Число Штреля (по зрачку)"}
+        titles.update({key: PSFMetrics.COLUMN_TITLES[key] for key in result.histograms if key != 'strehl'})
+        view = HistogramView()
+        view.set_result(result, titles)
+        
+        dock = QDockWidget(f"Анализ допусков (строка {row+1})", self)
+        dock.setWidget(view)
+        dock.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, dock)
+        dock.setFloating(True)
+        dock.resize(700, 500)
+        dock.show()
+        
+        summary = result.summary('strehl')
+        self.log_widget.add_log(
+            f"Строка {row+1}: Штрель номинал {result.nominal['strehl']:.5f}, среднее {summary['mean']:.5f}, "
+            f"P5 {summary['p5']:.5f}, P50 {summary['p50']:.5f}, P95 {summary['p95']:.5f}"
+        )
+    
+    def _compute_sensitivities(self):
+        """Чувствительности метрик к NA и аберрациям для всех строк таблицы"""
+        rows, params_list = [], []
+        for row in range(self.table_widget.rowCount()):
+            params = self.table_widget._get_params_from_row(row)
+            if params is not None:
+                rows.append(row)
+                params_list.append(params)
+        if not params_list:
+            QMessageBox.warning(self, "Предупреждение", "В таблице нет строк с корректными параметрами")
+            return
+        
+        analysis = SensitivityAnalysis()
+        n_sets = 2 * len(analysis.parameters) * len(params_list)
+        self._run_job(
+            SensitivityWorker(params_list, analysis), "Расчет чувствительностей", n_sets, "Наборы",
+            lambda values: self._on_sensitivities_ready(rows, analysis, values)
+        )
+    
+    def _on_sensitivities_ready(self, rows: list, analysis: SensitivityAnalysis, values: list):
+        """Показать чувствительности в колонках таблицы"""
+        self.table_widget.set_sensitivity_columns(analysis.keys, rows, values)
+        self.log_widget.add_log(
+            f"Чувствительности рассчитаны для {len(rows)} строк "
+            f"({2 * len(analysis.parameters) * len(rows)} сдвинутых наборов параметров)"
+        )
+    
+    def _build_strehl_lut(self):
+        """Рассчитать таблицу оценок Штреля для геометрии выбранной строки"""
+        row = self.table_widget.currentRow()
+        params = self.table_widget.get_selected_params()
+        if params is None:
+            QMessageBox.warning(self, "Предупреждение", "Выберите строку таблицы")
+            return
+        
+        text, ok = QInputDialog.getText(
+            self, "Таблица оценок Штреля",
+            "Предел расфокусировки и астигматизма ±(λ) и число узлов по оси:",
+            text="1.0 33"
+        )
+        if not ok:
+            return
+        try:
+            limit, n_points = text.replace(',', ' ').split()
+            limit, n_points = abs(float(limit)), int(n_points)
+        except ValueError:
+            QMessageBox.warning(self, "Ошибка", "Введите два числа: предел и число узлов")
+            return
+        if limit == 0 or n_points < 4:
+            QMessageBox.warning(self, "Ошибка", "Предел должен быть ненулевым, число узлов - не меньше 4")
+            return
+        
+        metrics_choice = ["Число Штреля", "Число Штреля, EE80 и FWHM (медленнее)"]
+        choice, ok = QInputDialog.getItem(self, "Таблица оценок Штреля", "Метрики:", metrics_choice, 0, False)
+        if not ok:
+            return
+        metrics = ('strehl',) if choice == metrics_choice[0] else tuple(StrehlLUT.METRICS)
+        
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Сохранить таблицу оценок Штреля",
+            f"strehl_lut_{datetime.now().strftime('%Y%m%d_%H%M%S')}.npz",
+            "NumPy (*.npz)"
+        )
+        if not path:
+            return
+        if not path.endswith('.npz'):
+            path += '.npz'
+        
+        self._run_job(
+            StrehlLUTWorker(params, (-limit, limit), n_points, metrics, path), "Расчет таблицы оценок Штреля",
+            n_points ** 2 + (n_points - 1) ** 2, "Точки",
+            lambda lut: self._on_strehl_lut_ready(row, lut, path)
+        )
+    
+    def _load_strehl_lut(self):
+        """Загрузить сохраненную таблицу оценок Штреля"""
+        path, _ = QFileDialog.getOpenFileName(self, "Открыть таблицу оценок Штреля", "", "NumPy (*.npz)")
+        if not path:
+            return
+        try:
+            lut = StrehlLUT.load(path)
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить таблицу: {str(e)}")
+            return
+        self._on_strehl_lut_ready(None, lut, path)
+    
+    def _on_strehl_lut_ready(self, row, lut: StrehlLUT, path: str):
+        """Подключить таблицу оценок и показать оценки в подходящих строках"""
+        self.table_widget.strehl_luts = [
+            other for other in self.table_widget.strehl_luts
+            if StrehlLUT.key(other.params) != StrehlLUT.key(lut.params)
+        ] + [lut]
+        for r in range(self.table_widget.rowCount()):
+            status = self.table_widget.item(r, 12)
+            if status is None or status.text() != "Рассчитано":
+                self.table_widget.show_strehl_estimate(r)
+        
+        errors = ", ".join(f"{StrehlLUT.METRICS[metric]} ±{lut.max_error(metric):.2g}" for metric in lut.metrics)
+        source = f"Строка {row+1}: таблица" if row is not None else "Таблица"
+        self.log_widget.add_log(
+            f"{source} оценок {lut.defocus.size}x{lut.astigmatism.size} "
+            f"(расфок. {lut.defocus[0]:g}..{lut.defocus[-1]:g} λ, астигм. {lut.astigmatism[0]:g}..{lut.astigmatism[-1]:g} λ) "
+            f"из {path}; наибольшая ошибка интерполяции: {errors}"
+        )
+    
+    def _run_adaptive_sweep(self):
+        """Карта метрики по двум параметрам выбранной строки с адаптивным уточнением"""
+        row = self.table_widget.currentRow()
+        params = self.table_widget.get_selected_params()
+        if params is None:
+            QMessageBox.warning(self, "Предупреждение", "Выберите строку таблицы")
+            return
+        
+        dialog = SweepDialog(self)
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+        (x_name, x_range), (y_name, y_range) = dialog.get_axes()
+        try:
+            sweep = AdaptiveSweep(x_name, x_range, y_name, y_range, **dialog.get_settings())
+        except ValueError as e:
+            QMessageBox.warning(self, "Ошибка", str(e))
+            return
+        
+        # Карта показывается сразу и уточняется по мере расчета уровней
+        view = SweepView()
+        dock = QDockWidget(f"Развертка (строка {row+1})", self)
+        dock.setWidget(view)
+        dock.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, dock)
+        dock.setFloating(True)
+        dock.resize(650, 550)
+        dock.show()
+        
+        self.log_widget.add_log(
+            f"Строка {row+1}: адаптивная развертка {SWEEP_METRICS[sweep.metric]} по "
+            f"{SWEEP_AXES[x_name]} {x_range[0]:g}..{x_range[1]:g} и {SWEEP_AXES[y_name]} {y_range[0]:g}..{y_range[1]:g}, "
+            f"сетка до {sweep.size}x{sweep.size}"
+        )
+        worker = SweepWorker(params, sweep)
+        worker.level_done.connect(view.set_result)
+        self._run_job(
+            worker, "Адаптивная развертка", sweep.size ** 2, "Точки (из полной сетки)",
+            lambda result: self._on_sweep_ready(row, view, result)
+        )
+    
+    def _on_sweep_ready(self, row: int, view: SweepView, result: SweepResult):
+        """Итог развертки: экономия вычислений относительно полной сетки"""
+        view.set_result(result)
+        self.log_widget.add_log(
+            f"Строка {row+1}: развертка завершена на уровне {result.level}, вычислено {result.evaluations} "
+            f"из {result.full_grid} точек ({100.0 * result.evaluations / result.full_grid:.1f}%)"
+        )
+    
+    def _run_grid_sweep(self):
+        """Куб метрик по декартову произведению осей вокруг выбранной строки"""
+        row = self.table_widget.currentRow()
+        params = self.table_widget.get_selected_params()
+        if params is None:
+            QMessageBox.warning(self, "Предупреждение", "Выберите строку таблицы")
+            return
+        
+        text, ok = QInputDialog.getText(
+            self, "Сеточная развертка",
+            "Оси через ';': поле ParamPSF или Z<j>, от, до, число значений:",
+            text="defocus -1 1 21; astigmatism -1 1 21; back_aperture 0.3 0.9 7"
+        )
+        if not ok:
+            return
+        try:
+            axes = SweepAxis.parse(text)
+        except ValueError as e:
+            QMessageBox.warning(self, "Ошибка", f"Неверное описание осей: {str(e)}")
+            return
+        
+        metrics_choice = ["Число Штреля", "Число Штреля, EE80 и FWHM (медленнее)"]
+        choice, ok = QInputDialog.getItem(self, "Сеточная развертка", "Метрики:", metrics_choice, 0, False)
+        if not ok:
+            return
+        try:
+            sweep = GridSweep(axes, ('strehl',) if choice == metrics_choice[0] else tuple(SWEEP_METRICS))
+        except ValueError as e:
+            QMessageBox.warning(self, "Ошибка", str(e))
+            return
+        
+        # Большой куб сразу пишется в файл, выбранный пользователем
+        path = None
+        if sweep.nbytes > GridSweep.MEMMAP_BYTES:
+            path, _ = QFileDialog.getSaveFileName(
+                self, "Сохранить куб развертки",
+                f"psf_sweep_{datetime.now().strftime('%Y%m%d_%H%M%S')}.npy",
+                "NumPy (*.npy)"
+            )
+            if not path:
+                return
+            if not path.endswith('.npy'):
+                path += '.npy'
+        
+        self.log_widget.add_log(
+            f"Строка {row+1}: сеточная развертка {' x '.join(str(n) for n in sweep.shape)} = {sweep.n_points} точек, "
+            f"процессов {sweep.workers}"
+        )
+        self._run_job(
+            GridSweepWorker(params, sweep, path), "Сеточная развертка", sweep.n_points, "Точки",
+            lambda cube: self._on_sweep_cube_ready(f"строка {row+1}", cube)
+        )
+    
+    def _open_sweep_cube(self):
+        """Открыть сохраненный куб развертки"""
+        path, _ = QFileDialog.getOpenFileName(self, "Открыть куб развертки", "", "NumPy (*.npy)")
+        if not path:
+            return
+        try:
+            cube = SweepCube.load(path)
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось открыть куб: {str(e)}")
+            return
+        self._on_sweep_cube_ready(path, cube)
+    
+    def _on_sweep_cube_ready(self, source: str, cube: SweepCube):
+        """Показать срезы куба; щелчок по карте показывает ФРТ узла"""
+        view = CubeView()
+        view.set_cube(cube)
+        view.point_selected.connect(self._show_sweep_point)
+        
+        dock = QDockWidget(f"Куб развертки ({source})", self)
+        dock.setWidget(view)
+        dock.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, dock)
+        dock.setFloating(True)
+        dock.resize(700, 600)
+        dock.show()
+        
+        where = f", файл {cube.filename}" if cube.filename else ""
+        self.log_widget.add_log(
+            f"Куб развертки ({source}): {' x '.join(f'{axis.name}[{len(axis.values)}]' for axis in cube.axes)}{where}"
+        )
+    
+    def _show_sweep_point(self, params: ParamPSF):
+        """Показать ФРТ узла развертки"""
+        self._cancel_refinement()
+        psf, strehl_ratio = self.calculator.compute(params)
+        self.psf_view.show_psf(psf, params.step_object * params.magnification)
+        self.log_widget.add_log(
+            f"Узел развертки: расфок. {params.defocus:.4g} λ, астигм. {params.astigmatism:.4g} λ, "
+            f"NA {params.back_aperture:.4g}, λ {params.wavelength:.4g} мкм, Штрель = {strehl_ratio:.6f}"
+        )
+    
+    def _on_image_simulated(self, row: int, object_name: str, image: np.ndarray, result: np.ndarray):
+        """Показать результат моделирования в отдельной панели"""
+        self._show_image_dock(f"Изображение: {object_name} (строка {row+1})", image, result)
+        self.log_widget.add_log(f"Строка {row+1}: смоделировано изображение объекта {image.shape}")
+    
+    def _show_image_dock(self, title: str, image: np.ndarray, result: np.ndarray):
+        """Показать объект и его изображение в отдельной прикрепляемой панели"""
+        view = ImageSimulationView()
+        view.set_images(image, result)
+        
+        dock = QDockWidget(title, self)
+        dock.setWidget(view)
+        dock.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, dock)
+        dock.setFloating(True)
+        dock.resize(800, 700)
+        dock.show()
+    
+    def _show_map_dock(self, title: str, maps: dict, x_values, y_values, x_label: str, y_label: str) -> MapView:
+        """Показать карты в отдельной прикрепляемой панели (новая панель на каждый расчет)"""
+        map_view = MapView()
+        map_view.set_maps(maps, x_values, y_values, x_label, y_label)
+        
+        dock = QDockWidget(title, self)
+        dock.setWidget(map_view)
+        dock.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, dock)
+        dock.setFloating(True)
+        dock.resize(600, 500)
+        dock.show()
+        return map_view
+    
+    def _on_metric_columns_changed(self):
+        """Обработчик включения/выключения колонок метрик"""
+        keys = [key for key, action in self.metric_actions.items() if action.isChecked()]
+        for direction, action in self.mtf_actions.items():
+            if action.isChecked():
+                keys += [PSFMetrics.mtf_key(direction, f) for f in self.mtf_frequencies]
+        self.table_widget.set_metric_columns(keys)
+        if not keys:
+            return
+        
+        # ФРТ берем из кэша, недостающие считаем пакетно
+        rows, params_list, psfs = [], [], []
+        missing = []
+        for row in range(self.table_widget.rowCount()):
+            params = self.table_widget._get_params_from_row(row)
+            if params is None:
+                continue
+            cached = self.psf_cache.get(params)
+            rows.append(row)
+            params_list.append(params)
+            psfs.append(cached[0] if cached is not None else None)
+            if cached is None:
+                missing.append(len(psfs) - 1)
+        
+        if missing:
+            try:
+                results = self.table_widget.calculator.compute_batch([params_list[i] for i in missing])
+            except Exception as e:
+                self.log_widget.add_log(f"Ошибка расчета метрик: {str(e)}")
+                traceback.print_exc()
+                return
+            for i, (psf, strehl_ratio) in zip(missing, results):
+                psfs[i] = psf
+                self.psf_cache.put(params_list[i], psf, strehl_ratio, evict=False)
+        
+        self.table_widget.fill_metric_columns_batch(rows, psfs, params_list)
+    
+    def _edit_mtf_frequencies(self):
+        """Задать частоты, на которых ЧКХ выводится в таблицу"""
+        current = ", ".join(f"{f:g}" for f in self.mtf_frequencies)
+        text, ok = QInputDialog.getText(self, "Частоты ЧКХ", "Частоты, лин/мм (через запятую):", text=current)
+        if not ok:
+            return
+        
+        try:
+            frequencies = [float(part) for part in text.replace(';', ',').split(',') if part.strip()]
+        except ValueError:
+            QMessageBox.warning(self, "Ошибка", "Частоты должны быть числами")
+            return
+        if not frequencies or any(f < 0 for f in frequencies):
+            QMessageBox.warning(self, "Ошибка", "Укажите хотя бы одну неотрицательную частоту")
+            return
+        
+        self.mtf_frequencies = frequencies
+        self._on_metric_columns_changed()
+        
     def _add_default_rows(self):
         """Добавить несколько строк по умолчанию"""
         default_params = [
@@ -930,43 +2230,169 @@ class PSFMainWindow(QMainWindow):
 
     def _recalculate_and_display_psf(self, row: int, params: ParamPSF):
         """Пересчитать и отобразить PSF для указанной строки"""
+        self._cancel_refinement()
         try:
             # Вычисляем PSF
-            self.current_psf, self.strehl_ratio = self.calculator.compute(params)
-            
-            # Обновляем число Штреля в таблице
-            strehl_item = QTableWidgetItem(f"{self.strehl_ratio:.6f}")
-            strehl_item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
-            self.table_widget.setItem(row, 11, strehl_item)
-            
-            # Обновляем статус
-            status_item = QTableWidgetItem("Обновлено")
-            status_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.table_widget.setItem(row, 12, status_item)
-            
-            # Обновляем отображение
-            step_microns = params.calculate_step_microns()
-            self.psf_view.show_psf(self.current_psf, step_microns)
-            
-            # Обновляем информацию
-            strehl = self.table_widget.get_selected_strehl()
-            info_text = self._generate_info_text(row, params, strehl, step_microns)
-            self.selected_info_label.setText(info_text)
-            
-            # Включаем кнопки печати
-            self.btn_preview_report.setEnabled(True)
-            self.btn_print_report.setEnabled(True)
-            
-            self.log_widget.add_log(f"Обновлена ФРТ для строки {row+1}")
+            psf, strehl_ratio = self._compute_psf_cached(params)
+            self._apply_psf_result(row, params, psf, strehl_ratio)
             
         except Exception as e:
             self.log_widget.add_log(f"Ошибка пересчета ФРТ: {str(e)}")
             traceback.print_exc()
-            
-            # Устанавливаем статус ошибки
-            status_item = QTableWidgetItem("Ошибка")
-            status_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.table_widget.setItem(row, 12, status_item)
+            self._set_row_status(row, "Ошибка")
+
+    def _apply_psf_result(self, row: int, params: ParamPSF, psf: np.ndarray, strehl_ratio: float):
+        """Отобразить рассчитанную PSF и обновить строку таблицы"""
+        self.current_psf, self.strehl_ratio = psf, strehl_ratio
+        self.psf_cache.put(params, psf, strehl_ratio)
+        
+        # Обновляем число Штреля в таблице
+        strehl_item = QTableWidgetItem(f"{self.strehl_ratio:.6f}")
+        strehl_item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+        self.table_widget.setItem(row, 11, strehl_item)
+        self.table_widget.fill_metric_columns(row, psf, params)
+        
+        # Обновляем статус
+        self._set_row_status(row, "Обновлено")
+        
+        # Обновляем отображение
+        step_microns = params.calculate_step_microns()
+        self.psf_view.show_psf(self.current_psf, step_microns)
+        
+        # Обновляем информацию
+        strehl = self.table_widget.get_selected_strehl()
+        info_text = self._generate_info_text(row, params, strehl, step_microns)
+        self.selected_info_label.setText(info_text)
+        
+        # Включаем кнопки печати
+        self.btn_preview_report.setEnabled(True)
+        self.btn_print_report.setEnabled(True)
+        
+        self.log_widget.add_log(f"Обновлена ФРТ для строки {row+1}")
+
+    def _set_row_status(self, row: int, status: str):
+        """Установить статус строки таблицы"""
+        status_item = QTableWidgetItem(status)
+        status_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.table_widget.setItem(row, 12, status_item)
+
+    def _show_progressive_psf(self, row: int, params: ParamPSF):
+        """Сразу показать грубую PSF и уточнить ее до полного размера в фоне"""
+        if params.size <= self.PREVIEW_SIZE:
+            self._recalculate_and_display_psf(row, params)
+            return
+        
+        self._cancel_refinement()
+        try:
+            # Предпросмотр с тем же шагом в изображении - центральная область полной PSF
+            preview, _ = self.preview_calculator.compute_preview(params, self.PREVIEW_SIZE)
+            self.psf_view.show_psf(preview, params.calculate_step_microns())
+            self._set_row_status(row, "Уточнение...")
+        except Exception as e:
+            self.log_widget.add_log(f"Ошибка предпросмотра ФРТ: {str(e)}")
+            traceback.print_exc()
+        
+        # Полный расчет - после паузы в редактировании, чтобы быстрый ввод
+        # не запускал расчеты промежуточных значений
+        self._pending_refinement = (row, params)
+        self._refine_timer.start(self.REFINE_DELAY_MS)
+
+    def _start_refinement(self):
+        """Передать отложенное уточнение потоку"""
+        if self._pending_refinement is None:
+            return
+        row, params = self._pending_refinement
+        self._pending_refinement = None
+        # Фоновая предзагрузка уступает уточнению
+        self.prefetch_worker.pause()
+        self.refine_worker.schedule(self._refine_token, row, params)
+
+    def _cancel_refinement(self):
+        """Отменить отложенное и ожидающее уточнение PSF"""
+        # Результат уже начатого расчета со старым номером будет отброшен
+        self._refine_token += 1
+        self._refine_timer.stop()
+        self._pending_refinement = None
+        self.refine_worker.cancel()
+        if self.refine_worker.is_idle():
+            self.prefetch_worker.resume()
+
+    def _on_refine_finished(self, token: int, row: int, psf: np.ndarray, strehl_ratio: float):
+        """Обработчик завершения фонового уточнения PSF"""
+        if token != self._refine_token:
+            return
+        
+        params = self.table_widget.current_params_list[row] \
+            if row < len(self.table_widget.current_params_list) else None
+        if params is None:
+            return
+        self._apply_psf_result(row, params, psf, strehl_ratio)
+
+    def _on_refine_failed(self, token: int, row: int, message: str):
+        """Обработчик ошибки фонового уточнения PSF"""
+        if token != self._refine_token:
+            return
+        self.log_widget.add_log(f"Ошибка пересчета ФРТ: {message}")
+        self._set_row_status(row, "Ошибка")
+
+    def _on_refine_idle(self):
+        """Поток уточнения свободен - предзагрузка продолжается"""
+        if self._pending_refinement is None:
+            self.prefetch_worker.resume()
+
+    def _compute_psf_cached(self, params: ParamPSF):
+        """Получить PSF из кэша или рассчитать на переднем плане"""
+        cached = self.psf_cache.get(params)
+        if cached is not None:
+            return cached
+        
+        # Предзагрузка не начинает новых расчетов, пока считается передний план
+        self.prefetch_worker.pause()
+        try:
+            psf, strehl_ratio = self.calculator.compute(params)
+        finally:
+            if self.refine_worker.is_idle():
+                self.prefetch_worker.resume()
+        self.psf_cache.put(params, psf, strehl_ratio)
+        return psf, strehl_ratio
+
+    def _schedule_prefetch(self, row: int):
+        """Запланировать фоновый расчет соседних и видимых строк"""
+        table = self.table_widget
+        row_count = table.rowCount()
+        
+        # Сначала ближайшие соседи в обе стороны, затем видимые строки
+        candidates = []
+        for offset in range(1, self.PREFETCH_NEIGHBOURS + 1):
+            candidates.extend([row + offset, row - offset])
+        top = table.rowAt(0)
+        bottom = table.rowAt(table.viewport().height() - 1)
+        if top >= 0:
+            if bottom < 0:
+                bottom = row_count - 1
+            candidates.extend(range(top, bottom + 1))
+        
+        jobs = []
+        seen = {row}
+        for candidate in candidates:
+            if candidate in seen or not (0 <= candidate < row_count):
+                continue
+            seen.add(candidate)
+            if candidate < len(table.current_params_list):
+                params = table.current_params_list[candidate]
+                if params not in self.psf_cache:
+                    jobs.append((candidate, params))
+        
+        self.prefetch_worker.schedule(jobs)
+
+    def closeEvent(self, event):
+        """Дождаться фоновых потоков перед закрытием окна"""
+        self._cancel_refinement()
+        self.refine_worker.stop()
+        self.refine_worker.wait()
+        self.prefetch_worker.stop()
+        self.prefetch_worker.wait()
+        super().closeEvent(event)
         
     def _show_settings_dialog(self):
         """Показать диалог настроек параметров"""
@@ -976,7 +2402,7 @@ class PSFMainWindow(QMainWindow):
             params = ParamPSF()
             
         # Создаем и показываем диалог
-        dialog = SettingsDialog(params, self)
+        dialog = SettingsDialog(params, self, estimator=self.table_widget.strehl_estimate)
         dialog.settings_changed.connect(self._on_settings_changed)
         
         if dialog.exec() == QDialog.DialogCode.Accepted:
@@ -996,7 +2422,8 @@ class PSFMainWindow(QMainWindow):
         • Числовая апертура (NA): {params.back_aperture:.3f}<br>
         • Увеличение (M): {params.magnification:.1f}<br>
         • Расфокусировка: {params.defocus:.3f} λ<br>
-        • Астигматизм: {params.astigmatism:.3f} λ<br><br>
+        • Астигматизм: {params.astigmatism:.3f} λ<br>
+        • Цернике: {Zernike.format(params.zernike) or '-'}<br><br>
         <b>Характеристики системы:</b><br>
         • Разрешение по Рэлею: {rayleigh_resolution:.3f} мкм<br>
         • Радиус Airy диска: {airy_radius:.3f} мкм<br><br>
@@ -1039,6 +2466,7 @@ class PSFMainWindow(QMainWindow):
             self.table_widget.item(row, 8).setText(f"{params.step_pupil:.6f}")
             self.table_widget.item(row, 9).setText(f"{params.step_object:.6f}")
             self.table_widget.item(row, 10).setText(f"{params.step_image:.6f}")
+            self.table_widget.item(row, ParameterTable.ZERNIKE_COLUMN).setText(Zernike.format(params.zernike))
             
             # Обновляем список параметров
             if row < len(self.table_widget.current_params_list):
@@ -1567,7 +2995,11 @@ class PSFMainWindow(QMainWindow):
 
     def _on_table_selection_changed(self, row: int):
         """Обработчик изменения выбранной строки в таблице (ОБНОВЛЕННЫЙ)"""
+        # Уточнение PSF предыдущей строки больше не актуально
+        self._cancel_refinement()
         params = self.table_widget.get_selected_params()
+        if params and self.live_dock.isVisible():
+            self.live_panel.set_params(params)
         strehl = self.table_widget.get_selected_strehl()
         
         if params:
@@ -1581,7 +3013,8 @@ class PSFMainWindow(QMainWindow):
             • Апертура: {params.back_aperture:.3f}<br>
             • Увеличение: {params.magnification:.1f}<br>
             • Расфокусировка: {params.defocus:.3f}<br>
-            • Астигматизм: {params.astigmatism:.3f}<br><br>
+            • Астигматизм: {params.astigmatism:.3f}<br>
+            • Цернике: {Zernike.format(params.zernike) or '-'}<br><br>
             <b>Параметры дискретизации:</b><br>
             • Охват зрачка: {params.pupil_diameter:.3f} к.ед.<br>
             • Шаг по зрачку: {params.step_pupil:.6f} к.ед.<br>
@@ -1592,10 +3025,12 @@ class PSFMainWindow(QMainWindow):
             """
             self.selected_info_label.setText(info_text)
             
-            # Вычисляем и отображаем PSF
+            # Вычисляем (или берем из кэша предзагрузки) и отображаем PSF
             try:
-                self.current_psf, self.strehl_ratio = self.calculator.compute(params)
-                step_microns = self.calculator._step_im_microns
+                self.current_psf, self.strehl_ratio = self._compute_psf_cached(params)
+                self.table_widget.fill_metric_columns(row, self.current_psf, params)
+                # Шаг в микронах, как в PSFCalculator.compute
+                step_microns = params.step_object * params.magnification
                 self.psf_view.show_psf(self.current_psf, step_microns)
                 self.log_widget.add_log(f"Отображена ФРТ для строки {row+1}")
                 
@@ -1605,4 +3040,6 @@ class PSFMainWindow(QMainWindow):
                 
             except Exception as e:
                 self.log_widget.add_log(f"Ошибка отображения ФРТ: {str(e)}")
-                traceback.print_exc()
\ No newline at end of file
+                traceback.print_exc()
+            
+            self._schedule_prefetch(row)
\ No newline at end of file
@@ -0,0 +1,128 @@
+"""
+Виджет карт: двумерные распределения величин (по полю зрения, по параметрам)
+"""
+
+import numpy as np
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox
+from PyQt6.QtCore import Qt, QRectF, pyqtSignal
+import pyqtgraph as pg
+
+
+class MapView(QWidget):
+    """Тепловая карта с выбором величины и выбором точки щелчком мыши"""
+
+    point_selected = pyqtSignal(int, int)  # iy, ix
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self.maps = {}
+        self.x_values = None
+        self.y_values = None
+
+        self._init_ui()
+
+    def _init_ui(self):
+        layout = QVBoxLayout(self)
+
+        control_layout = QHBoxLayout()
+        control_layout.addWidget(QLabel("Карта:"))
+        self.map_combo = QComboBox()
+        self.map_combo.currentIndexChanged.connect(self._show_current_map)
+        control_layout.addWidget(self.map_combo)
+        control_layout.addStretch()
+        layout.addLayout(control_layout)
+
+        self.plot = pg.PlotWidget()
+        self.plot.setBackground('k')
+        self.plot.showGrid(x=True, y=True, alpha=0.3)
+        self.image_item = pg.ImageItem()
+        self.plot.addItem(self.image_item)
+
+        self.marker = pg.ScatterPlotItem(size=10, pen=pg.mkPen('w', width=2), brush=None)
+        self.plot.addItem(self.marker)
+
+        self.colorbar = pg.ColorBarItem(values=(0, 1), colorMap=pg.colormap.get('viridis'))
+        self.colorbar.setImageItem(self.image_item, insert_in=self.plot.getPlotItem())
+        self.plot.scene().sigMouseClicked.connect(self._on_mouse_clicked)
+        layout.addWidget(self.plot)
+
+        self.value_label = QLabel("Щелкните по карте, чтобы выбрать точку")
+        layout.addWidget(self.value_label)
+
+    def set_maps(self, maps: dict, x_values: np.ndarray, y_values: np.ndarray,
+                 x_label: str = "X", y_label: str = "Y"):
+        """
+        Показать набор карт
+
+        maps - словарь {заголовок: массив (ny, nx)}, x_values и y_values -
+        равномерные координаты столбцов и строк карты.
+        """
+        self.maps = maps
+        self.x_values = np.asarray(x_values, dtype=float)
+        self.y_values = np.asarray(y_values, dtype=float)
+        self.plot.setLabel('bottom', x_label)
+        self.plot.setLabel('left', y_label)
+        self.marker.clear()
+
+        current = self.map_combo.currentText()
+        self.map_combo.blockSignals(True)
+        self.map_combo.clear()
+        self.map_combo.addItems(list(maps))
+        if current in maps:
+            self.map_combo.setCurrentText(current)
+        self.map_combo.blockSignals(False)
+        self._show_current_map()
+
+    @staticmethod
+    def _pixel_rect(values: np.ndarray):
+        """Начало и ширина области, занятой равномерными отсчетами (с полупикселем по краям)"""
+        step = (values[-1] - values[0]) / (values.size - 1) if values.size > 1 else 1.0
+        return values[0] - step / 2.0, step * values.size
+
+    def _show_current_map(self):
+        """Отрисовать выбранную карту"""
+        data = self.maps.get(self.map_combo.currentText())
+        if data is None:
+            self.image_item.clear()
+            return
+
+        data = np.asarray(data, dtype=float)
+        finite = np.isfinite(data)
+        if finite.any():
+            low, high = float(data[finite].min()), float(data[finite].max())
+        else:
+            low, high = 0.0, 1.0
+        if high <= low:
+            high = low + 1.0
+
+        self.image_item.setImage(np.where(finite, data, low).T, autoLevels=False)
+        x0, width = self._pixel_rect(self.x_values)
+        y0, height = self._pixel_rect(self.y_values)
+        self.image_item.setRect(QRectF(x0, y0, width, height))
+        self.colorbar.setLevels(values=(low, high))
+        self.plot.getViewBox().autoRange()
+
+    def _nearest_index(self, x: float, y: float):
+        """Индексы ближайшей точки карты"""
+        ix = int(np.argmin(np.abs(self.x_values - x)))
+        iy = int(np.argmin(np.abs(self.y_values - y)))
+        return iy, ix
+
+    def _on_mouse_clicked(self, event):
+        """Выбор точки карты щелчком"""
+        if not self.maps or event.button() != Qt.MouseButton.LeftButton:
+            return
+        view_box = self.plot.getViewBox()
+        if not view_box.sceneBoundingRect().contains(event.scenePos()):
+            return
+        point = view_box.mapSceneToView(event.scenePos())
+        self.select_point(*self._nearest_index(point.x(), point.y()))
+
+    def select_point(self, iy: int, ix: int):
+        """Отметить точку карты и сообщить о выборе"""
+        x, y = self.x_values[ix], self.y_values[iy]
+        self.marker.setData([x], [y])
+        values = ", ".join(f"{title} = {data[iy, ix]:.4g}" for title, data in self.maps.items())
+        self.value_label.setText(f"({x:.4g}, {y:.4g}): {values}")
+        self.point_selected.emit(iy, ix)
@@ -0,0 +1,81 @@
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QCheckBox,
+    QDoubleSpinBox, QGroupBox, QPushButton, QGridLayout
+)
+from core.optimizer import PSFOptimizer
+
+
+class OptimizationDialog(QDialog):
+    """Диалог выбора критерия и оптимизируемых параметров"""
+
+    FIELDS = ['defocus', 'astigmatism'] + [f"Z{j}" for j in range(4, 12)]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Оптимизация параметров")
+        self.setModal(True)
+
+        self.field_controls = {}
+        self._init_ui()
+
+    def _init_ui(self):
+        layout = QVBoxLayout(self)
+
+        objective_layout = QHBoxLayout()
+        objective_layout.addWidget(QLabel("Критерий:"))
+        self.objective_combo = QComboBox()
+        for key, (title, maximize) in PSFOptimizer.OBJECTIVES.items():
+            self.objective_combo.addItem(f"{title} ({'максимум' if maximize else 'минимум'})", key)
+        objective_layout.addWidget(self.objective_combo)
+        layout.addLayout(objective_layout)
+
+        fields_group = QGroupBox("Параметры и границы поиска")
+        fields_layout = QGridLayout(fields_group)
+        fields_layout.addWidget(QLabel("Минимум"), 0, 1)
+        fields_layout.addWidget(QLabel("Максимум"), 0, 2)
+        for i, name in enumerate(self.FIELDS, 1):
+            check = QCheckBox(PSFOptimizer.field_title(name))
+            check.setChecked(name == 'defocus')
+            low = self._make_spin(-1.0)
+            high = self._make_spin(1.0)
+            fields_layout.addWidget(check, i, 0)
+            fields_layout.addWidget(low, i, 1)
+            fields_layout.addWidget(high, i, 2)
+            self.field_controls[name] = (check, low, high)
+        layout.addWidget(fields_group)
+
+        hint = QLabel("Один параметр - метод Брента, несколько - Нелдер-Мид")
+        hint.setStyleSheet("color: gray;")
+        layout.addWidget(hint)
+
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        btn_ok = QPushButton("Оптимизировать")
+        btn_ok.clicked.connect(self.accept)
+        btn_cancel = QPushButton("Отмена")
+        btn_cancel.clicked.connect(self.reject)
+        button_layout.addWidget(btn_ok)
+        button_layout.addWidget(btn_cancel)
+        layout.addLayout(button_layout)
+
+    @staticmethod
+    def _make_spin(value: float) -> QDoubleSpinBox:
+        spin = QDoubleSpinBox()
+        spin.setRange(-10.0, 10.0)
+        spin.setSingleStep(0.1)
+        spin.setDecimals(3)
+        spin.setValue(value)
+        return spin
+
+    def get_objective(self) -> str:
+        """Ключ критерия PSFOptimizer.OBJECTIVES"""
+        return self.objective_combo.currentData()
+
+    def get_fields(self):
+        """Выбранные параметры и их границы: (names, bounds)"""
+        names, bounds = [], []
+        for name, (check, low, high) in self.field_controls.items():
+            if check.isChecked():
+                names.append(name)
+                bounds.append((min(low.value(), high.value()), max(low.value(), high.value())))
+        return names, bounds
@@ -1,18 +1,47 @@
 import numpy as np
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QSplitter, 
-    QComboBox, QLabel, QCheckBox, QGroupBox, QSizePolicy
+    QComboBox, QLabel, QCheckBox, QGroupBox, QSizePolicy, QSlider
 )
 from PyQt6.QtCore import Qt
 import pyqtgraph as pg
 
 class PSFView(QWidget):
+    # Уровни пирамиды строятся, пока сторона изображения больше этого размера
+    LOD_MIN_SIZE = 256
+    # Запас отрисованной области вокруг видимой (доля видимого окна с каждой стороны)
+    LOD_MARGIN = 0.5
+    # Число уровней квантования изображения (uint16) и размер таблицы цветов
+    LUT_SIZE = 65536
+    # Добавка перед логарифмированием
+    LOG_EPS = 1e-10
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         
         self.in_microns = False
         self.psf_data = None
         self.step_microns = 0.0
+        self._slice_axis_label = None
+        
+        # Пирамида уровней детализации квантованного изображения
+        self._pyramid = None
+        self._lod_state = None
+        
+        # Значения, соответствующие кодам квантования, в линейной и логарифмической шкале,
+        # и текущие уровни отображения для каждой шкалы
+        self._code_values = None
+        self._display_levels = {}
+        self._x_slice = None
+        self._y_slice = None
+        self._image_extent = None
+        self._updating_image = False
+        
+        # Серия ФРТ по фокусу (если показана)
+        self._focus_stack = None
+        self._focus_values = None
+        self._focus_strehl = None
+        self._focus_unit = "λ"
         
         self._init_ui()
         
@@ -50,6 +79,7 @@ class PSFView(QWidget):
         self.x_plot.setLabel('bottom', 'X координата')
         self.x_plot.showGrid(x=True, y=True, alpha=0.3)
         self.x_plot.setBackground('k')
+        self.x_curve = self.x_plot.plot(pen=pg.mkPen(color='b', width=2))
         left_layout.addWidget(self.x_plot)
         
         # График сечения Y
@@ -59,6 +89,7 @@ class PSFView(QWidget):
         self.y_plot.setLabel('bottom', 'Y координата')
         self.y_plot.showGrid(x=True, y=True, alpha=0.3)
         self.y_plot.setBackground('k')
+        self.y_curve = self.y_plot.plot(pen=pg.mkPen(color='r', width=2))
         left_layout.addWidget(self.y_plot)
         
         # Правая панель - изображение
@@ -76,6 +107,12 @@ class PSFView(QWidget):
         self.image_item = pg.ImageItem()
         self.image_plot.addItem(self.image_item)
         
+        # Уровень детализации выбирается по текущему масштабу и размеру окна
+        view_box = self.image_plot.getViewBox()
+        view_box.disableAutoRange()
+        view_box.sigRangeChanged.connect(self._on_view_range_changed)
+        view_box.sigResized.connect(self._on_view_range_changed)
+        
         # Добавляем цветовую карту
         colors = [
             (0, 0, 0),
@@ -86,15 +123,16 @@ class PSFView(QWidget):
             (255, 255, 255)
         ]
         self.cmap = pg.ColorMap(pos=np.linspace(0.0, 1.0, 6), color=colors)
-        self.image_item.setColorMap(self.cmap)
         
-        # Добавляем цветовую шкалу
+        # Добавляем цветовую шкалу: изменение уровней на ней только меняет таблицу цветов
         self.colorbar = pg.ColorBarItem(
             values=(0, 1), 
             colorMap=self.cmap,
             label='Интенсивность'
         )
-        self.colorbar.setImageItem(self.image_item)
+        self.colorbar.sigLevelsChanged.connect(
+            lambda bar: self.set_display_levels(*bar.levels())
+        )
         
         image_layout.addWidget(self.image_plot)
         
@@ -108,24 +146,161 @@ class PSFView(QWidget):
         
         main_layout.addWidget(splitter)
         
+        # Панель серии по фокусу: ползунок и кривая числа Штреля
+        self.focus_panel = QWidget()
+        focus_layout = QHBoxLayout(self.focus_panel)
+        focus_layout.setContentsMargins(0, 0, 0, 0)
+        
+        focus_controls = QVBoxLayout()
+        self.focus_slider = QSlider(Qt.Orientation.Horizontal)
+        self.focus_slider.valueChanged.connect(self._on_focus_slider_changed)
+        self.focus_label = QLabel()
+        self.focus_title_label = QLabel("Расфокусировка:")
+        focus_controls.addWidget(self.focus_title_label)
+        focus_controls.addWidget(self.focus_slider)
+        focus_controls.addWidget(self.focus_label)
+        focus_controls.addStretch()
+        focus_layout.addLayout(focus_controls, 1)
+        
+        self.focus_plot = pg.PlotWidget()
+        self.focus_plot.setBackground('k')
+        self.focus_plot.setLabel('left', 'Штрель')
+        self.focus_plot.setLabel('bottom', 'Расфокусировка, λ')
+        self.focus_plot.showGrid(x=True, y=True, alpha=0.3)
+        self.focus_plot.setMaximumHeight(150)
+        self.focus_curve = self.focus_plot.plot(pen=pg.mkPen(color='y', width=2))
+        self.focus_marker = pg.InfiniteLine(angle=90, pen=pg.mkPen(color='w', style=Qt.PenStyle.DashLine))
+        self.focus_plot.addItem(self.focus_marker)
+        focus_layout.addWidget(self.focus_plot, 2)
+        
+        self.focus_panel.setVisible(False)
+        main_layout.addWidget(self.focus_panel)
+        
     def _on_splitter_moved(self, pos, index):
         """Обработчик изменения размера splitter"""
         if self.psf_data is not None:
             self._update_image_display()
             
+    def _on_view_range_changed(self, *args):
+        """Обработчик масштабирования, панорамирования и изменения размера окна"""
+        if self._pyramid is not None and not self._updating_image:
+            self._update_image_display()
+            
     def _on_units_changed(self, index):
         """Обработчик изменения единиц измерения"""
         self.in_microns = (index == 1)
         if self.psf_data is not None:
-            self.show_psf(self.psf_data, self.step_microns)
+            # Меняются только координаты, данные не пересчитываются
+            self._update_slices(self._x_slice, self._y_slice, self.psf_data.shape[0])
+            self._update_image_display()
             
     def _on_log_scale_changed(self, state):
         """Обработчик изменения логарифмической шкалы"""
         if self.psf_data is not None:
-            self.show_psf(self.psf_data, self.step_microns)
+            # Квантованное изображение общее для обеих шкал - меняется только таблица цветов
+            self._apply_lut()
+            
+    def _scale_key(self) -> str:
+        """Текущая шкала яркости"""
+        return 'log' if self.log_scale_check.isChecked() else 'linear'
+        
+    def set_display_levels(self, low: float, high: float):
+        """Установить уровни отображения в текущей шкале (меняет только таблицу цветов)"""
+        if self._code_values is None:
+            return
+        self._display_levels[self._scale_key()] = (low, high)
+        self._apply_lut()
+        
+    def _quantize(self, psf: np.ndarray):
+        """
+        Квантовать PSF в uint16 один раз на новые данные
+        
+        Коды равномерны по логарифму интенсивности, поэтому одно квантованное
+        изображение (и одна пирамида) служит и линейной, и логарифмической шкале:
+        шкалы отличаются только таблицей цветов.
+        """
+        vmin, vmax = float(psf.min()), float(psf.max())
+        log_min = np.log10(vmin + self.LOG_EPS)
+        log_max = np.log10(vmax + self.LOG_EPS)
+        span = log_max - log_min if log_max > log_min else 1.0
+        
+        work = np.add(psf, self.LOG_EPS, dtype=np.float32)
+        np.log10(work, out=work)
+        work -= log_min
+        work *= (self.LUT_SIZE - 1) / span
+        np.clip(work, 0, self.LUT_SIZE - 1, out=work)
+        codes = np.rint(work, out=work).astype(np.uint16)
+        
+        # Значения интенсивности для каждого кода в обеих шкалах
+        log_values = log_min + np.linspace(0.0, 1.0, self.LUT_SIZE) * span
+        self._code_values = {
+            'log': log_values,
+            'linear': 10.0 ** log_values - self.LOG_EPS,
+        }
+        self._display_levels = {
+            'log': (log_min, log_max),
+            'linear': (vmin, vmax),
+        }
+        return codes
+        
+    def _apply_lut(self):
+        """Построить таблицу цветов для текущей шкалы и уровней"""
+        key = self._scale_key()
+        low, high = self._display_levels[key]
+        values = self._code_values[key]
+        span = high - low if high > low else 1.0
+        positions = np.clip((values - low) / span, 0.0, 1.0)
+        lut = self.cmap.map(positions, mode='byte')
+        self.image_item.setLookupTable(lut)
+        self.colorbar.setLevels(values=(low, high))
             
+    def show_focus_stack(self, stack: np.ndarray, defocus_values: np.ndarray,
+                         strehl_values: np.ndarray, step_microns: float = 0.0,
+                         title: str = "Расфокусировка", unit: str = "λ"):
+        """
+        Отобразить серию ФРТ по фокусу с ползунком; начинаем с лучшего фокуса
+        
+        stack может быть np.memmap (объем ФРТ на диске) - плоскости читаются
+        только при показе.
+        """
+        self._focus_stack = stack
+        self._focus_values = np.asarray(defocus_values)
+        self._focus_strehl = np.asarray(strehl_values)
+        self._focus_unit = unit
+        self.step_microns = step_microns
+        
+        self.focus_title_label.setText(f"{title}:")
+        self.focus_plot.setLabel('bottom', f"{title}, {unit}")
+        self.focus_curve.setData(self._focus_values, self._focus_strehl)
+        self.focus_panel.setVisible(True)
+        
+        best = int(np.argmax(self._focus_strehl))
+        self.focus_slider.blockSignals(True)
+        self.focus_slider.setRange(0, len(self._focus_values) - 1)
+        self.focus_slider.setValue(best)
+        self.focus_slider.blockSignals(False)
+        self._on_focus_slider_changed(best)
+        
+    def _on_focus_slider_changed(self, index: int):
+        """Показать ФРТ выбранного положения фокуса"""
+        if self._focus_stack is None:
+            return
+        self.focus_marker.setValue(self._focus_values[index])
+        self.focus_label.setText(
+            f"{self._focus_values[index]:.3f} {self._focus_unit}, Штрель = {self._focus_strehl[index]:.6f}"
+        )
+        self._display_psf(np.asarray(self._focus_stack[index], dtype=float), self.step_microns)
+        
     def show_psf(self, psf: np.ndarray, step_microns: float = 0.0):
         """Отобразить PSF и сечения"""
+        # Одиночная ФРТ заменяет показанную серию по фокусу
+        if self._focus_stack is not None:
+            self._focus_stack = None
+            self.focus_panel.setVisible(False)
+        self._display_psf(psf, step_microns)
+        
+    def _display_psf(self, psf: np.ndarray, step_microns: float):
+        """Отрисовка PSF, сечений и изображения"""
         self.psf_data = psf
         self.step_microns = step_microns
         
@@ -133,13 +308,16 @@ class PSFView(QWidget):
         center = size // 2
         
         # Получаем сечения
-        x_slice = psf[center, :]
-        y_slice = psf[:, center]
+        self._x_slice = psf[center, :]
+        self._y_slice = psf[:, center]
         
         # Обновляем сечения
-        self._update_slices(x_slice, y_slice, size)
+        self._update_slices(self._x_slice, self._y_slice, size)
         
-        # Обновляем изображение
+        # Обновляем изображение: квантование и пирамида уровней строятся один раз на PSF
+        self._pyramid = self._build_pyramid(self._quantize(psf))
+        self._lod_state = None
+        self._apply_lut()
         self._update_image_display()
         
     def _update_slices(self, x_slice, y_slice, size):
@@ -159,49 +337,118 @@ class PSFView(QWidget):
             x_label = "X, пиксели"
             y_label = "Y, пиксели"
         
-        # Обновляем график сечения X
-        self.x_plot.clear()
-        self.x_plot.plot(x_coords, x_slice, pen=pg.mkPen(color='b', width=2))
-        self.x_plot.setLabel('bottom', x_label)
-        
-        # Обновляем график сечения Y
-        self.y_plot.clear()
-        self.y_plot.plot(y_coords, y_slice, pen=pg.mkPen(color='r', width=2))
-        self.y_plot.setLabel('bottom', y_label)
+        # Обновляем графики сечений без пересоздания кривых
+        self.x_curve.setData(x_coords, x_slice)
+        self.y_curve.setData(y_coords, y_slice)
+        
+        # Подписи осей меняются только при смене единиц
+        if x_label != self._slice_axis_label:
+            self.x_plot.setLabel('bottom', x_label)
+            self.y_plot.setLabel('bottom', y_label)
+            self._slice_axis_label = x_label
+        
+    def _build_pyramid(self, data: np.ndarray) -> list:
+        """
+        Построить пирамиду уровней детализации (mip-map)
+        
+        Каждый следующий уровень вдвое меньше предыдущего. Используется максимум
+        по блоку 2x2, чтобы узкое ядро ФРТ не терялось при отдалении; максимум
+        перестановочен с монотонными преобразованиями яркости (логарифм).
+        """
+        levels = [data]
+        while min(levels[-1].shape) > self.LOD_MIN_SIZE:
+            prev = levels[-1]
+            h, w = prev.shape[0] // 2, prev.shape[1] // 2
+            # Сначала пары строк (непрерывные в памяти), затем пары столбцов
+            rows = np.maximum(prev[0:2 * h:2, :2 * w], prev[1:2 * h:2, :2 * w])
+            levels.append(np.maximum(rows[:, 0::2], rows[:, 1::2]))
+        return levels
+        
+    def _image_geometry(self):
+        """Координата левого нижнего края изображения и размер пикселя в единицах осей"""
+        size = self.psf_data.shape[0]
+        if self.in_microns and self.step_microns > 0:
+            return -size * self.step_microns / 2, self.step_microns
+        return -(size // 2), 1.0
         
     def _update_image_display(self):
         """Обновить отображение изображения"""
-        if self.psf_data is None:
+        if self.psf_data is None or self._pyramid is None:
             return
-            
-        # Применяем логарифмическую шкалу если нужно
-        if self.log_scale_check.isChecked():
-            data_to_show = np.log10(self.psf_data + 1e-10)
-        else:
-            data_to_show = self.psf_data
-            
-        # Обновляем изображение
-        self.image_item.setImage(data_to_show.T)
         
-        # Автоматическое масштабирование уровней
-        self.image_item.setLevels([data_to_show.min(), data_to_show.max()])
-        
-        # Устанавливаем правильный масштаб
         size = self.psf_data.shape[0]
-        if self.in_microns and self.step_microns > 0:
-            extent = size * self.step_microns / 2
-            self.image_item.setRect([-extent, -extent, 2*extent, 2*extent])
+        origin, pixel = self._image_geometry()
+        view_box = self.image_plot.getViewBox()
+        
+        # Новая область изображения - показываем его целиком и обновляем подписи
+        extent = (origin, size * pixel)
+        if extent != self._image_extent:
+            self._image_extent = extent
+            self._lod_state = None
+            self._updating_image = True
+            view_box.setRange(
+                xRange=(origin, origin + size * pixel),
+                yRange=(origin, origin + size * pixel),
+                padding=0
+            )
+            self._updating_image = False
             
             # Обновляем подписи осей
-            self.image_plot.setLabel('bottom', 'X, мкм')
-            self.image_plot.setLabel('left', 'Y, мкм')
-            
-            # Добавляем сетку с физическим масштабом
+            if self.in_microns and self.step_microns > 0:
+                self.image_plot.setLabel('bottom', 'X, мкм')
+                self.image_plot.setLabel('left', 'Y, мкм')
+            else:
+                self.image_plot.setLabel('bottom', 'X, пиксели')
+                self.image_plot.setLabel('left', 'Y, пиксели')
             self.image_plot.showGrid(x=True, y=True, alpha=0.3)
-        else:
-            self.image_item.setRect([-size//2, -size//2, size, size])
+        
+        # Уровень пирамиды по плотности: сколько пикселей данных приходится на пиксель экрана
+        (x0, x1), (y0, y1) = view_box.viewRange()
+        screen_width = max(view_box.width(), 1.0)
+        screen_height = max(view_box.height(), 1.0)
+        density = max((x1 - x0) / pixel / screen_width, (y1 - y0) / pixel / screen_height)
+        level = int(np.clip(np.floor(np.log2(max(density, 1.0))), 0, len(self._pyramid) - 1))
+        factor = 2 ** level
+        data = self._pyramid[level]
+        rows, cols = data.shape
+        
+        def to_index(value, count):
+            return int(np.clip(value, 0, count))
+        
+        # Видимая область в индексах выбранного уровня
+        visible = (
+            to_index(np.floor((y0 - origin) / pixel / factor), rows),
+            to_index(np.ceil((y1 - origin) / pixel / factor), rows),
+            to_index(np.floor((x0 - origin) / pixel / factor), cols),
+            to_index(np.ceil((x1 - origin) / pixel / factor), cols),
+        )
+        
+        # Отрисованная область с запасом уже покрывает видимую - ничего не делаем
+        if self._lod_state is not None:
+            state_level, r0, r1, c0, c1 = self._lod_state
+            if (state_level == level and r0 <= visible[0] and visible[1] <= r1
+                    and c0 <= visible[2] and visible[3] <= c1):
+                return
+        
+        margin_rows = int(np.ceil((visible[1] - visible[0]) * self.LOD_MARGIN))
+        margin_cols = int(np.ceil((visible[3] - visible[2]) * self.LOD_MARGIN))
+        r0 = max(visible[0] - margin_rows, 0)
+        r1 = min(visible[1] + margin_rows, rows)
+        c0 = max(visible[2] - margin_cols, 0)
+        c1 = min(visible[3] + margin_cols, cols)
+        if r1 <= r0 or c1 <= c0:
+            return
+        
+        self._updating_image = True
+        try:
+            # Обновляем изображение только видимой частью выбранного уровня
+            self.image_item.setImage(data[r0:r1, c0:c1].T, autoLevels=False,
+                                     levels=(0, self.LUT_SIZE - 1))
             
-            # Обновляем подписи осей
-            self.image_plot.setLabel('bottom', 'X, пиксели')
-            self.image_plot.setLabel('left', 'Y, пиксели')
-            self.image_plot.showGrid(x=True, y=True, alpha=0.3)
\ No newline at end of file
+            # Устанавливаем правильный масштаб
+            step = factor * pixel
+            self.image_item.setRect([origin + c0 * step, origin + r0 * step,
+                                     (c1 - c0) * step, (r1 - r0) * step])
+        finally:
+            self._updating_image = False
+        self._lod_state = (level, r0, r1, c0, c1)
@@ -4,6 +4,7 @@ from PyQt6.QtWidgets import (
     QGridLayout, QMessageBox
 )
 from PyQt6.QtCore import pyqtSignal, Qt
+from typing import Callable, Optional, Tuple
 from core.psf_params import ParamPSF
 
 
@@ -12,15 +13,19 @@ class SettingsDialog(QDialog):
     
     settings_changed = pyqtSignal(ParamPSF)
     
-    def __init__(self, params: ParamPSF = None, parent=None):
+    def __init__(self, params: ParamPSF = None, parent=None,
+                 estimator: Optional[Callable[[ParamPSF], Optional[Tuple[float, float]]]] = None):
         super().__init__(parent)
         self.setWindowTitle("Настройка исходных параметров")
         self.setModal(True)
         self.resize(600, 400)
         
         self.params = params if params else ParamPSF()
+        # Мгновенная оценка числа Штреля по таблице: (значение, погрешность) или None
+        self.estimator = estimator
         self._init_ui()
         self._update_widget_states()
+        self._update_strehl_estimate()
         
     def _init_ui(self):
         layout = QVBoxLayout(self)
@@ -104,6 +109,11 @@ class SettingsDialog(QDialog):
         self.step_microns_label.setStyleSheet("font-weight: bold; padding: 5px; border: 1px solid #ccc;")
         units_layout.addWidget(self.step_microns_label, 0, 1)
         
+        units_layout.addWidget(QLabel("Оценка числа Штреля:"), 1, 0)
+        self.strehl_estimate_label = QLabel("-")
+        self.strehl_estimate_label.setStyleSheet("padding: 5px; border: 1px solid #ccc;")
+        units_layout.addWidget(self.strehl_estimate_label, 1, 1)
+        
         layout.addWidget(units_group)
         
         # Кнопки
@@ -236,6 +246,8 @@ class SettingsDialog(QDialog):
                           (self.params.magnification * self.params.back_aperture)
             self.step_microns_label.setText(f"{step_microns:.6f}")
         
+        self._update_strehl_estimate()
+        
         # Разблокируем сигналы
         self.pupil_diameter_spin.blockSignals(False)
         self.step_pupil_spin.blockSignals(False)
@@ -243,6 +255,15 @@ class SettingsDialog(QDialog):
         self.step_image_spin.blockSignals(False)
         self.size_spin.blockSignals(False)
         
+    def _update_strehl_estimate(self):
+        """Показать оценку числа Штреля по таблице для текущих параметров"""
+        estimate = self.estimator(self.params) if self.estimator is not None else None
+        if estimate is None:
+            self.strehl_estimate_label.setText("нет таблицы оценок для этой геометрии")
+        else:
+            value, error = estimate
+            self.strehl_estimate_label.setText(f"≈{value:.6f} ± {error:.2g}")
+        
     def _recalculate_all(self):
         """Пересчитать все параметры"""
         param_idx = self.param_combo.currentIndex()
@@ -0,0 +1,123 @@
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QSpinBox,
+    QDoubleSpinBox, QGroupBox, QPushButton, QGridLayout
+)
+from core.sweep import SWEEP_AXES, SWEEP_METRICS
+
+
+class SweepDialog(QDialog):
+    """Диалог настройки адаптивной развертки по двум параметрам"""
+
+    # Диапазоны по умолчанию при выборе параметра
+    DEFAULT_RANGES = {
+        'defocus': (-1.0, 1.0),
+        'astigmatism': (-1.0, 1.0),
+        'back_aperture': (0.2, 0.9),
+        'wavelength': (0.4, 0.7),
+    }
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Адаптивная развертка")
+        self.setModal(True)
+
+        self.axis_controls = []
+        self._init_ui()
+
+    def _init_ui(self):
+        layout = QVBoxLayout(self)
+
+        axes_group = QGroupBox("Параметры развертки")
+        axes_layout = QGridLayout(axes_group)
+        axes_layout.addWidget(QLabel("От"), 0, 2)
+        axes_layout.addWidget(QLabel("До"), 0, 3)
+        for i, (label, default) in enumerate((("X:", 'defocus'), ("Y:", 'astigmatism')), 1):
+            combo = QComboBox()
+            for key, title in SWEEP_AXES.items():
+                combo.addItem(title, key)
+            low, high = self._make_spin(), self._make_spin()
+            combo.currentIndexChanged.connect(
+                lambda _, c=combo, lo=low, hi=high: self._set_default_range(c, lo, hi)
+            )
+            combo.setCurrentIndex(list(SWEEP_AXES).index(default))
+            self._set_default_range(combo, low, high)
+            axes_layout.addWidget(QLabel(label), i, 0)
+            axes_layout.addWidget(combo, i, 1)
+            axes_layout.addWidget(low, i, 2)
+            axes_layout.addWidget(high, i, 3)
+            self.axis_controls.append((combo, low, high))
+        layout.addWidget(axes_group)
+
+        refine_group = QGroupBox("Уточнение")
+        refine_layout = QGridLayout(refine_group)
+        refine_layout.addWidget(QLabel("Метрика:"), 0, 0)
+        self.metric_combo = QComboBox()
+        for key, title in SWEEP_METRICS.items():
+            self.metric_combo.addItem(title, key)
+        refine_layout.addWidget(self.metric_combo, 0, 1)
+
+        refine_layout.addWidget(QLabel("Грубая сетка (точек по оси):"), 1, 0)
+        self.coarse_spin = QSpinBox()
+        self.coarse_spin.setRange(2, 65)
+        self.coarse_spin.setValue(9)
+        refine_layout.addWidget(self.coarse_spin, 1, 1)
+
+        refine_layout.addWidget(QLabel("Уровней уточнения:"), 2, 0)
+        self.levels_spin = QSpinBox()
+        self.levels_spin.setRange(0, 8)
+        self.levels_spin.setValue(4)
+        refine_layout.addWidget(self.levels_spin, 2, 1)
+
+        refine_layout.addWidget(QLabel("Допуск по градиенту (доля размаха):"), 3, 0)
+        self.gradient_spin = QDoubleSpinBox()
+        self.gradient_spin.setRange(0.001, 1.0)
+        self.gradient_spin.setDecimals(3)
+        self.gradient_spin.setSingleStep(0.01)
+        self.gradient_spin.setValue(0.1)
+        refine_layout.addWidget(self.gradient_spin, 3, 1)
+
+        refine_layout.addWidget(QLabel("Допуск по кривизне (доля размаха):"), 4, 0)
+        self.curvature_spin = QDoubleSpinBox()
+        self.curvature_spin.setRange(0.0001, 1.0)
+        self.curvature_spin.setDecimals(4)
+        self.curvature_spin.setSingleStep(0.001)
+        self.curvature_spin.setValue(0.01)
+        refine_layout.addWidget(self.curvature_spin, 4, 1)
+        layout.addWidget(refine_group)
+
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        btn_ok = QPushButton("Рассчитать")
+        btn_ok.clicked.connect(self.accept)
+        btn_cancel = QPushButton("Отмена")
+        btn_cancel.clicked.connect(self.reject)
+        button_layout.addWidget(btn_ok)
+        button_layout.addWidget(btn_cancel)
+        layout.addLayout(button_layout)
+
+    @staticmethod
+    def _make_spin() -> QDoubleSpinBox:
+        spin = QDoubleSpinBox()
+        spin.setRange(-10.0, 10.0)
+        spin.setSingleStep(0.1)
+        spin.setDecimals(3)
+        return spin
+
+    def _set_default_range(self, combo: QComboBox, low: QDoubleSpinBox, high: QDoubleSpinBox):
+        start, stop = self.DEFAULT_RANGES[combo.currentData()]
+        low.setValue(start)
+        high.setValue(stop)
+
+    def get_axes(self):
+        """Параметры и диапазоны осей: [(имя, (от, до)), (имя, (от, до))]"""
+        return [(combo.currentData(), (low.value(), high.value())) for combo, low, high in self.axis_controls]
+
+    def get_settings(self) -> dict:
+        """Метрика и настройки уточнения (аргументы AdaptiveSweep)"""
+        return {
+            'metric': self.metric_combo.currentData(),
+            'coarse': self.coarse_spin.value(),
+            'levels': self.levels_spin.value(),
+            'gradient_tolerance': self.gradient_spin.value(),
+            'curvature_tolerance': self.curvature_spin.value(),
+        }
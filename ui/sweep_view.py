@@ -0,0 +1,28 @@
+"""
+Виджет адаптивной развертки: карта метрики, уточняемая по уровням
+"""
+
+from PyQt6.QtWidgets import QLabel
+from core.sweep import SWEEP_AXES, SWEEP_METRICS, SweepResult
+from ui.map_view import MapView
+
+
+class SweepView(MapView):
+    """Карта развертки с картой вычисленных точек и статистикой уточнения"""
+
+    def _init_ui(self):
+        super()._init_ui()
+        self.stats_label = QLabel("")
+        self.layout().insertWidget(1, self.stats_label)
+
+    def set_result(self, result: SweepResult):
+        """Показать (или обновить после очередного уровня) результат развертки"""
+        maps = {
+            SWEEP_METRICS[result.metric]: result.image(),
+            "Вычисленные точки": result.evaluated.astype(float),
+        }
+        self.set_maps(maps, result.x, result.y, SWEEP_AXES[result.x_name], SWEEP_AXES[result.y_name])
+        self.stats_label.setText(
+            f"Уровень {result.level}: вычислено {result.evaluations} из {result.full_grid} точек "
+            f"({100.0 * result.evaluations / result.full_grid:.1f}% полной сетки {result.x.size}x{result.y.size})"
+        )
@@ -0,0 +1,96 @@
+import os
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QCheckBox, QSpinBox,
+    QDoubleSpinBox, QGroupBox, QPushButton, QGridLayout
+)
+from core.optimizer import PSFOptimizer
+from core.tolerance import Tolerance
+
+
+class ToleranceDialog(QDialog):
+    """Диалог настройки анализа допусков методом Монте-Карло"""
+
+    FIELDS = ['defocus', 'astigmatism'] + [f"Z{j}" for j in range(4, 12)]
+    PSF_KEYS = ['ee80', 'fwhm_x', 'fwhm_y']
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Анализ допусков")
+        self.setModal(True)
+
+        self.field_controls = {}
+        self._init_ui()
+
+    def _init_ui(self):
+        layout = QVBoxLayout(self)
+
+        fields_group = QGroupBox("Допуски на параметры (λ)")
+        fields_layout = QGridLayout(fields_group)
+        fields_layout.addWidget(QLabel("Распределение"), 0, 1)
+        fields_layout.addWidget(QLabel("Ширина"), 0, 2)
+        for i, name in enumerate(self.FIELDS, 1):
+            check = QCheckBox(PSFOptimizer.field_title(name))
+            check.setChecked(name in ('defocus', 'astigmatism'))
+            combo = QComboBox()
+            for key, title in Tolerance.DISTRIBUTIONS.items():
+                combo.addItem(title, key)
+            width = QDoubleSpinBox()
+            width.setRange(0.0, 5.0)
+            width.setSingleStep(0.01)
+            width.setDecimals(3)
+            width.setValue(0.05)
+            fields_layout.addWidget(check, i, 0)
+            fields_layout.addWidget(combo, i, 1)
+            fields_layout.addWidget(width, i, 2)
+            self.field_controls[name] = (check, combo, width)
+        layout.addWidget(fields_group)
+
+        run_group = QGroupBox("Моделирование")
+        run_layout = QGridLayout(run_group)
+        run_layout.addWidget(QLabel("Число реализаций:"), 0, 0)
+        self.draws_spin = QSpinBox()
+        self.draws_spin.setRange(100, 10_000_000)
+        self.draws_spin.setSingleStep(1000)
+        self.draws_spin.setValue(10000)
+        run_layout.addWidget(self.draws_spin, 0, 1)
+
+        run_layout.addWidget(QLabel("Зерно генератора:"), 1, 0)
+        self.seed_spin = QSpinBox()
+        self.seed_spin.setRange(0, 2**31 - 1)
+        run_layout.addWidget(self.seed_spin, 1, 1)
+
+        run_layout.addWidget(QLabel("Процессов:"), 2, 0)
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(1, 256)
+        self.workers_spin.setValue(os.cpu_count() or 1)
+        run_layout.addWidget(self.workers_spin, 2, 1)
+
+        self.psf_metrics_check = QCheckBox("Также EE80 и FWHM (полные ФРТ, медленнее)")
+        run_layout.addWidget(self.psf_metrics_check, 3, 0, 1, 2)
+        layout.addWidget(run_group)
+
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        btn_ok = QPushButton("Рассчитать")
+        btn_ok.clicked.connect(self.accept)
+        btn_cancel = QPushButton("Отмена")
+        btn_cancel.clicked.connect(self.reject)
+        button_layout.addWidget(btn_ok)
+        button_layout.addWidget(btn_cancel)
+        layout.addLayout(button_layout)
+
+    def get_tolerances(self):
+        """Выбранные допуски"""
+        return [
+            Tolerance(name, width.value(), combo.currentData())
+            for name, (check, combo, width) in self.field_controls.items()
+            if check.isChecked() and width.value() > 0
+        ]
+
+    def get_keys(self):
+        """Ключи рассчитываемых метрик"""
+        return ['strehl'] + (self.PSF_KEYS if self.psf_metrics_check.isChecked() else [])
+
+    def get_settings(self):
+        """Число реализаций, зерно и число процессов"""
+        return self.draws_spin.value(), self.seed_spin.value(), self.workers_spin.value()